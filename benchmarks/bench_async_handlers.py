@@ -0,0 +1,112 @@
+"""Sesiones concurrentes que aguanta un worker: handlers síncronos vs asíncronos.
+
+Simula el patrón de E/S de ``load_data`` (temas + notas) contra el doble local
+de Supabase con latencia inyectada:
+
+* ``sync``: como antes, cada sesión bloquea el worker con dos peticiones
+  seguidas y un cliente HTTP nuevo por petición.
+* ``async``: cliente compartido y las dos consultas en paralelo; el worker
+  atiende todas las sesiones a la vez.
+
+Uso:
+    python -m benchmarks.bench_async_handlers --latency-ms 50 --slo-ms 1000
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import httpx
+
+from pau_elite.db import SupabaseClient
+from tools.fake_supabase import start_in_thread
+
+TOPICS_PER_USER = 51
+
+
+def seed(server, users: int) -> list[str]:
+    ids = []
+    for i in range(users):
+        user_id = f"user-{i}"
+        server.db.insert("topics", [
+            {"user_id": user_id, "name": f"Tema {n}", "level": 0, "unlocked": True, "next_review": "2026-01-01"}
+            for n in range(TOPICS_PER_USER)
+        ])
+        ids.append(user_id)
+    return ids
+
+
+def run_sync(url: str, user_ids: list[str]) -> list[float]:
+    """Un worker síncrono atiende las sesiones una detrás de otra."""
+    start = time.perf_counter()
+    latencies = []
+    for user_id in user_ids:
+        for table, order in (("topics", "id.asc"), ("notes", "created_at.desc")):
+            with httpx.Client(base_url=url, headers={"apikey": "local"}) as http:
+                http.get(f"/rest/v1/{table}", params={"select": "*", "user_id": f"eq.{user_id}", "order": order})
+        # La sesión espera desde que llega (todas a la vez) hasta que termina
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+async def run_async(url: str, user_ids: list[str]) -> list[float]:
+    client = SupabaseClient(url, "local")
+    start = time.perf_counter()
+
+    async def session(user_id: str) -> float:
+        await asyncio.gather(
+            client.table("topics").select("*").eq("user_id", user_id).order("id").execute(),
+            client.table("notes").select("*").eq("user_id", user_id).order("created_at", desc=True).execute(),
+        )
+        return time.perf_counter() - start
+
+    latencies = await asyncio.gather(*(session(u) for u in user_ids))
+    await client.aclose()
+    return list(latencies)
+
+
+def p95(values: list[float]) -> float:
+    return statistics.quantiles(values, n=20)[-1] if len(values) > 1 else values[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--slo-ms", type=float, default=1000.0)
+    parser.add_argument("--sessions", default="1,5,10,25,50,100,200")
+    parser.add_argument("--json", help="Ruta donde guardar los resultados")
+    args = parser.parse_args()
+
+    levels = [int(n) for n in args.sessions.split(",")]
+    server = start_in_thread(latency_ms=args.latency_ms)
+    user_ids = seed(server, max(levels))
+
+    results = {"latency_ms": args.latency_ms, "slo_ms": args.slo_ms, "runs": []}
+    sustained = {"sync": 0, "async": 0}
+    print(f"{'sesiones':>9} {'modo':>6} {'p95 ms':>9} {'sesiones/s':>11}")
+    for n in levels:
+        for mode in ("sync", "async"):
+            wall = time.perf_counter()
+            if mode == "sync":
+                latencies = run_sync(server.url, user_ids[:n])
+            else:
+                latencies = asyncio.run(run_async(server.url, user_ids[:n]))
+            wall = time.perf_counter() - wall
+            run = {"sessions": n, "mode": mode, "p95_ms": p95(latencies) * 1000, "sessions_per_s": n / wall}
+            results["runs"].append(run)
+            if run["p95_ms"] <= args.slo_ms:
+                sustained[mode] = max(sustained[mode], n)
+            print(f"{n:>9} {mode:>6} {run['p95_ms']:>9.1f} {run['sessions_per_s']:>11.1f}")
+
+    results["sustained_sessions"] = sustained
+    print(f"Sesiones concurrentes dentro del SLO de {args.slo_ms:.0f} ms: "
+          f"sync={sustained['sync']} async={sustained['async']}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""Arranque en frío del backend: importación de la app y tiempo hasta la primera petición.
+
+Dos medidas, cada una repetida ``--repeat`` veces (mediana):
+
+* ``-X importtime`` de ``import pau_elite.pau_elite`` en un proceso nuevo:
+  total y, por módulo, el tiempo propio y acumulado de los de ``pau_elite``
+  y de los paquetes de terceros que importan directamente.
+* Tiempo desde lanzar el backend hasta el primer 200 de ``/ping`` con
+  ``reflex run --backend-only --env prod`` y con ``python -m pau_elite.serve``
+  (granian directo, sin compilar). ``serve`` se mide con la lista de páginas
+  con estado que deja la compilación del build y, con ``--no-artifacts``,
+  también sin ella (cada worker evalúa las páginas).
+
+Uso:
+    python -m benchmarks.bench_cold_start --repeat 5 --json cold_start.json
+    python -m benchmarks.bench_cold_start --skip-boot   # solo importtime
+"""
+import argparse
+import json
+import os
+import shutil
+import signal
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+from pau_elite.serve import STATEFUL_PAGES
+
+ROOT = Path(__file__).resolve().parent.parent
+APP_MODULE = "pau_elite.pau_elite"
+
+
+def import_profile() -> dict[str, tuple[int, int, str | None]]:
+    """``{módulo: (propio µs, acumulado µs, quién lo importó)}`` de un proceso nuevo."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {APP_MODULE}"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(own), int(cumulative), (len(name) - len(name.lstrip()) - 1) // 2))
+    # importtime escribe cada módulo después de los que importa: al revés, el padre va antes
+    modules, stack = {}, []
+    for name, own, cumulative, depth in reversed(rows):
+        stack[depth:] = [name]
+        modules[name] = (own, cumulative, stack[depth - 1] if depth else None)
+    return modules
+
+
+def summarize_imports(profiles: list[dict], top: int) -> dict:
+    def row(name: str) -> dict:
+        samples = [p[name] for p in profiles if name in p]
+        return {
+            "own_ms": statistics.median(s[0] for s in samples) / 1000,
+            "cumulative_ms": statistics.median(s[1] for s in samples) / 1000,
+        }
+
+    ours = sorted(n for n in profiles[0] if n.startswith("pau_elite"))
+    # Paquetes de terceros (ni stdlib ni propios) que importa directamente algún módulo de pau_elite
+    third_party = {
+        name for name, (_, _, parent) in profiles[0].items()
+        if parent and parent.startswith("pau_elite") and "." not in name
+        and not name.startswith("pau_elite") and name not in sys.stdlib_module_names
+    }
+    heavy = sorted(third_party, key=lambda n: -row(n)["cumulative_ms"])[:top]
+    return {
+        "total_ms": row(APP_MODULE)["cumulative_ms"],
+        "pau_elite": {n: row(n) for n in ours},
+        "third_party": {n: row(n) for n in heavy},
+    }
+
+
+def boot_command(mode: str, port: int) -> list[str]:
+    if mode == "reflex-run":
+        return [sys.executable, "-m", "reflex", "run", "--backend-only", "--env", "prod",
+                "--backend-port", str(port), "--loglevel", "warning"]
+    return [sys.executable, "-m", "pau_elite.serve", "--no-frontend", "--port", str(port), "--workers", "1"]
+
+
+def prepare_artifacts():
+    # Lo mismo que deja en .web/backend la compilación del build (sin npm)
+    subprocess.run(
+        [sys.executable, "-c", f"import {APP_MODULE} as m; m.app()"],
+        cwd=ROOT, env={**os.environ, "__REFLEX_SKIP_COMPILE": "true"},
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True,
+    )
+    if not STATEFUL_PAGES.exists():
+        raise RuntimeError(f"No se generó {STATEFUL_PAGES}")
+
+
+def time_to_first_request(mode: str, port: int, timeout: float = 120.0) -> float:
+    env = {**os.environ, "PATH": f"{Path(sys.executable).parent}{os.pathsep}{os.environ.get('PATH', '')}"}
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        boot_command(mode, port), cwd=ROOT, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True,
+    )
+    try:
+        with httpx.Client(timeout=1.0) as http:
+            while time.perf_counter() - start < timeout:
+                try:
+                    if http.get(f"http://localhost:{port}/ping").status_code == 200:
+                        return time.perf_counter() - start
+                except httpx.TransportError:
+                    pass
+                if process.poll() is not None:
+                    raise RuntimeError(f"{mode} terminó con código {process.returncode}")
+                time.sleep(0.02)
+        raise RuntimeError(f"{mode}: sin respuesta en {timeout:.0f} s")
+    finally:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10, help="Paquetes de terceros a mostrar")
+    parser.add_argument("--port", type=int, default=8011)
+    parser.add_argument("--skip-boot", action="store_true", help="Solo -X importtime")
+    parser.add_argument("--no-artifacts", action="store_true", help="Mide también serve sin la lista de páginas del build")
+    parser.add_argument("--json", help="Ruta donde guardar los resultados")
+    args = parser.parse_args()
+
+    imports = summarize_imports([import_profile() for _ in range(args.repeat)], args.top)
+    print(f"import {APP_MODULE}: {imports['total_ms']:.0f} ms (mediana de {args.repeat})")
+    print(f"{'módulo':<28} {'propio ms':>10} {'acum. ms':>10}")
+    for name, row in {**imports["pau_elite"], **imports["third_party"]}.items():
+        print(f"{name:<28} {row['own_ms']:>10.1f} {row['cumulative_ms']:>10.1f}")
+    results = {"imports": imports}
+
+    if not args.skip_boot:
+        # .states de otra ejecución no cuenta; .web/backend se regenera abajo
+        shutil.rmtree(ROOT / ".states", ignore_errors=True)
+        modes = [("reflex-run", True), ("serve", True)] + ([("serve", False)] if args.no_artifacts else [])
+        boots = {}
+        for mode, artifacts in modes:
+            label = mode if artifacts else f"{mode} sin artefactos"
+            samples = []
+            for _ in range(args.repeat):
+                shutil.rmtree(STATEFUL_PAGES.parent, ignore_errors=True)
+                if artifacts:
+                    prepare_artifacts()
+                samples.append(time_to_first_request(mode, args.port))
+            boots[label] = {"median_s": statistics.median(samples), "samples_s": samples}
+        print(f"{'arranque':<24} {'1.ª petición (s)':>17}")
+        for label, row in boots.items():
+            print(f"{label:<24} {row['median_s']:>17.2f}")
+        results["time_to_first_request"] = boots
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
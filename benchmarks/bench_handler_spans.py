@@ -0,0 +1,106 @@
+"""Coste por handler de un recorrido típico: latencia, llamadas a Supabase y delta.
+
+Lanza los eventos por el mismo camino que el websocket (``reflex.app.process``
+con ``EventSpanMiddleware``) contra el doble local de Supabase con latencia
+inyectada, y muestra por evento el span que queda en ``tracing``: cuántas
+llamadas hizo y a qué, cuánto esperó a Supabase y cuántos bytes de delta
+envió. Al final, los pools HTTP creados (debe ser 1).
+
+Con ``--notes N`` el estudiante ya tiene N notas: el login no debe notarlo
+(las notas se piden al abrir su pestaña, de página en página).
+
+Uso:
+    python -m benchmarks.bench_handler_spans --latency-ms 20
+    python -m benchmarks.bench_handler_spans --notes 10000
+"""
+import argparse
+import asyncio
+import json
+import os
+import uuid
+
+from reflex.app import process
+from reflex.event import Event
+
+from tools.fake_supabase import start_in_thread
+
+
+EMAIL = "bench@example.com"
+WORDS = ("derivadas", "integrales", "sintaxis", "Quijote", "enlace", "Cervantes", "límites", "célula")
+
+
+async def run(latency_ms: float, notes: int) -> list[dict]:
+    server = start_in_thread(latency_ms=latency_ms)
+    # Mismo id que dará el login del doble a este correo
+    user_id = str(uuid.uuid5(uuid.NAMESPACE_URL, EMAIL))
+    server.db.insert("notes", [
+        {"user_id": user_id, "text": f"Nota {i}: repasar {WORDS[i % len(WORDS)]} y {WORDS[i * 7 % len(WORDS)]}"}
+        for i in range(notes)
+    ])
+    os.environ.update(SUPABASE_URL=server.url, SUPABASE_KEY="local")
+
+    from pau_elite import pau_elite as app_module, tracing
+    from pau_elite.db import SUPABASE_CLIENTS
+
+    app = app_module.app
+    app._setup_state()
+    router_data = {"pathname": "/", "query": {}}
+    spans = []
+
+    async def dispatch(name: str, payload: dict):
+        event = Event(token="bench", name=name, payload=payload, router_data=router_data)
+        async for _ in process(app, event, "bench-sid", {}, "127.0.0.1"):
+            pass
+
+    async def send(state, handler: str, **payload):
+        await dispatch(f"{state.get_full_name()}.{handler}", payload)
+        span = tracing.current()
+        spans.append({
+            "handler": span.handler,
+            "ms": span.elapsed * 1000,
+            "db_calls": span.db_calls,
+            "db_ms": span.db_seconds * 1000,
+            "delta_bytes": span.delta_bytes,
+        })
+
+    # La hidratación la resuelve el middleware de Reflex antes que el nuestro
+    await dispatch(f"{app_module.State.get_root_state().get_full_name()}.hydrate", {})
+    await send(app_module.AuthState, "set_email", value=EMAIL)
+    await send(app_module.AuthState, "login")
+    topic_id = server.db.rows("topics")[0]["id"]
+    await send(app_module.TopicsState, "review_topic", topic_id=topic_id, rating="ok")
+    await send(app_module.UIState, "open_tab", tab="tab2")
+    await send(app_module.SyllabusState, "toggle_unlock", topic_id=topic_id, current_val=False)
+    await send(app_module.UIState, "open_tab", tab="tab3")
+    await send(app_module.NotesState, "load_more_notes")
+    await send(app_module.NotesState, "set_new_note_text", value="Repasar integrales")
+    await send(app_module.NotesState, "add_note")
+    await send(app_module.NotesState, "search_notes", value="integrales")
+    await send(app_module.NotesState, "notes_scrolled", near_end=True)
+    await send(app_module.TopicsState, "resync")
+    for span in spans:
+        span["clients"] = SUPABASE_CLIENTS.value
+    return spans
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--notes", type=int, default=0, help="Notas que ya tiene el estudiante")
+    parser.add_argument("--json", help="Ruta donde guardar los resultados")
+    args = parser.parse_args()
+
+    spans = asyncio.run(run(args.latency_ms, args.notes))
+    print(f"{'handler':<32} {'total':>8} {'Supabase':>9} {'delta':>8}  llamadas")
+    for s in spans:
+        print(f"{s['handler']:<32} {s['ms']:>6.1f}ms {s['db_ms']:>7.1f}ms {s['delta_bytes']:>7}B  "
+              f"{len(s['db_calls'])}: {', '.join(s['db_calls'])}")
+    print(f"pools HTTP de Supabase creados: {spans[-1]['clients']:.0f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(spans, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
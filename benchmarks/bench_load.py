@@ -0,0 +1,391 @@
+"""Prueba de carga del backend de Reflex por websocket con N estudiantes simulados.
+
+Arranca el doble local de Supabase (con latencia inyectada) y el backend
+(``reflex run --backend-only``) apuntando a él, y conecta ``--students``
+clientes que hablan el mismo protocolo que el navegador (Socket.IO sobre
+websocket, implementado aquí sobre ``websockets``). Cada
+estudiante hace: hidratación → login → load_data → abrir el temario y
+desbloquear temas → ráfaga de ``review_topic`` → abrir las notas, añadir y
+borrar → logout (que vuelca la cola de repasos). Con ``--tabs N`` cada estudiante abre
+además N-1 pestañas que restauran la sesión desde las cookies y repiten el
+recorrido a la vez que la primera: lecturas idénticas y escrituras sobre los
+mismos temas que el single-flight de ``pau_elite.db`` debe agrupar.
+
+Con ``--workers 1 2 4`` (y ``--redis-url``) repite la prueba con el backend
+en ese número de procesos compartiendo el estado en Redis, cada vez con un
+doble de Supabase nuevo en su propio proceso, e informa de cómo escala el
+throughput. Con varios workers, ``/metrics`` es el de uno de ellos.
+
+Cada evento se cronometra desde el envío hasta la actualización ``final`` y
+se informa por handler de p50/p95/p99, el throughput global y la memoria
+residente del backend por sesión (árbol de procesos, vía /proc). Los
+eventos encadenados que devuelve el servidor (``flush_reviews_later``) no se
+reenvían: el logout vacía la cola igualmente. Al terminar se leen de
+``/metrics`` las lecturas deduplicadas y las escrituras serializadas.
+
+Uso:
+    python -m benchmarks.bench_load --students 20 --latency-ms 20 --json load.json
+    python -m benchmarks.bench_load --students 10 --tabs 3   # varias pestañas por estudiante
+    python -m benchmarks.bench_load --baseline load.json   # compara p95 con otra ejecución
+    python -m benchmarks.bench_load --backend-url http://localhost:8000  # backend ya arrancado
+    python -m benchmarks.bench_load --students 60 --workers 1 2 4 --redis-url redis://localhost:6379
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from collections import defaultdict
+from pathlib import Path
+
+import httpx
+from websockets.asyncio.client import connect
+
+from tools.fake_supabase import JWT_SECRET
+
+ROOT = Path(__file__).resolve().parent.parent
+ROUTER_DATA = {"pathname": "/", "query": {}}
+NAMESPACE = "/_event"  # espacio de nombres Socket.IO de los eventos de Reflex
+ROOT_STATE = "reflex___state____state"
+APP_STATE = f"{ROOT_STATE}.pau_elite___pau_elite____state"
+STATES = {
+    "auth": f"{APP_STATE}.pau_elite___pau_elite____auth_state",
+    "topics": f"{APP_STATE}.pau_elite___pau_elite____topics_state",
+    "syllabus": f"{APP_STATE}.pau_elite___pau_elite____syllabus_state",
+    "notes": f"{APP_STATE}.pau_elite___pau_elite____notes_state",
+    "ui": f"{APP_STATE}.pau_elite___pau_elite___ui_state",
+}
+UPDATE_VARS = f"{ROOT_STATE}.reflex___state____update_vars_internal_state"
+SESSION_COOKIES = ("auth_token", "refresh_token")
+# Contadores de /metrics que resume el informe
+DEDUP_METRICS = ("pau_supabase_reads_deduplicated_total", "pau_supabase_writes_serialized_total")
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def tree_rss_bytes(pid: int) -> int:
+    """Memoria residente de un proceso y sus descendientes (Linux)."""
+    total = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f"/proc/{current}/statm") as f:
+                total += int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+            for task in os.listdir(f"/proc/{current}/task"):
+                with open(f"/proc/{current}/task/{task}/children") as f:
+                    pending += [int(c) for c in f.read().split()]
+        except (FileNotFoundError, ProcessLookupError):
+            continue
+    return total
+
+
+class Student:
+    """Un navegador simulado: envía eventos de uno en uno y espera la actualización final."""
+
+    def __init__(self, backend_url: str, email: str, timings: dict[str, list[float]], errors: dict[str, int]):
+        self.backend_url = backend_url
+        self.email = email
+        self.token = str(uuid.uuid4())
+        self.timings = timings
+        self.errors = errors
+        self._handler = ""
+        self.vars: dict[str, dict] = defaultdict(dict)
+        self._final = asyncio.Event()
+        self._ws = None
+        self._reader: asyncio.Task | None = None
+
+    async def _read(self):
+        # Engine.IO 4: "2" ping -> "3" pong; "42/_event,[...]" evento Socket.IO
+        async for message in self._ws:
+            if message == "2":
+                await self._ws.send("3")
+            elif message.startswith(f"42{NAMESPACE},"):
+                name, data = json.loads(message.removeprefix(f"42{NAMESPACE},"))
+                if name == "event":
+                    self._on_update(data)
+
+    def _on_update(self, update: dict):
+        # Los handlers avisan de los fallos con window_alert
+        if any("alert" in str(e.get("payload")) for e in update.get("events") or []):
+            self.errors[self._handler] += 1
+        for state, delta in (update.get("delta") or {}).items():
+            self.vars[state].update({k.removesuffix("_rx_state_"): v for k, v in delta.items()})
+        if update.get("final"):
+            self._final.set()
+
+    async def connect(self):
+        url = self.backend_url.replace("http", "ws", 1)
+        self._ws = await connect(f"{url}/_event/?EIO=4&transport=websocket&token={self.token}", max_size=None)
+        await self._ws.recv()  # "0{...}": apertura de Engine.IO
+        await self._ws.send(f"40{NAMESPACE},")
+        while not (await self._ws.recv()).startswith(f"40{NAMESPACE},"):
+            pass
+        self._reader = asyncio.create_task(self._read())
+
+    async def send(self, state: str, handler: str, label: str | None = None, **payload):
+        self._final.clear()
+        self._handler = label or handler
+        start = time.perf_counter()
+        await self._ws.send(f"42{NAMESPACE}," + json.dumps(["event", {
+            "token": self.token,
+            "name": f"{state}.{handler}",
+            "payload": payload,
+            "router_data": ROUTER_DATA,
+        }]))
+        await asyncio.wait_for(self._final.wait(), 60)
+        self.timings[self._handler].append(time.perf_counter() - start)
+
+    def var(self, state: str, name: str):
+        return self.vars[STATES[state]].get(name)
+
+    def cookies(self) -> dict:
+        return {name: self.vars[APP_STATE].get(name, "") for name in SESSION_COOKIES}
+
+    async def sign_in(self):
+        await self.send(ROOT_STATE, "hydrate")
+        await self.send(STATES["auth"], "set_email", value=self.email)
+        await self.send(STATES["auth"], "set_password", value="bench")
+        await self.send(STATES["auth"], "login")
+
+    async def restore(self, cookies: dict):
+        """Otra pestaña del mismo navegador: el frontend manda las cookies tras hidratar."""
+        await self.send(ROOT_STATE, "hydrate")
+        await self.send(UPDATE_VARS, "update_vars_internal", label="cookies",
+                        vars={f"{APP_STATE}.{name}": value for name, value in cookies.items()})
+        await self.send(STATES["auth"], "restore_session")
+
+    async def work(self, reviews: int, unlocks: int, notes: int):
+        await self.send(STATES["topics"], "load_data")
+        await self.send(STATES["ui"], "open_tab", tab="tab2")
+        for topic in (self.var("syllabus", "syllabus_page") or [])[:unlocks]:
+            if not topic["unlocked"]:
+                await self.send(STATES["syllabus"], "toggle_unlock", topic_id=topic["id"], current_val=False)
+        due = [t["id"] for t in self.var("topics", "tasks_due") or []]
+        for i in range(reviews if due else 0):
+            await self.send(STATES["topics"], "review_topic", topic_id=due[i % len(due)], rating="ok")
+        await self.send(STATES["ui"], "open_tab", tab="tab3")
+        for i in range(notes):
+            await self.send(STATES["notes"], "set_new_note_text", value=f"Nota {i} de {self.email}")
+            await self.send(STATES["notes"], "add_note")
+        for note in list(self.var("notes", "notes") or [])[:notes]:
+            await self.send(STATES["notes"], "delete_note", note_id=note["id"])
+
+    async def logout(self):
+        await self.send(STATES["auth"], "logout")
+        await self.close()
+
+    async def close(self):
+        self._reader.cancel()
+        await self._ws.close()
+
+
+async def browse(tabs: list[Student], reviews: int, unlocks: int, notes: int):
+    """Un estudiante: entra en la primera pestaña, el resto restaura la sesión y todas trabajan a la vez."""
+    first, *others = tabs
+    await first.sign_in()
+    await asyncio.gather(*(tab.restore(first.cookies()) for tab in others))
+    await asyncio.gather(*(tab.work(reviews, unlocks, notes) for tab in tabs))
+
+
+def start_supabase(port: int, latency_ms: float) -> subprocess.Popen:
+    """El doble de Supabase en su propio proceso: así no compite por el GIL con los clientes."""
+    return subprocess.Popen(
+        [sys.executable, "-m", "tools.fake_supabase", "--port", str(port),
+         "--realtime-port", str(port + 1), "--latency-ms", str(latency_ms)],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+def start_backend(port: int, supabase_url: str, workers: int = 1, redis_url: str | None = None) -> subprocess.Popen:
+    # Con el secreto del doble, las pestañas restauran la sesión verificando el JWT en proceso
+    env = {**os.environ, "SUPABASE_URL": supabase_url, "SUPABASE_KEY": "local", "SUPABASE_JWT_SECRET": JWT_SECRET}
+    # Reflex lanza el servidor ASGI por PATH: el del mismo entorno que este intérprete
+    env["PATH"] = f"{Path(sys.executable).parent}{os.pathsep}{env.get('PATH', '')}"
+    env["GRANIAN_WORKERS"] = str(workers)
+    if redis_url:
+        env["REDIS_URL"] = redis_url
+    return subprocess.Popen(
+        [sys.executable, "-m", "reflex", "run", "--backend-only", "--env", "prod",
+         "--backend-port", str(port), "--loglevel", "warning"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        # Grupo propio: al terminar se para también el servidor ASGI hijo
+        start_new_session=True,
+    )
+
+
+async def wait_ready(url: str, timeout: float = 120.0):
+    """Espera a que ``url`` responda 200 (``/ping`` del backend, ``/auth/v1/health`` del doble)."""
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as http:
+        while time.monotonic() < deadline:
+            try:
+                if (await http.get(url)).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.5)
+    raise RuntimeError(f"Sin respuesta de {url}")
+
+
+async def scrape_counters(backend_url: str, names: tuple[str, ...]) -> dict[str, float]:
+    """Suma por nombre (todas las etiquetas) de contadores de ``/metrics``."""
+    totals = dict.fromkeys(names, 0.0)
+    token = os.getenv("METRICS_TOKEN")
+    async with httpx.AsyncClient() as http:
+        response = await http.get(f"{backend_url}/metrics", headers={"Authorization": f"Bearer {token}"} if token else {})
+    for line in response.text.splitlines():
+        name = line.split("{", 1)[0].split(" ", 1)[0]
+        if name in totals:
+            totals[name] += float(line.rsplit(" ", 1)[1])
+    return totals
+
+
+async def run(args, backend_url: str, backend_pid: int | None) -> dict:
+    timings: dict[str, list[float]] = defaultdict(list)
+    errors: dict[str, int] = defaultdict(int)
+    students = [
+        [Student(backend_url, f"alumno{i}@bench.local", timings, errors) for _ in range(args.tabs)]
+        for i in range(args.students)
+    ]
+    tabs = [tab for student in students for tab in student]
+
+    # Una sesión de calentamiento fija la memoria base (imports, pools, cachés)
+    warmup = Student(backend_url, "warmup@bench.local", defaultdict(list), errors)
+    await warmup.connect()
+    await browse([warmup], 1, 1, 1)
+    await warmup.logout()
+    if errors:
+        raise RuntimeError(f"La sesión de calentamiento falló: {dict(errors)}")
+    rss_before = tree_rss_bytes(backend_pid) if backend_pid else None
+    counters_before = await scrape_counters(backend_url, DEDUP_METRICS)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(tab.connect() for tab in tabs))
+    await asyncio.gather(*(browse(student, args.reviews, args.unlocks, args.notes) for student in students))
+    rss_after = tree_rss_bytes(backend_pid) if backend_pid else None
+    # La primera pestaña cierra la sesión; las demás solo se desconectan
+    await asyncio.gather(*(tab.logout() if i == 0 else tab.close() for student in students for i, tab in enumerate(student)))
+    elapsed = time.perf_counter() - start
+    counters_after = await scrape_counters(backend_url, DEDUP_METRICS)
+
+    events = sum(len(v) for v in timings.values())
+    return {
+        "commit": subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip(),
+        "students": args.students,
+        "tabs": args.tabs,
+        "workers": args.workers,
+        "latency_ms": args.latency_ms,
+        "elapsed_s": elapsed,
+        "events": events,
+        "throughput_eps": events / elapsed,
+        "memory_per_session_kib": (rss_after - rss_before) / len(tabs) / 1024 if backend_pid else None,
+        "deduplicated": {name: counters_after[name] - counters_before[name] for name in DEDUP_METRICS},
+        "handlers": {
+            name: {
+                "count": len(values),
+                "errors": errors.get(name, 0),
+                "mean_ms": statistics.fmean(values) * 1000,
+                "p50_ms": percentile(values, 0.50) * 1000,
+                "p95_ms": percentile(values, 0.95) * 1000,
+                "p99_ms": percentile(values, 0.99) * 1000,
+            }
+            for name, values in sorted(timings.items())
+        },
+    }
+
+
+def report(results: dict, baseline: dict | None):
+    print(f"{results['students']} estudiantes x {results['tabs']} pestañas, {results['workers'] or '?'} worker(s), latencia Supabase {results['latency_ms']:.0f} ms, commit {results['commit']}")
+    print(f"{results['events']} eventos en {results['elapsed_s']:.1f} s -> {results['throughput_eps']:.1f} eventos/s")
+    if results["memory_per_session_kib"] is not None:
+        print(f"memoria del backend por sesión: {results['memory_per_session_kib']:.0f} KiB")
+    dedup = results["deduplicated"]
+    print(f"lecturas deduplicadas: {dedup['pau_supabase_reads_deduplicated_total']:.0f}, "
+          f"escrituras serializadas: {dedup['pau_supabase_writes_serialized_total']:.0f}")
+    header = f"{'handler':<20} {'n':>5} {'err':>4} {'p50':>9} {'p95':>9} {'p99':>9}"
+    print(header + (f" {'p95 base':>9} {'Δ p95':>7}" if baseline else ""))
+    for name, h in results["handlers"].items():
+        line = f"{name:<20} {h['count']:>5} {h['errors']:>4} {h['p50_ms']:>7.1f}ms {h['p95_ms']:>7.1f}ms {h['p99_ms']:>7.1f}ms"
+        if baseline and name in baseline["handlers"]:
+            before = baseline["handlers"][name]["p95_ms"]
+            line += f" {before:>7.1f}ms {(h['p95_ms'] - before) / before * 100:>+6.0f}%"
+        print(line)
+
+
+def report_scaling(runs: list[dict]):
+    base = runs[0]["throughput_eps"] / runs[0]["workers"]
+    print(f"{'workers':>7} {'eventos/s':>10} {'aceleración':>11} {'eficiencia':>10}")
+    for r in runs:
+        speedup = r["throughput_eps"] / runs[0]["throughput_eps"]
+        print(f"{r['workers']:>7} {r['throughput_eps']:>10.1f} {speedup:>10.2f}x {r['throughput_eps'] / (base * r['workers']):>10.0%}")
+
+
+def run_with_backend(args, workers: int) -> dict:
+    """Doble de Supabase y backend nuevos para una ejecución con ``workers`` procesos."""
+    supabase = start_supabase(args.supabase_port, args.latency_ms)
+    backend = None
+    try:
+        supabase_url = f"http://127.0.0.1:{args.supabase_port}"
+        asyncio.run(wait_ready(f"{supabase_url}/auth/v1/health"))
+        backend = start_backend(args.backend_port, supabase_url, workers, args.redis_url)
+        backend_url = f"http://127.0.0.1:{args.backend_port}"
+        asyncio.run(wait_ready(f"{backend_url}/ping"))
+        return asyncio.run(run(argparse.Namespace(**{**vars(args), "workers": workers}), backend_url, backend.pid))
+    finally:
+        if backend is not None:
+            os.killpg(backend.pid, signal.SIGTERM)
+            backend.wait(30)
+        supabase.terminate()
+        supabase.wait(30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--students", type=int, default=20)
+    parser.add_argument("--tabs", type=int, default=1, help="Pestañas abiertas por estudiante")
+    parser.add_argument("--reviews", type=int, default=20, help="Repasos por estudiante en la ráfaga")
+    parser.add_argument("--unlocks", type=int, default=5, help="Temas que desbloquea cada estudiante")
+    parser.add_argument("--notes", type=int, default=2, help="Notas que añade (y borra) cada estudiante")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Latencia inyectada en el doble de Supabase")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1], help="Procesos del backend (uno o varios)")
+    parser.add_argument("--redis-url", default=os.getenv("REDIS_URL"), help="Redis del estado compartido")
+    parser.add_argument("--backend-port", type=int, default=8765)
+    parser.add_argument("--supabase-port", type=int, default=54421)
+    parser.add_argument("--backend-url", help="Usar un backend ya arrancado en vez de lanzar uno")
+    parser.add_argument("--json", help="Ruta donde guardar los resultados")
+    parser.add_argument("--baseline", help="Resultados JSON de otra ejecución para comparar")
+    args = parser.parse_args()
+    if max(args.workers) > 1 and not args.redis_url:
+        parser.error("Varios workers necesitan --redis-url (el estado en disco no se comparte)")
+
+    if args.backend_url:
+        asyncio.run(wait_ready(f"{args.backend_url}/ping"))
+        runs = [asyncio.run(run(argparse.Namespace(**{**vars(args), "workers": None}), args.backend_url, None))]
+    else:
+        runs = [run_with_backend(args, workers) for workers in args.workers]
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    for results in runs:
+        report(results, baseline)
+    if len(runs) > 1:
+        report_scaling(runs)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(runs[0] if len(runs) == 1 else {"runs": runs}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
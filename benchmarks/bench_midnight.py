@@ -0,0 +1,155 @@
+"""Pico de medianoche: pendientes del día nuevo recalculados a la vez o precalculados.
+
+Simula ``--users`` usuarios de ``--topics`` temas, cada uno con su descarga
+en la caché de lecturas y una sesión abierta con el dashboard de hoy. Al
+cambiar de día, cada sesión pasa sus cifras al día siguiente como hace
+``TopicsState._refresh_topic_stats`` desde el bucle del reloj:
+
+* ``a demanda``: todas las sesiones recalculan desde su índice en el mismo
+  instante (sin instantáneas).
+* ``instantánea``: antes, ``due_snapshots.build_snapshots`` precalcula el día
+  siguiente repartido en una ventana de ``--lead-seconds`` (en producción,
+  ``DUE_SNAPSHOT_LEAD_MINUTES``); a medianoche las sesiones solo la leen.
+
+Por escenario informa de la duración de la ráfaga de medianoche (el bucle
+de eventos ocupado), de la latencia p50/p99 hasta que cada sesión tiene el
+día nuevo y, durante la ventana previa, del mayor bloqueo del bucle.
+
+Uso:
+    python -m benchmarks.bench_midnight --users 2000 --topics 300 --json midnight.json
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import random
+import statistics
+import time
+
+from pau_elite.due_snapshots import DueSnapshots, build_snapshots, compute_snapshot
+from pau_elite.read_cache import ReadCache, version_of
+from pau_elite.topic_store import TopicStore
+from tools.fake_supabase import load_syllabus_templates
+
+TODAY = datetime.date(2026, 10, 17)
+TOMORROW = TODAY + datetime.timedelta(days=1)
+
+
+def user_rows(n: int, rng: random.Random) -> list[dict]:
+    """Filas de ``topics`` de un usuario: las plantillas del temario, repetidas hasta ``n``."""
+    templates = load_syllabus_templates()
+    rows = []
+    for i in range(1, n + 1):
+        template = templates[i % len(templates)]
+        rows.append({
+            "id": i,
+            "subject": template["subject"],
+            "name": template["name"],
+            "category": template["category"],
+            "unlocked": rng.random() < 0.6,
+            "level": rng.randint(0, 5),
+            "next_review": str(TODAY + datetime.timedelta(days=rng.randint(-5, 30))),
+            "extra_queue": False,
+            "updated_at": "2026-10-17T18:30:00.000000+00:00",
+            "ease": 2.5,
+            "reps": rng.randint(0, 8),
+        })
+    return rows
+
+
+async def fill_cache(users: int, topics: int) -> ReadCache:
+    rng = random.Random(7)
+    cache = ReadCache(ttl=3600, max_users=users)
+    for i in range(users):
+        data = {"topics": user_rows(topics, rng)}
+
+        async def fetch(data=data):
+            return data
+
+        async def version():
+            return {}
+
+        await cache.get(f"user-{i}", fetch, version)
+    return cache
+
+
+def open_sessions(cache: ReadCache) -> list[tuple[str, TopicStore, dict]]:
+    """Sesiones con el índice cargado de la caché y el dashboard de hoy ya calculado."""
+    sessions = []
+    for user_id, data, _ in cache.entries():
+        store = TopicStore(data["topics"])
+        compute_snapshot(store, TODAY)
+        sessions.append((user_id, store, version_of(data)))
+    return sessions
+
+
+def roll_over(sessions, snapshots: DueSnapshots | None) -> dict:
+    """Cada sesión pasa al día siguiente; devuelve la ráfaga y la latencia por sesión."""
+    start = time.perf_counter()
+    latencies = []
+    for user_id, store, version in sessions:
+        snapshot = snapshots.get(user_id, TOMORROW, version) if snapshots else None
+        snapshot = snapshot or compute_snapshot(store, TOMORROW)
+        # Lo que asigna _refresh_topic_stats a las vars del estado
+        _ = (list(snapshot.tasks_due), list(snapshot.subject_stats))
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return {
+        "burst_ms": latencies[-1] * 1000,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+
+async def max_loop_lag(stop: asyncio.Event, tick: float = 0.005) -> float:
+    """Mayor retraso de un ``sleep(tick)`` mientras dure la ventana: el bucle bloqueado."""
+    worst = 0.0
+    while not stop.is_set():
+        t = time.perf_counter()
+        await asyncio.sleep(tick)
+        worst = max(worst, time.perf_counter() - t - tick)
+    return worst
+
+
+async def run(users: int, topics: int, lead: float) -> dict:
+    cache = await fill_cache(users, topics)
+
+    on_demand = roll_over(open_sessions(cache), None)
+
+    sessions = open_sessions(cache)
+    snapshots = DueSnapshots(max_users=users)
+    stop = asyncio.Event()
+    lag = asyncio.create_task(max_loop_lag(stop))
+    start = time.perf_counter()
+    built = await build_snapshots(TOMORROW, lead, cache, snapshots)
+    window = time.perf_counter() - start
+    stop.set()
+    prefetched = roll_over(sessions, snapshots)
+    prefetched.update(built=built, window_s=window, max_loop_lag_ms=await lag * 1000)
+    return {"a demanda": on_demand, "instantánea": prefetched}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--topics", type=int, default=300)
+    parser.add_argument("--lead-seconds", type=float, default=5.0, help="Ventana de precálculo antes de medianoche")
+    parser.add_argument("--json", help="Ruta donde guardar los resultados")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.users, args.topics, args.lead_seconds))
+    print(f"{args.users} usuarios × {args.topics} temas")
+    print(f"{'escenario':<12} {'ráfaga ms':>10} {'p50 ms':>8} {'p99 ms':>8}")
+    for name, row in results.items():
+        print(f"{name:<12} {row['burst_ms']:>10.1f} {row['p50_ms']:>8.1f} {row['p99_ms']:>8.1f}")
+    pre = results["instantánea"]
+    print(f"precálculo: {pre['built']} instantáneas en {pre['window_s']:.1f} s, "
+          f"mayor bloqueo del bucle {pre['max_loop_lag_ms']:.1f} ms")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"users": args.users, "topics": args.topics, "lead_seconds": args.lead_seconds, **results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
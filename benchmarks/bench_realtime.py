@@ -0,0 +1,114 @@
+"""Bytes recibidos por sesión: recargar tras cada escritura frente a Realtime.
+
+Contra los dobles locales de Supabase y Realtime, cada sesión hace login
+(descarga inicial de temas y notas) y después ``--writes`` escrituras
+(repasos, desbloqueos y notas). Se comparan:
+
+* ``reload``: el modelo anterior, una descarga completa de temas y notas tras
+  cada escritura.
+* ``realtime``: una suscripción ``postgres_changes`` que recibe solo la fila
+  cambiada (incluidos join y respuestas del protocolo).
+
+Se cuentan bytes de cuerpo JSON; cabeceras HTTP y tramas websocket no entran.
+
+Uso:
+    python -m benchmarks.bench_realtime --writes 40 --sessions 5
+"""
+import argparse
+import asyncio
+import json
+
+from pau_elite.db import SupabaseClient
+from pau_elite.realtime import REALTIME_BYTES, RealtimeHub
+from tools.fake_realtime import start_in_thread as start_realtime
+from tools.fake_supabase import start_in_thread
+
+
+def payload_bytes(data) -> int:
+    return len(json.dumps(data).encode())
+
+
+async def run_session(client: SupabaseClient, hub: RealtimeHub, email: str, writes: int) -> dict:
+    auth = await client.sign_in_with_password(email, "bench")
+    token, user_id = auth["access_token"], auth["user"]["id"]
+    await client.rpc("seed_user_syllabus", {}, token=token).execute()
+
+    async def full_load() -> int:
+        topics, notes = await asyncio.gather(
+            client.table("topics", token).select("*").eq("user_id", user_id).order("id").execute(),
+            client.table("notes", token).select("*").eq("user_id", user_id).execute(),
+        )
+        return payload_bytes(topics.data) + payload_bytes(notes.data)
+
+    initial = await full_load()
+    topic_ids = [t["id"] for t in (await client.table("topics", token).select("id").eq("user_id", user_id).execute()).data]
+
+    before = REALTIME_BYTES.value
+    sub = await hub.subscribe(user_id, token)
+    await asyncio.wait_for(sub.joined.wait(), 5.0)
+    reload_bytes, changes = 0, 0
+    for i in range(writes):
+        topic_id = topic_ids[i % len(topic_ids)]
+        if i % 4 == 3:
+            await client.table("notes", token).insert({"user_id": user_id, "text": f"Nota {i}"}, returning="minimal").execute()
+        elif i % 4 == 2:
+            await client.table("topics", token).update({"unlocked": True}, returning="minimal").eq("id", topic_id).execute()
+        else:
+            await client.table("topics", token).update(
+                {"level": i % 6, "next_review": "2026-10-20"}, returning="minimal"
+            ).eq("id", topic_id).execute()
+        reload_bytes += await full_load()
+    while changes < writes:
+        batch = await sub.next_batch(5.0)
+        if not batch:
+            break
+        changes += len(batch)
+    await sub.close()
+    return {
+        "initial": initial,
+        "reload": reload_bytes,
+        "realtime": REALTIME_BYTES.value - before,
+        "changes": changes,
+    }
+
+
+async def main_async(args):
+    server = start_in_thread()
+    realtime = start_realtime(server.db)
+    client = SupabaseClient(server.url, "local")
+    hub = RealtimeHub(realtime.url)
+    results = [await run_session(client, hub, f"bench{i}@example.com", args.writes) for i in range(args.sessions)]
+    await client.aclose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writes", type=int, default=40)
+    parser.add_argument("--sessions", type=int, default=5)
+    parser.add_argument("--json", help="Ruta donde guardar los resultados")
+    args = parser.parse_args()
+
+    sessions = asyncio.run(main_async(args))
+    n = len(sessions)
+    summary = {
+        "writes": args.writes,
+        "sessions": n,
+        "initial_bytes": sum(s["initial"] for s in sessions) / n,
+        "reload_bytes": sum(s["reload"] for s in sessions) / n,
+        "realtime_bytes": sum(s["realtime"] for s in sessions) / n,
+        "changes_received": sum(s["changes"] for s in sessions) / n,
+    }
+    print(f"por sesión ({args.writes} escrituras): descarga inicial {summary['initial_bytes'] / 1024:.1f} KiB | "
+          f"recarga tras escribir {summary['reload_bytes'] / 1024:.1f} KiB | "
+          f"Realtime {summary['realtime_bytes'] / 1024:.1f} KiB "
+          f"({summary['reload_bytes'] / max(summary['realtime_bytes'], 1):.0f}x menos) | "
+          f"cambios recibidos {summary['changes_received']:.0f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
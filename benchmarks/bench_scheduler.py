@@ -0,0 +1,93 @@
+"""Reprogramación por lotes sobre un historial sintético de un millón de repasos.
+
+Para cada estrategia mide:
+
+* ``replay``: aplicar un millón de repasos (una pasada vectorizada).
+* ``reschedule``: recalcular ``next_review`` de un millón de temas tras cambiar
+  parámetros (lo que haría ``reschedule_all`` página a página).
+* ``per_row``: el mismo repaso fila a fila con ``Scheduler.review`` sobre una
+  muestra, extrapolado al millón.
+
+Uso:
+    python -m benchmarks.bench_scheduler --rows 1000000 --sample 20000
+"""
+import argparse
+import datetime
+import json
+import time
+
+import numpy as np
+
+from pau_elite.scheduler import RATINGS, STRATEGIES
+
+TODAY = datetime.date(2026, 10, 17).toordinal()
+
+
+def synthetic_history(rows: int, seed: int = 7) -> tuple[dict, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    last_review = TODAY - rng.integers(1, 60, rows)
+    cols = {
+        "level": rng.integers(0, 6, rows),
+        "ease": rng.uniform(1.3, 3.0, rows),
+        "stability": rng.uniform(0.5, 120.0, rows),
+        "difficulty": rng.uniform(1.0, 10.0, rows),
+        "reps": rng.integers(0, 12, rows),
+        "last_rating": rng.integers(1, 4, rows),
+        "last_review": last_review,
+        "next_review": last_review + rng.integers(1, 60, rows),
+    }
+    grades = rng.choice([1, 2, 3], rows, p=[0.15, 0.25, 0.6])
+    return cols, grades
+
+
+def as_rows(cols: dict, n: int) -> list[dict]:
+    names = {v: k for k, v in RATINGS.items()}
+    return [{
+        "level": int(cols["level"][i]),
+        "ease": float(cols["ease"][i]),
+        "stability": float(cols["stability"][i]),
+        "difficulty": float(cols["difficulty"][i]),
+        "reps": int(cols["reps"][i]),
+        "last_rating": names[int(cols["last_rating"][i])],
+        "last_review": str(datetime.date.fromordinal(int(cols["last_review"][i]))),
+        "next_review": str(datetime.date.fromordinal(int(cols["next_review"][i]))),
+    } for i in range(n)]
+
+
+def timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--sample", type=int, default=20_000)
+    parser.add_argument("--json", help="Ruta donde guardar los resultados")
+    args = parser.parse_args()
+
+    cols, grades = synthetic_history(args.rows)
+    sample_rows = as_rows(cols, args.sample)
+    sample_ratings = [{v: k for k, v in RATINGS.items()}[int(g)] for g in grades[:args.sample]]
+    today = datetime.date.fromordinal(TODAY)
+
+    results = {"rows": args.rows, "sample": args.sample, "strategies": {}}
+    print(f"{'estrategia':>10} {'replay s':>9} {'reschedule s':>13} {'per_row s (extrap.)':>20} {'speedup':>8}")
+    for name, strategy in STRATEGIES.items():
+        scheduler = strategy()
+        replay = timed(lambda: scheduler.update_memory(cols, grades, TODAY))
+        reschedule = timed(lambda: scheduler.reschedule(cols))
+        per_row = timed(lambda: [
+            scheduler.review(row, rating, today) for row, rating in zip(sample_rows, sample_ratings)
+        ]) * args.rows / args.sample
+        results["strategies"][name] = {"replay_s": replay, "reschedule_s": reschedule, "per_row_s": per_row}
+        print(f"{name:>10} {replay:>9.3f} {reschedule:>13.3f} {per_row:>20.1f} {per_row / replay:>7.0f}x")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
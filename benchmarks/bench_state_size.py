@@ -0,0 +1,162 @@
+"""Tamaño del estado por sesión y del delta de un repaso para un usuario de 1.000 temas.
+
+Compara la forma original del estado (``topics: list[dict]`` con la fila
+completa de ``select("*")`` y ``tasks_due``/``total_progress`` como vars
+computadas) con la actual (``TopicStore`` de ``Topic`` compactos en backend y
+solo las tarjetas de ``tasks_due`` en el navegador). Para cada una mide:
+
+* ``state_bytes``: el estado de temas serializado por Reflex (lo que guardaría
+  Redis para ``TopicsState``).
+* ``retained_kib``: memoria retenida por sesión (tracemalloc), con cada
+  sesión parseando su propia respuesta JSON como hace httpx.
+* ``delta_bytes``: el delta que viaja al navegador tras un repaso.
+
+Uso:
+    python -m benchmarks.bench_state_size --topics 1000 --sessions 50
+"""
+import argparse
+import asyncio
+import datetime
+import gc
+import json
+import random
+import tracemalloc
+
+import reflex as rx
+from reflex.utils import format
+
+from pau_elite.pau_elite import TopicsState
+from pau_elite.scheduler import get_scheduler
+
+SUBJECTS = {"Matemáticas II": "science", "Física": "science", "Química": "science",
+            "Historia de España": "memory", "Inglés": "skills"}
+
+
+class LegacyTopicsState(rx.State):
+    """Forma del estado antes del índice: la lista completa de filas."""
+
+    topics: list[dict] = []
+
+    @rx.var
+    def tasks_due(self) -> list[dict]:
+        today = str(datetime.date.today())
+        return [t for t in self.topics if t["unlocked"] and t["next_review"] <= today]
+
+    @rx.var
+    def total_progress(self) -> int:
+        if not self.topics:
+            return 0
+        return int(sum(t["level"] for t in self.topics) / (len(self.topics) * 5) * 100)
+
+
+def topic_rows(n: int, seed: int = 7) -> str:
+    """Respuesta JSON de ``select("*")`` sobre ``topics`` para un usuario."""
+    rng = random.Random(seed)
+    today = datetime.date.today()
+    user_id = "00000000-0000-0000-0000-0000000000a1"
+    rows = []
+    for i in range(1, n + 1):
+        subject = rng.choice(list(SUBJECTS))
+        reviewed = rng.random() < 0.7
+        rows.append({
+            "id": i,
+            "user_id": user_id,
+            "subject": subject,
+            "name": f"Tema {i % 60 + 1}: {subject}",
+            "category": SUBJECTS[subject],
+            "unlocked": rng.random() < 0.6,
+            "level": rng.randint(0, 5),
+            "next_review": str(today + datetime.timedelta(days=rng.randint(-5, 30))),
+            "extra_queue": False,
+            "created_at": "2026-09-01T10:00:00.000000+00:00",
+            "updated_at": "2026-10-16T18:30:00.000000+00:00",
+            "ease": round(rng.uniform(1.3, 3.0), 3),
+            "stability": round(rng.uniform(0.5, 90.0), 3),
+            "difficulty": round(rng.uniform(1.0, 10.0), 3),
+            "reps": rng.randint(0, 8),
+            "last_rating": rng.choice(["bad", "mid", "ok"]) if reviewed else None,
+            "last_review": str(today - datetime.timedelta(days=rng.randint(1, 30))) if reviewed else None,
+        })
+    return json.dumps(rows)
+
+
+def delta_bytes(state) -> int:
+    return len(format.json_dumps(state.get_delta()).encode())
+
+
+def legacy_session(payload: str) -> LegacyTopicsState:
+    state = LegacyTopicsState(_reflex_internal_init=True)
+    state.topics = json.loads(payload)
+    return state
+
+
+def current_session(payload: str) -> TopicsState:
+    root = rx.State(_reflex_internal_init=True)
+    state = root.get_substate(TopicsState.get_full_name().split("."))
+    state._store.load(json.loads(payload))
+    state._refresh_topic_stats()
+    return state
+
+
+def retained_kib(make, payload: str, sessions: int) -> float:
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    kept = [make(payload) for _ in range(sessions)]
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    del kept
+    return used / sessions / 1024
+
+
+def legacy_review_delta(state: LegacyTopicsState) -> int:
+    state._clean()
+    topic = next(t for t in state.topics if t["unlocked"])
+    changes = get_scheduler().review(topic, "ok", datetime.date.today())
+    # Tras cada escritura el estado original recargaba la lista entera
+    state.topics = [{**t, **changes} if t["id"] == topic["id"] else t for t in state.topics]
+    return delta_bytes(state)
+
+
+def current_review_delta(state: TopicsState) -> int:
+    root = state._get_root_state()
+    root._clean()
+    topic_id = state.tasks_due[0]["id"] if state.tasks_due else next(iter(state._store._rows))
+    asyncio.run(state.review_topic(topic_id, "ok"))
+    return delta_bytes(root)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--topics", type=int, default=1000)
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--json", help="Ruta donde guardar los resultados")
+    args = parser.parse_args()
+
+    payload = topic_rows(args.topics)
+    results = {"topics": args.topics, "sessions": args.sessions}
+    for label, make, review in (
+        ("before", legacy_session, legacy_review_delta),
+        ("after", current_session, current_review_delta),
+    ):
+        state = make(payload)
+        results[label] = {
+            "state_bytes": len(state._serialize()),
+            "retained_kib": retained_kib(make, payload, args.sessions),
+            "delta_bytes": review(state),
+        }
+
+    print(f"{'':>7} {'estado serializado':>19} {'memoria/sesión':>15} {'delta repaso':>13}")
+    for label in ("before", "after"):
+        r = results[label]
+        print(f"{label:>7} {r['state_bytes'] / 1024:>15.1f} KiB {r['retained_kib']:>11.1f} KiB "
+              f"{r['delta_bytes'] / 1024:>9.1f} KiB")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Evaluación del horario semanal sobre un millón de instantes.
+
+Los instantes cubren un año completo (incluidos los dos cambios de hora) y se
+comparan:
+
+* ``vectorized``: ``Timetable.block_indices`` (desfases DST y ``searchsorted``
+  de NumPy sobre el array compilado).
+* ``per_point``: ``Timetable.block_at`` instante a instante sobre una muestra,
+  extrapolado al millón.
+
+Además comprueba que ambos caminos asignan el mismo bloque en la muestra.
+
+Uso:
+    python -m benchmarks.bench_timetable --points 1000000 --sample 20000
+"""
+import argparse
+import datetime
+import json
+import time
+
+import numpy as np
+import pytz
+
+from pau_elite.timetable import DEFAULT_TIMETABLE, FREE_NAME
+
+YEAR_START = int(datetime.datetime(2026, 1, 1, tzinfo=pytz.utc).timestamp())
+YEAR_SECONDS = 365 * 86400
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--points", type=int, default=1_000_000)
+    parser.add_argument("--sample", type=int, default=20_000)
+    parser.add_argument("--json", help="Ruta donde guardar los resultados")
+    args = parser.parse_args()
+
+    timetable = DEFAULT_TIMETABLE
+    rng = np.random.default_rng(7)
+    points = YEAR_START + rng.integers(0, YEAR_SECONDS, args.points)
+
+    start = time.perf_counter()
+    indices = timetable.block_indices(points)
+    vectorized = time.perf_counter() - start
+
+    sample = [datetime.datetime.fromtimestamp(int(p), pytz.utc) for p in points[:args.sample]]
+    start = time.perf_counter()
+    statuses = [timetable.block_at(moment) for moment in sample]
+    per_point = (time.perf_counter() - start) * args.points / args.sample
+
+    names = [FREE_NAME if i < 0 else timetable.blocks[i]["name"] for i in indices[:args.sample].tolist()]
+    mismatches = sum(status.name != name for status, name in zip(statuses, names))
+    busy = float((indices >= 0).mean())
+
+    results = {
+        "points": args.points,
+        "sample": args.sample,
+        "vectorized_s": vectorized,
+        "per_point_s": per_point,
+        "busy_fraction": busy,
+        "mismatches": mismatches,
+    }
+    print(f"vectorizado: {vectorized:.3f} s | por instante (extrap.): {per_point:.1f} s "
+          f"| {per_point / vectorized:.0f}x | ocupado {busy:.1%} | discrepancias {mismatches}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
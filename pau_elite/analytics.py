@@ -0,0 +1,203 @@
+"""Agregados del historial de repasos: retención por asignatura y cifras por categoría.
+
+Recorre ``review_events`` (unido a ``topics`` para la asignatura y la
+categoría) a trozos con un cursor del servidor, así que la memoria depende de
+asignaturas × tramos de días, no del tamaño del historial. Cada pasada
+recalcula desde cero y reemplaza ``review_retention`` y
+``review_category_stats`` en una sola transacción.
+
+La retención es la fracción de repasos que no se suspenden (nota distinta de
+``bad``) según los días transcurridos desde el repaso anterior: la curva con
+la que se ajustan los intervalos de ``scheduler``.
+
+Se conecta directamente a Postgres (``DATABASE_URL``, la cadena de conexión
+del proyecto de Supabase) con psycopg::
+
+    python -m pau_elite.analytics --chunk-size 50000
+"""
+import argparse
+import os
+import time
+from collections.abc import Iterable, Iterator
+
+import numpy as np
+
+from .scheduler import BAD, MID, OK
+
+CHUNK_SIZE = 50_000
+# Inicio de cada tramo de días transcurridos (el último no tiene tope)
+ELAPSED_BUCKETS = (0, 1, 2, 3, 4, 6, 8, 11, 15, 22, 31, 46, 61, 91, 121, 181, 366)
+
+EVENTS_SQL = """
+select t.subject, t.category, e.rating, e.prior_interval, e.elapsed_days
+from {schema}.review_events e
+join {schema}.topics t on t.id = e.topic_id
+"""
+
+
+class ReviewRollups:
+    """Acumuladores de una pasada por el historial (tamaño fijo por asignatura y categoría)."""
+
+    def __init__(self):
+        self._subjects: dict[str, int] = {}
+        self._categories: dict[str, int] = {}
+        self._edges = np.array(ELAPSED_BUCKETS, dtype=np.int64)
+        # [asignatura, tramo] -> repasos, aciertos
+        self.reviews = np.zeros((0, len(ELAPSED_BUCKETS)), dtype=np.int64)
+        self.recalled = np.zeros((0, len(ELAPSED_BUCKETS)), dtype=np.int64)
+        # [categoría, nota] -> repasos (columna 0 sin uso); sumas de días por categoría
+        self.ratings = np.zeros((0, OK + 1), dtype=np.int64)
+        self.prior_days = np.zeros(0, dtype=np.int64)
+        self.elapsed_days = np.zeros(0, dtype=np.int64)
+        self.events = 0
+
+    @staticmethod
+    def _codes(names: Iterable[str], index: dict[str, int]) -> np.ndarray:
+        return np.fromiter((index.setdefault(n, len(index)) for n in names), dtype=np.int64)
+
+    @staticmethod
+    def _grow(array: np.ndarray, rows: int) -> np.ndarray:
+        if rows <= len(array):
+            return array
+        return np.concatenate([array, np.zeros((rows - len(array), *array.shape[1:]), dtype=array.dtype)])
+
+    def add(self, chunk: list[tuple]):
+        """Suma un trozo de filas ``(subject, category, rating, prior_interval, elapsed_days)``."""
+        if not chunk:
+            return
+        subjects, categories, rating, prior, elapsed = zip(*chunk)
+        self.add_columns(
+            self._codes(subjects, self._subjects),
+            self._codes(categories, self._categories),
+            np.asarray(rating, dtype=np.int64),
+            np.asarray(prior, dtype=np.int64),
+            np.asarray(elapsed, dtype=np.int64),
+        )
+
+    def add_columns(self, subject: np.ndarray, category: np.ndarray, rating: np.ndarray,
+                    prior: np.ndarray, elapsed: np.ndarray):
+        """Como ``add`` pero con columnas ya codificadas (códigos de ``subject_codes``...)."""
+        n_subjects, n_categories, width = len(self._subjects), len(self._categories), len(ELAPSED_BUCKETS)
+        self.reviews = self._grow(self.reviews, n_subjects)
+        self.recalled = self._grow(self.recalled, n_subjects)
+        self.ratings = self._grow(self.ratings, n_categories)
+        self.prior_days = self._grow(self.prior_days, n_categories)
+        self.elapsed_days = self._grow(self.elapsed_days, n_categories)
+
+        bucket = np.searchsorted(self._edges, elapsed, side="right") - 1
+        cell = subject * width + bucket
+        size = n_subjects * width
+        self.reviews += np.bincount(cell, minlength=size).reshape(-1, width)
+        self.recalled += np.bincount(cell[rating != BAD], minlength=size).reshape(-1, width)
+        self.ratings += np.bincount(category * (OK + 1) + rating, minlength=n_categories * (OK + 1)).reshape(-1, OK + 1)
+        self.prior_days += np.bincount(category, weights=prior, minlength=n_categories).astype(np.int64)
+        self.elapsed_days += np.bincount(category, weights=elapsed, minlength=n_categories).astype(np.int64)
+        self.events += len(rating)
+
+    def subject_codes(self, names: Iterable[str]) -> np.ndarray:
+        return self._codes(names, self._subjects)
+
+    def category_codes(self, names: Iterable[str]) -> np.ndarray:
+        return self._codes(names, self._categories)
+
+    def retention_rows(self) -> list[tuple]:
+        """Filas de ``review_retention``: (subject, elapsed_days_min, elapsed_days_max, reviews, recalled)."""
+        rows = []
+        for subject, i in self._subjects.items():
+            for b, start in enumerate(ELAPSED_BUCKETS):
+                if self.reviews[i, b]:
+                    end = ELAPSED_BUCKETS[b + 1] - 1 if b + 1 < len(ELAPSED_BUCKETS) else None
+                    rows.append((subject, start, end, int(self.reviews[i, b]), int(self.recalled[i, b])))
+        return rows
+
+    def category_rows(self) -> list[tuple]:
+        """Filas de ``review_category_stats``: (category, reviews, bad, mid, ok, media intervalo, media días)."""
+        rows = []
+        for category, i in self._categories.items():
+            total = int(self.ratings[i].sum())
+            if total:
+                rows.append((
+                    category, total, int(self.ratings[i, BAD]), int(self.ratings[i, MID]), int(self.ratings[i, OK]),
+                    self.prior_days[i] / total, self.elapsed_days[i] / total,
+                ))
+        return rows
+
+
+def compute(chunks: Iterable[list[tuple]]) -> ReviewRollups:
+    """Agrega un flujo de trozos sin guardar más que los acumuladores."""
+    rollups = ReviewRollups()
+    for chunk in chunks:
+        rollups.add(chunk)
+    return rollups
+
+
+# --- POSTGRES ---
+
+def connect(dsn: str):
+    # psycopg solo lo necesita este trabajo, no la app web
+    import psycopg
+    return psycopg.connect(dsn)
+
+
+def stream_events(conn, schema: str = "public", chunk_size: int = CHUNK_SIZE) -> Iterator[list[tuple]]:
+    """Trozos del historial leídos con un cursor del servidor (``DECLARE ... CURSOR``)."""
+    from psycopg import sql
+
+    query = sql.SQL(EVENTS_SQL).format(schema=sql.Identifier(schema))
+    with conn.cursor(name="review_events_scan") as cur:
+        cur.itersize = chunk_size
+        cur.execute(query)
+        while rows := cur.fetchmany(chunk_size):
+            yield rows
+
+
+def write_rollups(conn, rollups: ReviewRollups, schema: str = "public"):
+    """Reemplaza los agregados en una transacción: los lectores ven la pasada anterior o esta."""
+    from psycopg import sql
+
+    with conn.transaction(), conn.cursor() as cur:
+        for table in ("review_retention", "review_category_stats"):
+            cur.execute(sql.SQL("delete from {}.{}").format(sql.Identifier(schema), sql.Identifier(table)))
+        cur.executemany(
+            sql.SQL(
+                "insert into {}.review_retention (subject, elapsed_days_min, elapsed_days_max, reviews, recalled) "
+                "values (%s, %s, %s, %s, %s)"
+            ).format(sql.Identifier(schema)),
+            rollups.retention_rows(),
+        )
+        cur.executemany(
+            sql.SQL(
+                "insert into {}.review_category_stats "
+                "(category, reviews, bad, mid, ok, mean_prior_interval, mean_elapsed_days) "
+                "values (%s, %s, %s, %s, %s, %s, %s)"
+            ).format(sql.Identifier(schema)),
+            rollups.category_rows(),
+        )
+
+
+def run(dsn: str, schema: str = "public", chunk_size: int = CHUNK_SIZE) -> ReviewRollups:
+    with connect(dsn) as conn:
+        rollups = compute(stream_events(conn, schema, chunk_size))
+        conn.commit()  # cierra la transacción del cursor antes de escribir
+        write_rollups(conn, rollups, schema)
+    return rollups
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dsn", default=os.getenv("DATABASE_URL", ""), help="Cadena de conexión de Postgres")
+    parser.add_argument("--schema", default="public")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+    if not args.dsn:
+        parser.error("Falta --dsn o DATABASE_URL")
+
+    start = time.perf_counter()
+    rollups = run(args.dsn, args.schema, args.chunk_size)
+    elapsed = time.perf_counter() - start
+    print(f"{rollups.events} eventos en {elapsed:.1f} s ({rollups.events / elapsed:,.0f}/s): "
+          f"{len(rollups.retention_rows())} filas de retención, {len(rollups.category_rows())} categorías")
+
+
+if __name__ == "__main__":
+    main()
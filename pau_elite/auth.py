@@ -0,0 +1,172 @@
+"""Sesiones de Supabase Auth: verificación local del JWT y rotación del refresh token.
+
+Restaurar una sesión no toca la red: el ``access_token`` de la cookie se
+verifica en proceso, con ``SUPABASE_JWT_SECRET`` (HS256, proyectos con
+secreto compartido) o con las claves públicas del JWKS del proyecto
+(ES256/RS256), descargado una vez y cacheado ``SUPABASE_JWKS_TTL_SECONDS``.
+Solo un token caducado o próximo a caducar lleva a Supabase, y el refresco
+se hace una sola vez por refresh token aunque lo pidan varias pestañas: el
+refresh token rota en cada uso y reutilizar uno ya gastado revoca la sesión.
+
+Esa coalescencia es por proceso. Con varios workers (``REDIS_URL``), dos
+pestañas atendidas por workers distintos aún pueden rotar el mismo refresh
+token a la vez; si GoTrue no lo tolera (fuera de su intervalo de reutilización),
+la segunda recibe ``invalid_grant`` y esa pestaña pierde la sesión. Evitarlo
+del todo pediría un cerrojo en Redis por refresh token.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import TYPE_CHECKING
+
+from . import metrics
+from .db import SupabaseClient, SupabaseError
+from .single_flight import SingleFlight
+
+# PyJWT se importa al verificar el primer token, no al arrancar el worker
+# (pau_elite lo precarga en segundo plano cuando el servidor ya escucha)
+if TYPE_CHECKING:
+    import jwt
+
+JWKS_TTL_SECONDS = float(os.getenv("SUPABASE_JWKS_TTL_SECONDS", "600"))
+JWT_AUDIENCE = "authenticated"
+JWT_LEEWAY_SECONDS = 30
+ASYMMETRIC_ALGORITHMS = ("ES256", "RS256", "EdDSA")
+# Se refresca con este margen antes del ``exp`` del access token
+REFRESH_MARGIN_SECONDS = float(os.getenv("SESSION_REFRESH_MARGIN_SECONDS", "300"))
+# Espera antes de reintentar un refresco que falló por red o por un 5xx
+REFRESH_RETRY_SECONDS = 30.0
+# Las pestañas que lleguen tarde con el refresh token ya rotado reciben el relevo
+ROTATED_MEMORY_SECONDS = 60.0
+
+SESSION_RESTORES = metrics.counter("pau_session_restores_total", "Sesiones restauradas desde la cookie sin contraseña")
+SESSION_REFRESHES = metrics.counter("pau_session_refreshes_total", "Refrescos del access token contra Supabase")
+SESSION_REFRESHES_SHARED = metrics.counter(
+    "pau_session_refreshes_shared_total", "Refrescos resueltos por otra pestaña con el mismo refresh token"
+)
+JWKS_FETCHES = metrics.counter("pau_jwks_fetches_total", "Descargas del JWKS de Supabase Auth")
+
+logger = logging.getLogger("pau_elite.auth")
+
+
+class InvalidSession(Exception):
+    """Token que no se puede verificar o refresco rechazado: hay que volver a entrar."""
+
+
+class TokenExpired(Exception):
+    """Access token bien firmado pero caducado: se puede refrescar."""
+
+
+class AuthConfigError(Exception):
+    """Falta configuración para verificar el token: el fallo es del servidor, no de la sesión."""
+
+
+def expires_at(token: str) -> float:
+    """``exp`` de un token ya verificado (sin volver a comprobar la firma)."""
+    import jwt
+
+    return float(jwt.decode(token, options={"verify_signature": False}).get("exp", 0))
+
+
+class JwtVerifier:
+    """Verifica access tokens de Supabase en proceso."""
+
+    def __init__(self, secret: str | None = None, jwks_ttl: float = JWKS_TTL_SECONDS):
+        # Sin secreto explícito se lee SUPABASE_JWT_SECRET al verificar (después de cargar .env)
+        self._secret = secret
+        self.jwks_ttl = jwks_ttl
+        self._keys: dict[str, "jwt.PyJWK"] = {}
+        self._fetched_at = float("-inf")
+        self._fetching: asyncio.Task | None = None
+
+    async def verify(self, client: SupabaseClient, token: str) -> dict:
+        """Claims del token; ``TokenExpired`` si caducó, ``InvalidSession`` si no es válido.
+
+        Un token HS256 sin ``SUPABASE_JWT_SECRET`` configurado da ``AuthConfigError``:
+        la cookie no se puede comprobar, pero tampoco es inválida.
+        """
+        import jwt
+
+        try:
+            header = jwt.get_unverified_header(token)
+            alg = header.get("alg")
+            secret = self._secret if self._secret is not None else os.getenv("SUPABASE_JWT_SECRET", "")
+            if alg == "HS256":
+                if not secret:
+                    logger.error("Token HS256 y SUPABASE_JWT_SECRET sin configurar: no se pueden verificar sesiones")
+                    raise AuthConfigError("Falta SUPABASE_JWT_SECRET para verificar tokens HS256")
+                key = secret
+            elif alg in ASYMMETRIC_ALGORITHMS:
+                key = await self._key(client, header.get("kid"))
+            else:
+                raise InvalidSession(f"Algoritmo de firma no admitido: {alg}")
+            return jwt.decode(
+                token, key, algorithms=[alg], audience=JWT_AUDIENCE,
+                leeway=JWT_LEEWAY_SECONDS, options={"require": ["exp", "sub"]},
+            )
+        except jwt.ExpiredSignatureError as e:
+            raise TokenExpired(str(e)) from e
+        except jwt.PyJWTError as e:
+            raise InvalidSession(str(e)) from e
+
+    async def _key(self, client: SupabaseClient, kid: str | None) -> "jwt.PyJWK":
+        stale = time.monotonic() - self._fetched_at > self.jwks_ttl
+        # Un kid desconocido puede ser una rotación de claves: se recarga (una vez por minuto como mucho)
+        unknown = kid not in self._keys and time.monotonic() - self._fetched_at > 60
+        if stale or unknown:
+            if self._fetching is None:
+                self._fetching = asyncio.ensure_future(self._fetch_jwks(client))
+            try:
+                await asyncio.shield(self._fetching)
+            finally:
+                self._fetching = None
+        if kid not in self._keys:
+            raise InvalidSession(f"Clave de firma desconocida: {kid}")
+        return self._keys[kid]
+
+    async def _fetch_jwks(self, client: SupabaseClient):
+        import jwt
+
+        JWKS_FETCHES.inc()
+        jwks = await client.jwks()
+        self._keys = {k["kid"]: jwt.PyJWK(k) for k in jwks.get("keys", []) if k.get("kid")}
+        self._fetched_at = time.monotonic()
+
+
+VERIFIER = JwtVerifier()
+
+# Refrescos en curso y relevos recientes, por refresh token (solo de este proceso)
+_refreshing: SingleFlight[dict] = SingleFlight()
+_rotated: dict[str, tuple[float, dict]] = {}
+
+
+async def refresh(client: SupabaseClient, refresh_token: str) -> dict:
+    """Sesión nueva (``access_token``, ``refresh_token``...) a partir de un refresh token.
+
+    Las pestañas que refrescan a la vez con el mismo token comparten una única
+    llamada, y las que llegan poco después reciben la sesión ya rotada.
+    """
+    now = time.monotonic()
+    for token, (at, _) in list(_rotated.items()):
+        if now - at > ROTATED_MEMORY_SECONDS:
+            del _rotated[token]
+    if refresh_token in _rotated:
+        SESSION_REFRESHES_SHARED.inc()
+        return _rotated[refresh_token][1]
+    if refresh_token in _refreshing:
+        SESSION_REFRESHES_SHARED.inc()
+    return await _refreshing.run(refresh_token, lambda: _rotate(client, refresh_token))
+
+
+async def _rotate(client: SupabaseClient, refresh_token: str) -> dict:
+    SESSION_REFRESHES.inc()
+    try:
+        session = await client.refresh_session(refresh_token)
+    except SupabaseError as e:
+        # Un 4xx es un refresh token gastado o revocado; lo demás (red, 5xx) se reintenta
+        if 400 <= e.status_code < 500:
+            raise InvalidSession(str(e)) from e
+        raise
+    _rotated[refresh_token] = (time.monotonic(), session)
+    return session
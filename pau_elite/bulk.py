@@ -0,0 +1,362 @@
+"""Importación y exportación masiva de temas y notas en CSV o JSONL.
+
+Para academias que dan de alta a grupos enteros. Estas operaciones van
+directas a Postgres (``DATABASE_URL``, como ``analytics``) y leen el fichero
+como flujo: cada fila va a ``COPY ... FROM STDIN`` sobre una tabla temporal,
+sin acumularse en memoria, y un solo ``INSERT ... SELECT`` la pasa a
+``topics`` o ``notes``. El dueño de cada fila se indica con la columna
+``email`` (usuarios ya registrados en Supabase Auth)::
+
+    python -m pau_elite.bulk import topics temas.csv
+    python -m pau_elite.bulk import notes notas.jsonl
+    python -m pau_elite.bulk cohort temario.csv alumnos.csv   # el temario a cada alumno
+    python -m pau_elite.bulk export topics --format jsonl --email ana@academia.es > temas.jsonl
+
+La exportación recorre la tabla con un cursor del servidor y escribe según
+lee. Cada usuario descarga además lo suyo desde la app: ``download_api``
+sirve ``/export/topics.csv`` (o ``.jsonl``, y ``notes``) con una respuesta en
+streaming que pagina PostgREST por keyset con su token.
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+from collections.abc import AsyncIterator, Iterable, Iterator
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+
+from .auth import VERIFIER, InvalidSession, TokenExpired
+from .db import get_client
+from .timetable import today_local
+
+FORMATS = {"csv": "text/csv; charset=utf-8", "jsonl": "application/x-ndjson; charset=utf-8"}
+# Columnas de cada tabla en los ficheros; al importar, las ausentes toman el valor por defecto
+COLUMNS = {
+    "topics": (
+        "subject", "name", "category", "unlocked", "level", "next_review",
+        "ease", "stability", "difficulty", "reps", "last_rating", "last_review",
+    ),
+    "notes": ("text", "created_at"),
+}
+REQUIRED = {"topics": ("email", "subject", "name", "category"), "notes": ("email", "text")}
+SYLLABUS_COLUMNS = ("subject", "name", "category", "position")
+CHUNK_SIZE = 5_000
+EXPORT_PAGE_SIZE = 1_000
+FLUSH_BYTES = 64 * 1024
+# Dónde buscar el email de cada fila (los benchmarks usan una tabla propia)
+USERS_TABLE = "auth.users"
+
+
+# --- FORMATOS ---
+
+def read_records(lines: Iterable[str], fmt: str) -> Iterator[dict]:
+    """Filas de un CSV con cabecera o de un JSONL, una a una (vacío = null)."""
+    if fmt == "csv":
+        records = csv.DictReader(lines)
+    else:
+        records = (json.loads(line) for line in lines if line.strip())
+    for record in records:
+        yield {k.strip(): (None if v == "" else v) for k, v in record.items() if k}
+
+
+def encode_records(records: Iterable[dict], columns: tuple[str, ...], fmt: str, header: bool = True) -> Iterator[str]:
+    """Texto CSV (con cabecera) o JSONL en trozos de unos ``FLUSH_BYTES``."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    if fmt == "csv" and header:
+        writer.writerow(columns)
+    for record in records:
+        if fmt == "csv":
+            writer.writerow(["" if record.get(c) is None else record[c] for c in columns])
+        else:
+            buffer.write(json.dumps({c: record.get(c) for c in columns}, ensure_ascii=False, default=str) + "\n")
+        if buffer.tell() >= FLUSH_BYTES:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def detect_format(path: str, fmt: str | None) -> str:
+    if fmt:
+        return fmt
+    return "jsonl" if path.endswith((".jsonl", ".ndjson")) else "csv"
+
+
+def _checked(records: Iterator[dict], required: tuple[str, ...]) -> Iterator[dict]:
+    """Comprueba las columnas obligatorias con la primera fila y sigue el flujo."""
+    first = next(records, None)
+    if first is None:
+        return
+    missing = [c for c in required if c not in first]
+    if missing:
+        raise ValueError(f"Faltan columnas: {', '.join(missing)}")
+    yield first
+    yield from records
+
+
+# --- POSTGRES ---
+
+def connect(dsn: str):
+    # psycopg solo lo necesitan estas operaciones de administración, no la app web.
+    # Autocommit: cada operación abre su transacción (y con ella caen las tablas temporales)
+    import psycopg
+    return psycopg.connect(dsn, autocommit=True)
+
+
+# Columnas numéricas y fechas: en la tabla temporal todo es texto y se convierte al insertar
+INSERT_SQL = {
+    "topics": """
+insert into {schema}.topics (
+    user_id, subject, name, category, unlocked, level, next_review,
+    ease, stability, difficulty, reps, last_rating, last_review
+)
+select distinct on (u.id, s.subject, s.name)
+    u.id, s.subject, s.name, s.category,
+    coalesce(s.unlocked::boolean, false), coalesce(s.level::integer, 0), coalesce(s.next_review::date, %(today)s),
+    coalesce(s.ease::float8, 2.5), coalesce(s.stability::float8, 0), coalesce(s.difficulty::float8, 0),
+    coalesce(s.reps::integer, 0), s.last_rating, s.last_review::date
+from pg_temp.bulk_stage s
+join {users} u on lower(u.email) = lower(s.email)
+-- Un tema repetido en el fichero: gana la última fila
+order by u.id, s.subject, s.name, s.line desc
+on conflict (user_id, subject, name) do update set
+    category = excluded.category, unlocked = excluded.unlocked, level = excluded.level,
+    next_review = excluded.next_review, ease = excluded.ease, stability = excluded.stability,
+    difficulty = excluded.difficulty, reps = excluded.reps, last_rating = excluded.last_rating,
+    last_review = excluded.last_review
+""",
+    "notes": """
+insert into {schema}.notes (user_id, text, created_at)
+select u.id, s.text, coalesce(s.created_at::timestamptz, now())
+from pg_temp.bulk_stage s
+join {users} u on lower(u.email) = lower(s.email)
+-- Reimportar una exportación no duplica notas (misma fecha y texto)
+where s.created_at is null or not exists (
+    select 1 from {schema}.notes n
+    where n.user_id = u.id and n.created_at = s.created_at::timestamptz and n.text = s.text
+)
+""",
+}
+
+COHORT_SQL = """
+insert into {schema}.topics (user_id, subject, name, category, unlocked, level, next_review)
+select u.id, s.subject, s.name, s.category, false, 0, %(today)s
+from (select distinct lower(email) as email from pg_temp.bulk_students) st
+join {users} u on lower(u.email) = st.email
+cross join (
+    select distinct on (subject, name) subject, name, category, coalesce(position::integer, line) as position
+    from pg_temp.bulk_stage
+    order by subject, name, line desc
+) s
+order by u.id, s.position
+on conflict (user_id, subject, name) do nothing
+"""
+
+UNKNOWN_EMAILS_SQL = """
+select distinct s.email from pg_temp.{stage} s
+left join {users} u on lower(u.email) = lower(s.email)
+where u.id is null and s.email is not null
+order by s.email
+limit 20
+"""
+
+EXPORT_SQL = {
+    "topics": "select u.email, {columns} from {schema}.topics t join {users} u on u.id = t.user_id",
+    "notes": "select u.email, {columns} from {schema}.notes t join {users} u on u.id = t.user_id",
+}
+
+
+def _copy_in(cur, stage: str, columns: tuple[str, ...], records: Iterable[dict]) -> int:
+    """Tabla temporal de texto (con nº de línea) rellenada con COPY fila a fila."""
+    from psycopg import sql
+
+    cur.execute(sql.SQL(
+        "create temp table {} (line bigint generated always as identity, {}) on commit drop"
+    ).format(sql.Identifier(stage), sql.SQL(", ").join(sql.SQL("{} text").format(sql.Identifier(c)) for c in columns)))
+    rows = 0
+    copy_sql = sql.SQL("copy {} ({}) from stdin").format(
+        sql.Identifier(stage), sql.SQL(", ").join(map(sql.Identifier, columns))
+    )
+    with cur.copy(copy_sql) as copy:
+        for record in records:
+            copy.write_row([None if record.get(c) is None else str(record[c]) for c in columns])
+            rows += 1
+    return rows
+
+
+def _names(schema: str, users: str) -> dict:
+    from psycopg import sql
+
+    return {"schema": sql.Identifier(schema), "users": sql.Identifier(*users.split("."))}
+
+
+def _unknown_emails(cur, stage: str, users: str) -> list[str]:
+    from psycopg import sql
+
+    cur.execute(sql.SQL(UNKNOWN_EMAILS_SQL).format(stage=sql.Identifier(stage), users=_names("", users)["users"]))
+    return [r[0] for r in cur.fetchall()]
+
+
+def import_records(conn, table: str, records: Iterable[dict], schema: str = "public", users: str = USERS_TABLE) -> dict:
+    """Importa filas de ``table`` en una transacción; devuelve leídas, escritas y emails sin usuario."""
+    from psycopg import sql
+
+    columns = ("email", *COLUMNS[table])
+    with conn.transaction(), conn.cursor() as cur:
+        read = _copy_in(cur, "bulk_stage", columns, _checked(iter(records), REQUIRED[table]))
+        cur.execute(sql.SQL(INSERT_SQL[table]).format(**_names(schema, users)), {"today": today_local()})
+        written = cur.rowcount
+        unknown = _unknown_emails(cur, "bulk_stage", users)
+    return {"read": read, "written": written, "unknown_emails": unknown}
+
+
+def import_cohort(conn, syllabus: Iterable[dict], students: Iterable[dict], schema: str = "public",
+                  users: str = USERS_TABLE) -> dict:
+    """Copia un temario a cada alumno de la lista (idempotente: los temas que ya tienen no cambian)."""
+    from psycopg import sql
+
+    with conn.transaction(), conn.cursor() as cur:
+        topics = _copy_in(cur, "bulk_stage", SYLLABUS_COLUMNS, _checked(iter(syllabus), SYLLABUS_COLUMNS[:3]))
+        students_read = _copy_in(cur, "bulk_students", ("email",), _checked(iter(students), ("email",)))
+        cur.execute(sql.SQL(COHORT_SQL).format(**_names(schema, users)), {"today": today_local()})
+        written = cur.rowcount
+        unknown = _unknown_emails(cur, "bulk_students", users)
+    return {"topics": topics, "students": students_read, "written": written, "unknown_emails": unknown}
+
+
+def export_records(conn, table: str, emails: list[str] | None = None, schema: str = "public",
+                   chunk_size: int = CHUNK_SIZE, users: str = USERS_TABLE) -> Iterator[dict]:
+    """Filas de ``table`` (con el email del dueño) leídas con un cursor del servidor."""
+    from psycopg import sql
+    from psycopg.rows import dict_row
+
+    query = sql.SQL(EXPORT_SQL[table]).format(
+        **_names(schema, users),
+        columns=sql.SQL(", ").join(sql.Identifier("t", c) for c in COLUMNS[table]),
+    )
+    params = {}
+    if emails:
+        query += sql.SQL(" where lower(u.email) = any(%(emails)s)")
+        params["emails"] = [e.lower() for e in emails]
+    query += sql.SQL(" order by t.user_id, t.id")
+    with conn.transaction(), conn.cursor(name=f"bulk_export_{table}", row_factory=dict_row) as cur:
+        cur.itersize = chunk_size
+        cur.execute(query, params)
+        while rows := cur.fetchmany(chunk_size):
+            yield from rows
+
+
+# --- DESCARGA DESDE LA APP ---
+
+async def _user_pages(table: str, user_id: str, token: str) -> AsyncIterator[list[dict]]:
+    """Páginas de las filas del usuario por keyset sobre ``id`` (PostgREST, con RLS)."""
+    client = get_client()
+    columns = ",".join(("id", *COLUMNS[table]))
+    last = 0
+    while True:
+        res = await (
+            client.table(table, token=token).select(columns).eq("user_id", user_id)
+            .gt("id", last).order("id").limit(EXPORT_PAGE_SIZE).execute()
+        )
+        if res.data:
+            yield res.data
+        if len(res.data) < EXPORT_PAGE_SIZE:
+            return
+        last = res.data[-1]["id"]
+
+
+async def _stream(table: str, fmt: str, user_id: str, token: str) -> AsyncIterator[str]:
+    first = True
+    async for page in _user_pages(table, user_id, token):
+        for chunk in encode_records(page, COLUMNS[table], fmt, header=first):
+            yield chunk
+        first = False
+    if first and fmt == "csv":
+        yield ",".join(COLUMNS[table]) + "\n"
+
+
+def download_api(auth_cookie: str) -> Starlette:
+    """``/export/{tabla}.{formato}`` para el usuario de la cookie de sesión (o del Bearer)."""
+
+    async def export_download(request: Request):
+        table, fmt = request.path_params["table"], request.path_params["fmt"]
+        if table not in COLUMNS or fmt not in FORMATS:
+            return PlainTextResponse("", status_code=404)
+        token = request.cookies.get(auth_cookie) or request.headers.get("authorization", "").removeprefix("Bearer ")
+        try:
+            claims = await VERIFIER.verify(get_client(), token)
+        except (InvalidSession, TokenExpired):
+            return PlainTextResponse("", status_code=401)
+        return StreamingResponse(
+            _stream(table, fmt, claims["sub"], token),
+            media_type=FORMATS[fmt],
+            headers={"Content-Disposition": f'attachment; filename="{table}.{fmt}"'},
+        )
+
+    return Starlette(routes=[Route("/export/{table}.{fmt}", export_download)])
+
+
+# --- LÍNEA DE COMANDOS ---
+
+def _open(path: str):
+    return sys.stdin if path == "-" else open(path, encoding="utf-8", newline="")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dsn", default=os.getenv("DATABASE_URL", ""), help="Cadena de conexión de Postgres")
+    parser.add_argument("--schema", default="public")
+    parser.add_argument("--format", choices=FORMATS, help="Por defecto según la extensión (csv si no es .jsonl)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    imports = commands.add_parser("import", help="Temas o notas de varios usuarios (columna email)")
+    imports.add_argument("table", choices=COLUMNS)
+    imports.add_argument("file", help="Fichero CSV/JSONL o - para la entrada estándar")
+    cohort = commands.add_parser("cohort", help="Un temario (subject, name, category, position) a cada alumno")
+    cohort.add_argument("syllabus")
+    cohort.add_argument("students", help="CSV/JSONL con columna email, o - para la entrada estándar")
+    export = commands.add_parser("export", help="Temas o notas a la salida estándar")
+    export.add_argument("table", choices=COLUMNS)
+    export.add_argument("--email", action="append", help="Solo estos usuarios (repetible)")
+    export.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+    if not args.dsn:
+        parser.error("Falta --dsn o DATABASE_URL")
+    if args.command == "cohort" and args.syllabus == args.students == "-":
+        parser.error("Solo uno de los dos ficheros puede venir de la entrada estándar")
+
+    start = time.perf_counter()
+    with connect(args.dsn) as conn:
+        if args.command == "import":
+            with _open(args.file) as f:
+                result = import_records(conn, args.table, read_records(f, detect_format(args.file, args.format)), args.schema)
+            summary = f"{result['read']} filas leídas, {result['written']} escritas en {args.table}"
+        elif args.command == "cohort":
+            with _open(args.syllabus) as syllabus, _open(args.students) as students:
+                result = import_cohort(
+                    conn,
+                    read_records(syllabus, detect_format(args.syllabus, args.format)),
+                    read_records(students, detect_format(args.students, args.format)),
+                    args.schema,
+                )
+            summary = f"{result['topics']} temas × {result['students']} alumnos: {result['written']} temas nuevos"
+        else:
+            fmt = args.format or "csv"
+            records = export_records(conn, args.table, args.email, args.schema, args.chunk_size)
+            for chunk in encode_records(records, ("email", *COLUMNS[args.table]), fmt):
+                sys.stdout.write(chunk)
+            return
+    print(f"{summary} en {time.perf_counter() - start:.1f} s", file=sys.stderr)
+    if result["unknown_emails"]:
+        print(f"Emails sin usuario en Auth (se omiten): {', '.join(result['unknown_emails'])}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,401 @@
+"""Cliente compartido de Supabase (Auth + PostgREST) para todo el proceso.
+
+Un único pool HTTP asíncrono con keep-alive sirve a todas las sesiones del
+bucle de eventos; el token de cada usuario viaja en la cabecera
+``Authorization`` de cada petición en vez de construir un cliente nuevo por
+usuario.
+
+Encima del pool, un single-flight: lecturas idénticas (misma ruta, filtros y
+token) que coinciden en el tiempo comparten una única petición, y las
+escrituras sobre la misma fila (``id``) se ejecutan de una en una, en orden de
+llegada. Una lectura nunca se suma a otra que empezó antes de la última
+escritura completada sobre su tabla.
+"""
+import asyncio
+import contextlib
+import os
+import time
+import weakref
+from dataclasses import dataclass
+
+import httpx
+
+from . import metrics, tracing
+from .single_flight import SingleFlight
+
+# --- CONFIGURACIÓN DEL POOL ---
+POOL_MAX_CONNECTIONS = int(os.getenv("SUPABASE_POOL_SIZE", "20"))
+POOL_KEEPALIVE_SECONDS = float(os.getenv("SUPABASE_KEEPALIVE_SECONDS", "30"))
+REQUEST_TIMEOUT_SECONDS = float(os.getenv("SUPABASE_TIMEOUT_SECONDS", "10"))
+CALL_TIMEOUT_SECONDS = float(os.getenv("SUPABASE_CALL_TIMEOUT_SECONDS", "15"))
+
+SUPABASE_CALL_SECONDS = metrics.histogram(
+    "pau_supabase_call_seconds", "Duración de cada llamada a Supabase", labels=("operation",)
+)
+SUPABASE_RESPONSE_BYTES = metrics.counter(
+    "pau_supabase_response_bytes_total", "Bytes de respuesta recibidos de Supabase", labels=("operation",)
+)
+SUPABASE_CLIENTS = metrics.counter("pau_supabase_clients_total", "Pools HTTP de Supabase creados")
+READS_DEDUPLICATED = metrics.counter(
+    "pau_supabase_reads_deduplicated_total", "Lecturas servidas por otra idéntica ya en curso", labels=("table",)
+)
+WRITES_SERIALIZED = metrics.counter(
+    "pau_supabase_writes_serialized_total", "Escrituras que esperaron a otra sobre la misma fila", labels=("table",)
+)
+
+
+class SupabaseError(Exception):
+    """Error devuelto por Auth o PostgREST (o llamada que excede su plazo)."""
+
+    def __init__(self, message: str, status_code: int = 0):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+@dataclass
+class PoolStats:
+    """Contadores de uso del pool (peticiones y conexiones TCP abiertas)."""
+
+    requests: int = 0
+    connections_opened: int = 0
+
+    @property
+    def connections_reused(self) -> int:
+        return self.requests - self.connections_opened
+
+    def snapshot(self) -> dict:
+        return {
+            "requests": self.requests,
+            "connections_opened": self.connections_opened,
+            "connections_reused": self.connections_reused,
+        }
+
+
+@dataclass
+class QueryResult:
+    data: list
+    count: int | None = None
+
+
+def quote(value) -> str:
+    """Entrecomilla un valor para usarlo dentro de ``or=(...)``."""
+    escaped = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{escaped}"'
+
+
+def _error_message(response: httpx.Response) -> str:
+    try:
+        body = response.json()
+    except ValueError:
+        return response.text or response.reason_phrase
+    if isinstance(body, dict):
+        return (
+            body.get("message")
+            or body.get("msg")
+            or body.get("error_description")
+            or body.get("error")
+            or str(body)
+        )
+    return str(body)
+
+
+def _operation(method: str, path: str) -> str:
+    """Etiqueta acotada de la llamada: ``GET topics``, ``POST rpc/topic_stats``..."""
+    return f"{method} {path.removeprefix('/rest/v1/').removeprefix('/')}"
+
+
+def _copy_rows(data):
+    # Cada llamador recibe sus propias filas aunque compartan la respuesta
+    return [dict(r) if isinstance(r, dict) else r for r in data] if isinstance(data, list) else data
+
+
+class _KeyedLocks:
+    """Un ``asyncio.Lock`` por clave, creado al pedirlo y borrado cuando nadie lo usa."""
+
+    def __init__(self):
+        self._locks: dict[tuple, list] = {}  # clave -> [lock, usuarios]
+
+    @contextlib.asynccontextmanager
+    async def hold(self, keys: list[tuple]):
+        # Siempre en el mismo orden: dos lotes que comparten filas no se interbloquean
+        entries = []
+        for key in sorted(set(keys), key=repr):
+            entry = self._locks.setdefault(key, [asyncio.Lock(), 0])
+            entry[1] += 1
+            entries.append((key, entry))
+        held = []
+        try:
+            for (table, _), (lock, _) in entries:
+                if lock.locked():
+                    WRITES_SERIALIZED.labels(table).inc()
+                await lock.acquire()
+                held.append(lock)
+            yield
+        finally:
+            for lock in held:
+                lock.release()
+            for key, entry in entries:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._locks[key]
+
+
+class Query:
+    """Constructor mínimo de consultas PostgREST (subconjunto de supabase-py)."""
+
+    def __init__(self, client: "SupabaseClient", table: str, token: str = ""):
+        self._client = client
+        self._table = table
+        self._token = token
+        self._method = "GET"
+        self._params: list[tuple[str, str]] = []
+        self._json = None
+        self._prefer: list[str] = []
+
+    def select(self, columns: str = "*") -> "Query":
+        self._params.append(("select", columns))
+        return self
+
+    def insert(self, rows: dict | list[dict], returning: str = "representation") -> "Query":
+        self._method = "POST"
+        self._json = rows
+        self._prefer.append(f"return={returning}")
+        return self
+
+    def update(self, values: dict, returning: str = "representation") -> "Query":
+        self._method = "PATCH"
+        self._json = values
+        self._prefer.append(f"return={returning}")
+        return self
+
+    def upsert(
+        self,
+        rows: dict | list[dict],
+        on_conflict: str = "id",
+        returning: str = "representation",
+        ignore_duplicates: bool = False,
+    ) -> "Query":
+        self._method = "POST"
+        self._json = rows
+        self._params.append(("on_conflict", on_conflict))
+        resolution = "ignore-duplicates" if ignore_duplicates else "merge-duplicates"
+        self._prefer += [f"resolution={resolution}", f"return={returning}"]
+        return self
+
+    def delete(self, returning: str = "representation") -> "Query":
+        self._method = "DELETE"
+        self._prefer.append(f"return={returning}")
+        return self
+
+    def eq(self, column: str, value) -> "Query":
+        self._params.append((column, f"eq.{value}"))
+        return self
+
+    def gt(self, column: str, value) -> "Query":
+        self._params.append((column, f"gt.{value}"))
+        return self
+
+    def ilike(self, column: str, pattern: str) -> "Query":
+        self._params.append((column, f"ilike.{pattern}"))
+        return self
+
+    def or_(self, filters: str) -> "Query":
+        """Filtro compuesto en sintaxis PostgREST, p. ej. ``a.gt.1,b.eq.2``."""
+        self._params.append(("or", f"({filters})"))
+        return self
+
+    def order(self, column: str, desc: bool = False) -> "Query":
+        # PostgREST admite un único parámetro order con varias columnas
+        term = f"{column}.{'desc' if desc else 'asc'}"
+        for i, (key, value) in enumerate(self._params):
+            if key == "order":
+                self._params[i] = ("order", f"{value},{term}")
+                return self
+        self._params.append(("order", term))
+        return self
+
+    def limit(self, n: int) -> "Query":
+        self._params.append(("limit", str(n)))
+        return self
+
+    def _row_ids(self) -> list:
+        """Filas que toca una escritura: filtro ``id=eq.N`` o los ``id`` del cuerpo."""
+        ids = [value.removeprefix("eq.") for key, value in self._params if key == "id" and value.startswith("eq.")]
+        rows = self._json if isinstance(self._json, list) else [self._json] if isinstance(self._json, dict) else []
+        ids += [str(row["id"]) for row in rows if "id" in row]
+        return ids
+
+    async def _send(self, timeout: float | None) -> list:
+        response = await self._client.request(
+            self._method,
+            f"/rest/v1/{self._table}",
+            token=self._token,
+            params=self._params,
+            json=self._json,
+            prefer=self._prefer,
+            timeout=timeout,
+        )
+        return response.json() if response.content else []
+
+    async def execute(self, timeout: float | None = None) -> QueryResult:
+        client = self._client
+        if self._method == "GET":
+            key = (self._table, tuple(self._params), self._token, client._write_epoch.get(self._table, 0))
+            data = await client._single_flight(key, lambda: self._send(timeout))
+            return QueryResult(data=data)
+        ids = self._row_ids() if not self._table.startswith("rpc/") else []
+        try:
+            if not ids:
+                return QueryResult(data=await self._send(timeout))
+            async with client._row_locks.hold([(self._table, i) for i in ids]):
+                return QueryResult(data=await self._send(timeout))
+        finally:
+            client._write_epoch[self._table] = client._write_epoch.get(self._table, 0) + 1
+
+
+class SupabaseClient:
+    """Pool HTTP asíncrono compartido con Supabase (uno por bucle de eventos)."""
+
+    def __init__(
+        self,
+        url: str,
+        key: str,
+        max_connections: int = POOL_MAX_CONNECTIONS,
+        keepalive_expiry: float = POOL_KEEPALIVE_SECONDS,
+        timeout: float = REQUEST_TIMEOUT_SECONDS,
+    ):
+        self.url = url.rstrip("/")
+        self.key = key
+        self.stats = PoolStats()
+        SUPABASE_CLIENTS.inc()
+        self._flights: SingleFlight[list] = SingleFlight(lambda key: SupabaseError(f"Lectura cancelada ({key[0]})"))
+        self._row_locks = _KeyedLocks()
+        # Escrituras completadas por tabla: las lecturas posteriores no se suman a vuelos anteriores
+        self._write_epoch: dict[str, int] = {}
+        self._http = httpx.AsyncClient(
+            base_url=self.url,
+            headers={"apikey": key},
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=keepalive_expiry,
+            ),
+            timeout=timeout,
+        )
+
+    async def _trace(self, event: str, info: dict):
+        if event == "connection.connect_tcp.complete":
+            self.stats.connections_opened += 1
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        token: str = "",
+        params=None,
+        json=None,
+        prefer: list[str] | None = None,
+        timeout: float | None = None,
+    ) -> httpx.Response:
+        """Lanza una petición con plazo total ``timeout`` (por defecto CALL_TIMEOUT_SECONDS)."""
+        headers = {"Authorization": f"Bearer {token or self.key}"}
+        if prefer:
+            headers["Prefer"] = ",".join(prefer)
+        self.stats.requests += 1
+        operation = _operation(method, path)
+        start = time.perf_counter()
+        nbytes = 0
+        try:
+            response = await asyncio.wait_for(
+                self._http.request(
+                    method,
+                    path,
+                    params=params,
+                    json=json,
+                    headers=headers,
+                    extensions={"trace": self._trace},
+                ),
+                timeout or CALL_TIMEOUT_SECONDS,
+            )
+            nbytes = len(response.content)
+        except (asyncio.TimeoutError, httpx.TimeoutException) as e:
+            raise SupabaseError(f"Supabase no respondió a tiempo ({method} {path})") from e
+        finally:
+            elapsed = time.perf_counter() - start
+            SUPABASE_CALL_SECONDS.labels(operation).observe(elapsed)
+            SUPABASE_RESPONSE_BYTES.labels(operation).inc(nbytes)
+            tracing.record_db_call(operation, elapsed, nbytes)
+        if response.is_error:
+            raise SupabaseError(_error_message(response), response.status_code)
+        return response
+
+    async def _single_flight(self, key: tuple, send) -> list:
+        """Comparte entre llamadas concurrentes con la misma ``key`` una única petición."""
+        if key in self._flights:
+            READS_DEDUPLICATED.labels(key[0]).inc()
+        return _copy_rows(await self._flights.run(key, send))
+
+    def table(self, name: str, token: str = "") -> Query:
+        return Query(self, name, token)
+
+    def rpc(self, fn: str, params: dict | None = None, token: str = "") -> Query:
+        """Llamada a una función de Postgres expuesta por PostgREST."""
+        query = Query(self, f"rpc/{fn}", token)
+        query._method = "POST"
+        query._json = params or {}
+        return query
+
+    async def sign_in_with_password(self, email: str, password: str) -> dict:
+        """Devuelve la sesión de GoTrue (``access_token``, ``user``...)."""
+        response = await self.request(
+            "POST",
+            "/auth/v1/token",
+            params={"grant_type": "password"},
+            json={"email": email, "password": password},
+        )
+        return response.json()
+
+    async def refresh_session(self, refresh_token: str) -> dict:
+        """Canjea un refresh token (que queda gastado) por una sesión nueva."""
+        response = await self.request(
+            "POST",
+            "/auth/v1/token",
+            params={"grant_type": "refresh_token"},
+            json={"refresh_token": refresh_token},
+        )
+        return response.json()
+
+    async def sign_out(self, token: str):
+        """Revoca los refresh tokens de la sesión."""
+        await self.request("POST", "/auth/v1/logout", token=token)
+
+    async def jwks(self) -> dict:
+        """Claves públicas con las que Supabase Auth firma los access tokens."""
+        response = await self.request("GET", "/auth/v1/.well-known/jwks.json")
+        return response.json()
+
+    async def aclose(self):
+        await self._http.aclose()
+
+
+# Las conexiones de httpx pertenecen al bucle que las abrió, así que hay un
+# cliente por bucle (en producción, uno por worker del backend).
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, SupabaseClient]" = weakref.WeakKeyDictionary()
+
+
+def get_client() -> SupabaseClient:
+    """Devuelve el cliente del bucle actual, creándolo en el primer uso."""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = _clients[loop] = SupabaseClient(
+            os.getenv("SUPABASE_URL", ""),
+            os.getenv("SUPABASE_KEY", ""),
+        )
+    return client
+
+
+async def close_client():
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
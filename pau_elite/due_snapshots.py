@@ -0,0 +1,134 @@
+"""Cola de repasos del día siguiente, precalculada antes de la medianoche local.
+
+A medianoche cambia a la vez el conjunto de temas pendientes de todos los
+usuarios. Un trabajo en segundo plano del backend arranca
+``DUE_SNAPSHOT_LEAD_MINUTES`` antes de la medianoche de ``TIMEZONE`` y, para
+cada usuario con temas en la caché de lecturas, calcula los pendientes y las
+cifras del dashboard del día siguiente. Reparte a los usuarios por toda la
+ventana en vez de hacerlos todos de golpe.
+
+Cada instantánea guarda el día y la versión de los datos de los que salió
+(la de ``read_cache``). Una sesión solo la usa si su índice se cargó de esa
+misma versión y no ha cambiado desde entonces; si no, recalcula. Igual que
+la caché de lecturas, vive en el proceso: con varios workers cada uno
+precalcula a los usuarios que ha servido.
+"""
+import asyncio
+import datetime
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from . import metrics
+from .read_cache import READ_CACHE, ReadCache, Version
+from .timetable import TIMEZONE, next_midnight, now_local
+from .topic_store import TopicStore
+
+DUE_SNAPSHOT_LEAD_MINUTES = float(os.getenv("DUE_SNAPSHOT_LEAD_MINUTES", "30"))
+DUE_SNAPSHOT_MAX_USERS = int(os.getenv("DUE_SNAPSHOT_MAX_USERS", "1000"))
+# El trabajo termina este margen antes de la medianoche
+FINISH_MARGIN_SECONDS = 60.0
+
+SNAPSHOT_HITS = metrics.counter("pau_due_snapshot_hits_total", "Cifras del dashboard servidas desde la instantánea")
+SNAPSHOT_MISSES = metrics.counter("pau_due_snapshot_misses_total", "Cifras del dashboard recalculadas en la sesión")
+SNAPSHOTS_BUILT = metrics.counter("pau_due_snapshots_built_total", "Instantáneas del día siguiente precalculadas")
+SNAPSHOT_BUILD_SECONDS = metrics.histogram(
+    "pau_due_snapshot_build_seconds", "Duración de cada instantánea precalculada",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1),
+)
+SNAPSHOT_JOB_SECONDS = metrics.gauge("pau_due_snapshot_job_seconds", "Duración de la última pasada antes de medianoche")
+
+
+@dataclass(frozen=True)
+class DueSnapshot:
+    """Pendientes y cifras del dashboard de un usuario para un día."""
+
+    day: int  # ordinal
+    version: Version | None
+    tasks_due: list[dict]
+    due_count: int
+    overdue_count: int
+    total_progress: int
+    subject_stats: list[dict]
+
+
+def compute_snapshot(store: TopicStore, day: datetime.date, version: Version | None = None) -> DueSnapshot:
+    """Cifras de ``day`` desde el índice (``store.due`` avanza su cola: no pasar el de una sesión con otro día)."""
+    due = store.due(day)
+    return DueSnapshot(
+        day=day.toordinal(),
+        version=version,
+        # Al navegador solo van los campos de la tarjeta, no la fila completa
+        tasks_due=[t.card() for t in due],
+        due_count=len(due),
+        overdue_count=sum(1 for t in due if t.next_review < day.toordinal()),
+        total_progress=store.progress(),
+        subject_stats=store.subject_mastery(),
+    )
+
+
+class DueSnapshots:
+    """LRU de instantáneas por usuario, válidas para un día y una versión de los datos."""
+
+    def __init__(self, max_users: int = DUE_SNAPSHOT_MAX_USERS):
+        self.max_users = max_users
+        self._entries: OrderedDict[str, DueSnapshot] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: str, day: datetime.date, version: Version) -> DueSnapshot | None:
+        """Instantánea de ``day`` si salió de ``version``; el índice sin versión ni la pide (no cuenta como fallo)."""
+        snapshot = self._entries.get(user_id)
+        if snapshot is None or snapshot.day != day.toordinal() or snapshot.version != version:
+            SNAPSHOT_MISSES.inc()
+            return None
+        SNAPSHOT_HITS.inc()
+        return snapshot
+
+    def put(self, user_id: str, snapshot: DueSnapshot):
+        with self._lock:
+            self._entries[user_id] = snapshot
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+DUE_SNAPSHOTS = DueSnapshots()
+
+
+async def build_snapshots(
+    day: datetime.date, window: float, cache: ReadCache = READ_CACHE, snapshots: DueSnapshots = DUE_SNAPSHOTS,
+) -> int:
+    """Precalcula ``day`` para los usuarios de la caché, repartidos a lo largo de ``window`` segundos."""
+    entries = cache.entries()
+    start = time.monotonic()
+    for i, (user_id, data, version) in enumerate(entries):
+        # Cada usuario a su hora dentro de la ventana: el bucle de eventos sigue atendiendo
+        await asyncio.sleep(max(0.0, start + window * i / len(entries) - time.monotonic()))
+        t = time.perf_counter()
+        snapshots.put(user_id, compute_snapshot(TopicStore(data["topics"]), day, version))
+        SNAPSHOT_BUILD_SECONDS.observe(time.perf_counter() - t)
+        SNAPSHOTS_BUILT.inc()
+    return len(entries)
+
+
+async def prefetch_due_snapshots(lead_minutes: float = DUE_SNAPSHOT_LEAD_MINUTES, timezone: str = TIMEZONE):
+    """Trabajo de fondo del backend: una pasada antes de cada medianoche local."""
+    lead = lead_minutes * 60
+    while True:
+        midnight = next_midnight(timezone)
+        await asyncio.sleep(max(0.0, (midnight - now_local(timezone)).total_seconds() - lead))
+        start = time.monotonic()
+        window = max(0.0, (midnight - now_local(timezone)).total_seconds() - FINISH_MARGIN_SECONDS)
+        await build_snapshots(midnight.date(), window)
+        SNAPSHOT_JOB_SECONDS.set(time.monotonic() - start)
+        # Pasada la medianoche se programa la siguiente
+        await asyncio.sleep(max(0.0, (midnight - now_local(timezone)).total_seconds()) + 1)
@@ -0,0 +1,168 @@
+"""Instrumentación de eventos: latencia, llamadas a Supabase, deltas y perfiles.
+
+``EventSpanMiddleware`` abre un span (``tracing.Span``) por evento y al
+terminar exporta la latencia del handler, las llamadas a Supabase que hizo y
+los bytes del delta enviado al navegador; ``counted_var`` declara vars
+computadas con dependencias explícitas que cuentan sus recálculos. Todo se
+publica en ``/metrics`` (formato Prometheus) vía ``metrics_api``.
+
+Con ``STATE_DELTA_LOG=1`` se registra una línea por evento::
+
+    topics_state.toggle_unlock 4.2ms db=1 ['PATCH topics'] (3.6ms) delta=412B (0.1ms) recomputes={'TopicsState.has_tasks': 1}
+
+Con ``PROFILE_HANDLERS=topics_state.review_topic,auth_state.login`` se perfila
+con cProfile una fracción ``PROFILE_SAMPLE_RATE`` de esos eventos y se guarda
+cada perfil en ``PROFILE_DIR`` (se abre con ``python -m pstats``). cProfile
+mide todo el hilo, así que solo hay un perfil activo a la vez.
+"""
+import cProfile
+import functools
+import logging
+import os
+import random
+import time
+
+import reflex as rx
+from reflex.middleware import Middleware
+from reflex.utils import format
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from . import metrics, tracing
+
+DELTA_LOG = os.getenv("STATE_DELTA_LOG", "") == "1"
+PROFILE_HANDLERS = frozenset(h for h in os.getenv("PROFILE_HANDLERS", "").split(",") if h)
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "1.0"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+logger = logging.getLogger("pau_elite.events")
+if (DELTA_LOG or PROFILE_HANDLERS) and not logger.handlers:
+    logger.addHandler(logging.StreamHandler())
+    logger.setLevel(logging.INFO)
+
+EVENT_SECONDS = metrics.histogram(
+    "pau_event_handler_seconds", "Duración de cada evento, de la llegada al último delta", labels=("handler",)
+)
+EVENT_DB_CALLS = metrics.histogram(
+    "pau_event_db_calls", "Llamadas a Supabase por evento",
+    buckets=(0, 1, 2, 3, 4, 6, 8, 12, 20), labels=("handler",),
+)
+EVENT_DB_SECONDS = metrics.histogram(
+    "pau_event_db_seconds", "Tiempo esperando a Supabase por evento", labels=("handler",)
+)
+STATE_DELTA_BYTES = metrics.histogram(
+    "pau_state_delta_bytes", "Bytes del delta de estado enviado al navegador por evento",
+    buckets=(64, 256, 1024, 4096, 16384, 65536, 262144, 1048576), labels=("handler",),
+)
+STATE_RECOMPUTES = metrics.counter(
+    "pau_computed_var_recomputes_total", "Recálculos de vars computadas", labels=("var",)
+)
+
+
+def handler_label(event_name: str) -> str:
+    """``reflex___state____state.pau_elite___pau_elite____topics_state.review_topic`` -> ``topics_state.review_topic``."""
+    state, _, handler = event_name.rpartition(".")
+    return f"{state.rpartition('.')[2].rpartition('___')[2]}.{handler}"
+
+
+def counted_var(deps: list):
+    """``rx.var`` cacheada con dependencias explícitas que cuenta sus recálculos."""
+    def decorator(fn):
+        name = fn.__qualname__
+        recomputes = STATE_RECOMPUTES.labels(name)
+
+        @functools.wraps(fn)
+        def fget(self):
+            start = time.perf_counter()
+            try:
+                return fn(self)
+            finally:
+                recomputes.inc()
+                tracing.record_recompute(name, time.perf_counter() - start)
+
+        return rx.var(deps=deps, auto_deps=False, cache=True)(fget)
+
+    return decorator
+
+
+# --- PERFILES ---
+
+_profiler: tuple[tracing.Span, cProfile.Profile] | None = None
+
+
+def _maybe_profile(span: tracing.Span, state, event):
+    global _profiler
+    if _profiler is not None or span.handler not in PROFILE_HANDLERS or random.random() >= PROFILE_SAMPLE_RATE:
+        return
+    # Un handler en segundo plano vive lo que la pestaña: no se perfila
+    if state._get_event_handler(event)[1].is_background:
+        return
+    profiler = cProfile.Profile()
+    _profiler = (span, profiler)
+    profiler.enable()
+
+
+def _finish_profile(span: tracing.Span):
+    global _profiler
+    if _profiler is None or _profiler[0] is not span:
+        return
+    profiler = _profiler[1]
+    profiler.disable()
+    _profiler = None
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    path = os.path.join(PROFILE_DIR, f"{span.handler}-{time.time_ns()}.prof")
+    profiler.dump_stats(path)
+    logger.info("%s perfil guardado en %s", span.handler, path)
+
+
+# --- MIDDLEWARE ---
+
+class EventSpanMiddleware(Middleware):
+    """Un span por evento: latencia, llamadas a Supabase, delta y recálculos."""
+
+    async def preprocess(self, app, state, event):
+        span = tracing.start(handler_label(event.name))
+        if PROFILE_HANDLERS:
+            _maybe_profile(span, state, event)
+        return None
+
+    async def postprocess(self, app, state, event, update):
+        span = tracing.current()
+        if span is None:
+            return update
+        start = time.perf_counter()
+        span.delta_bytes += len(format.json_dumps(update.delta).encode())
+        span.serialize_seconds += time.perf_counter() - start
+        if update.final:
+            self._finish(span)
+        return update
+
+    @staticmethod
+    def _finish(span: tracing.Span):
+        _finish_profile(span)
+        elapsed = span.elapsed
+        EVENT_SECONDS.labels(span.handler).observe(elapsed)
+        EVENT_DB_CALLS.labels(span.handler).observe(len(span.db_calls))
+        EVENT_DB_SECONDS.labels(span.handler).observe(span.db_seconds)
+        STATE_DELTA_BYTES.labels(span.handler).observe(span.delta_bytes)
+        if DELTA_LOG:
+            logger.info(
+                "%s %.1fms db=%d %s (%.1fms) delta=%dB (%.1fms) recomputes=%s",
+                span.handler, elapsed * 1000, len(span.db_calls), span.db_calls, span.db_seconds * 1000,
+                span.delta_bytes, span.serialize_seconds * 1000, dict(span.recomputes),
+            )
+
+
+# --- ENDPOINT /metrics ---
+
+async def metrics_endpoint(request: Request) -> PlainTextResponse:
+    # Con METRICS_TOKEN definido, el scraper debe enviarlo como Bearer
+    if METRICS_TOKEN and request.headers.get("authorization") != f"Bearer {METRICS_TOKEN}":
+        return PlainTextResponse("", status_code=401)
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+metrics_api = Starlette(routes=[Route("/metrics", metrics_endpoint)])
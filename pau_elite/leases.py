@@ -0,0 +1,40 @@
+"""Turnos de los bucles en segundo plano de cada pestaña.
+
+El estado de la pestaña se guarda (en Redis o en disco), pero el bucle que lo
+atiende (reloj, Realtime, refresco del token, volcado de repasos) vive en un
+worker. Una marca "bucle en marcha" sobrevive a un despliegue o al reinicio
+del worker sin ningún bucle detrás, y la pestaña se queda sin reloj ni
+cambios. Por eso la marca es un turno con dueño: el worker y el bucle que lo
+tienen. Solo cuenta si ese bucle sigue vivo en el worker que atiende el
+evento; si es de otro proceso (uno que ya no existe, o el worker al que
+estaba conectada la pestaña antes de reconectar), se puede reclamar. El
+bucle comprueba en cada vuelta que el turno sigue siendo suyo y, si otro lo
+ha reclamado, termina.
+"""
+import os
+import socket
+import uuid
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+# Turnos de los bucles vivos de este proceso
+_live: set[str] = set()
+
+
+def running(current: str) -> bool:
+    """¿Tiene el turno ``current`` un bucle vivo de este worker?"""
+    return current in _live
+
+
+def claim(current: str) -> str | None:
+    """Un turno nuevo si ``current`` no es de un bucle vivo de este worker; si lo es, None."""
+    if running(current):
+        return None
+    owner = f"{WORKER_ID}:{uuid.uuid4().hex[:8]}"
+    _live.add(owner)
+    return owner
+
+
+def release(current: str, owner: str) -> str:
+    """Valor del turno al terminar el bucle ``owner`` (no borra el de otro que lo reclamó)."""
+    _live.discard(owner)
+    return "" if current == owner else current
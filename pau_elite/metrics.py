@@ -0,0 +1,131 @@
+"""Métricas en proceso (contadores, gauges e histogramas) del backend.
+
+Cada métrica admite etiquetas (``labels=("handler",)`` y luego
+``.labels("topics_state.review_topic")``) y ``render()`` las vuelca en el
+formato de texto de Prometheus para el endpoint ``/metrics``.
+"""
+import bisect
+import threading
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Labelled:
+    """Hijos por combinación de valores de etiqueta (creados en el primer uso)."""
+
+    labelnames: tuple = ()
+
+    def labels(self, *values):
+        values = tuple(str(v) for v in values)
+        child = self.children.get(values)
+        if child is None:
+            with _lock:
+                child = self.children.setdefault(values, self._child())
+        return child
+
+    def samples(self):
+        """Pares (etiquetas, métrica) con valores: los hijos o la propia métrica."""
+        if not self.labelnames:
+            return [({}, self)]
+        return [(dict(zip(self.labelnames, values)), child) for values, child in list(self.children.items())]
+
+
+class Counter(_Labelled):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name, self.help = name, help
+        self.labelnames = labels
+        self.children = {}
+        self.value = 0.0
+
+    def _child(self):
+        return type(self)(self.name, self.help)
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+
+class Histogram(_Labelled):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: tuple = DEFAULT_BUCKETS, labels: tuple = ()):
+        self.name, self.help = name, help
+        self.labelnames = labels
+        self.children = {}
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def _child(self):
+        return Histogram(self.name, self.help, self.buckets)
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+
+REGISTRY: dict[str, Counter | Histogram] = {}
+_lock = threading.Lock()
+
+
+def _register(cls, name: str, help: str, **kwargs):
+    with _lock:
+        if name not in REGISTRY:
+            REGISTRY[name] = cls(name, help, **kwargs)
+        return REGISTRY[name]
+
+
+def counter(name: str, help: str, labels: tuple = ()) -> Counter:
+    return _register(Counter, name, help, labels=labels)
+
+
+def gauge(name: str, help: str, labels: tuple = ()) -> Gauge:
+    return _register(Gauge, name, help, labels=labels)
+
+
+def histogram(name: str, help: str, buckets: tuple = DEFAULT_BUCKETS, labels: tuple = ()) -> Histogram:
+    return _register(Histogram, name, help, buckets=buckets, labels=labels)
+
+
+# --- EXPOSICIÓN PROMETHEUS ---
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_str(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def render() -> str:
+    """Todas las métricas del registro en formato de texto de Prometheus 0.0.4."""
+    lines = []
+    for metric in list(REGISTRY.values()):
+        help_text = metric.help.replace("\\", "\\\\").replace("\n", "\\n")
+        lines += [f"# HELP {metric.name} {help_text}", f"# TYPE {metric.name} {metric.kind}"]
+        for labels, sample in metric.samples():
+            if isinstance(sample, Histogram):
+                cumulative = 0
+                for bound, n in zip((*sample.buckets, "+Inf"), sample.counts):
+                    cumulative += n
+                    lines.append(f"{metric.name}_bucket{_label_str({**labels, 'le': bound})} {cumulative}")
+                lines.append(f"{metric.name}_sum{_label_str(labels)} {sample.sum}")
+                lines.append(f"{metric.name}_count{_label_str(labels)} {sample.count}")
+            else:
+                lines.append(f"{metric.name}{_label_str(labels)} {sample.value}")
+    return "\n".join(lines) + "\n"
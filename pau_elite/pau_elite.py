@@ -1,250 +1,959 @@
 import reflex as rx
+import asyncio
 import datetime
-import pytz
-import os
-from supabase import create_client, Client
+import importlib
+import time
 from dotenv import load_dotenv
 
+from . import leases, metrics
+from .auth import (
+    REFRESH_MARGIN_SECONDS, REFRESH_RETRY_SECONDS, SESSION_RESTORES, VERIFIER, InvalidSession, TokenExpired, expires_at, refresh,
+)
+from .bulk import download_api
+from .db import Query, SupabaseClient, get_client, quote
+from .due_snapshots import DUE_SNAPSHOTS, compute_snapshot, prefetch_due_snapshots
+from .instrumentation import EventSpanMiddleware, counted_var, metrics_api
+from .read_cache import READ_CACHE, version_of
+from .realtime import RESYNC, Subscription, get_hub
+from .scheduler import RATINGS, get_scheduler
+from .timetable import (
+    BLOCK_TYPES, DEFAULT_BLOCKS, DEFAULT_TIMETABLE, MINUTES_PER_DAY, WEEKDAYS,
+    Timetable, format_minute, next_midnight, now_local, parse_hhmm, today_local,
+)
+from .topic_store import TopicStore
+
 load_dotenv()
 
-# --- CONFIGURACIÓN ---
-SUPABASE_URL = os.getenv("SUPABASE_URL", "")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY", "")
-
-# --- DATOS POR DEFECTO ---
-DEFAULT_SYLLABUS = {
-    "Matemáticas II": {"category": "science", "topics": [
-        "1. Límites y Continuidad", "2. Derivadas", "3. Representación de Funciones", 
-        "4. Integral Indefinida", "5. Integral Definida", "6. Matrices", 
-        "7. Determinantes", "8. Sistemas de Ecuaciones", "9. Vectores", 
-        "10. Rectas y Planos", "11. Posiciones Relativas", "12. Ángulos y Distancias"
-    ]},
-    "Física": {"category": "science", "topics": [
-        "Herramientas matemáticas", "Vibraciones: M.A.S.", "Ondas Mecánicas", 
-        "Óptica Geométrica", "Campo Gravitatorio", "Campo Eléctrico", 
-        "Campo Magnético", "Inducción Electromagnética", "Física Moderna", 
-        "Física Cuántica", "Física Nuclear"
-    ]},
-    "Química": {"category": "science", "topics": [
-        "T1: Estructura de la materia", "T2: Enlace Químico", "T3: Termoquímica", 
-        "T4: Cinética Química", "T5: Equilibrio Químico", "T6: Reacciones Ácido-Base", 
-        "T7: Reacciones REDOX", "T8: Química del Carbono"
-    ]},
-    "Historia de España": {"category": "memory", "topics": [
-        "Tema 1: Prehistoria", "Tema 2: Edad Media", "Tema 3: Edad Moderna", 
-        "Tema 4: Crisis Antiguo Régimen", "Tema 5: Estado Liberal", 
-        "Tema 6: Restauración", "Tema 7: SXIX Econ/Soc", "Tema 8: Alfonso XIII", 
-        "Tema 9: Segunda República", "Tema 10: Guerra Civil", "Tema 11: Franquismo", 
-        "Tema 12: Transición", "Tema 13: Democracia", "Tema 14: Europa", "Tema 15: Mundo"
-    ]},
-    "Inglés": {"category": "skills", "topics": [
-        "Grammar: Tenses Mix", "Grammar: Reported Speech", "Grammar: Conditionals", 
-        "Writing: Opinion Essay", "Reading Practice"
-    ]}
+# --- COLA DE REPASOS (write-behind) ---
+REVIEW_FLUSH_SECONDS = 2.0      # espera desde el primer repaso en cola
+REVIEW_FLUSH_MAX_ITEMS = 20     # o volcado inmediato al llegar a N repasos
+REVIEW_RETRY_MAX_SECONDS = 30.0
+# Volcados fallidos seguidos tras los que el bucle para; la cola se conserva y se
+# reintenta con el siguiente repaso, al reconectar o al cerrar sesión
+REVIEW_RETRY_LIMIT = 8
+# Columnas que no cambian y que el upsert necesita para las restricciones NOT NULL
+TOPIC_KEY_FIELDS = ("id", "subject", "name", "category")
+# Clave única de review_events: reintentar un lote no duplica eventos
+REVIEW_EVENT_KEY = "user_id,topic_id,reviewed_at"
+SMALLINT_MAX = 32767
+
+# --- RELOJ ---
+# Cada cuánto comprueba el bucle del reloj que el cliente sigue conectado
+CLOCK_CONNECTION_CHECK_SECONDS = 900
+# Columnas de schedule_blocks que definen un bloque
+SCHEDULE_FIELDS = ("weekday", "start_minute", "end_minute", "type", "name")
+# Despertador del bucle del reloj por pestaña (al editar el horario)
+_clock_wakeups: dict[str, asyncio.Event] = {}
+# Suscripción Realtime de cada pestaña (para cortarla al cerrar sesión)
+_realtime_subs: dict[str, Subscription] = {}
+# Ambos son del worker que corre el bucle; si el evento llega a otro worker, el
+# bucle lo nota en su siguiente vuelta al releer el estado (compartido en Redis)
+
+# Cuenta atrás en el navegador: lee data-countdown-end (epoch ms) cada segundo
+COUNTDOWN_JS = """
+if (!window.__pauCountdown) {
+  window.__pauCountdown = setInterval(() => {
+    document.querySelectorAll("[data-countdown-end]").forEach((el) => {
+      const end = Number(el.dataset.countdownEnd);
+      if (!end) { el.textContent = "--:--"; return; }
+      const left = Math.max(0, Math.floor((end - Date.now()) / 1000));
+      const pad = (n) => String(n).padStart(2, "0");
+      el.textContent = `${pad(Math.floor(left / 3600))}:${pad(Math.floor(left / 60) % 60)}:${pad(left % 60)}`;
+    });
+  }, 1000);
 }
+"""
+
+# --- TEMARIO ---
+SYLLABUS_PAGE_SIZE = 50
+SYLLABUS_COLUMNS = ("id", "subject", "name", "unlocked")
+
+# --- NOTAS ---
+NOTES_PAGE_SIZE = 20
+NOTE_COLUMNS = ("id", "text", "created_at")
+# Las notas del plan gratuito caben siempre en la primera página
+FREE_NOTE_LIMIT = 3
+# El scroll infinito pide la página siguiente a menos de estos píxeles del final
+NOTES_SCROLL_MARGIN_PX = 300
+NOTES_SCROLL_ID = "notes-scroll"
+
+NOTES_SCROLL_JS = f"""
+(() => {{
+  const el = document.getElementById("{NOTES_SCROLL_ID}");
+  return !!el && el.scrollTop + el.clientHeight >= el.scrollHeight - {NOTES_SCROLL_MARGIN_PX};
+}})()
+"""
+
+
+def _note_card(row: dict) -> dict:
+    # Solo lo que pinta la tarjeta (sin el tsvector de búsqueda)
+    return {k: row.get(k) for k in NOTE_COLUMNS}
+
+
+# --- SESIÓN Y EXPORTACIÓN ---
+# Nombre fijo de la cookie del token: la lee también /export (bulk.download_api)
+AUTH_COOKIE = "pau_auth_token"
+# Descargas de bulk.download_api: la cookie de sesión solo viaja si el backend
+# sirve también el frontend (python -m pau_elite.serve), como en producción
+EXPORT_URL = f"{rx.config.get_config().api_url}/export"
+
+
+REVIEW_QUEUE_DEPTH = metrics.gauge("pau_review_queue_depth", "Repasos en cola pendientes de escribir")
+REVIEW_FLUSH_LATENCY = metrics.histogram("pau_review_flush_seconds", "Duración de cada volcado de repasos")
+REVIEW_FLUSHED = metrics.counter("pau_review_flushed_total", "Repasos escritos en Supabase")
+REVIEW_FLUSH_FAILURES = metrics.counter("pau_review_flush_failures_total", "Volcados de repasos fallidos")
+REVIEW_EVENTS = metrics.counter("pau_review_events_total", "Eventos de repaso añadidos al historial")
+REVIEW_REJECTED = metrics.counter("pau_review_rejected_total", "Repasos descartados porque Supabase los rechazó (4xx)")
+
+
+def _is_rejection(error: Exception) -> bool:
+    """4xx que reintentar no arregla (tema borrado, fila inválida); 401, 408 y 429 pueden pasar solos."""
+    status = getattr(error, "status_code", 0)
+    return 400 <= status < 500 and status not in (401, 408, 429)
 
 # ==========================================
 # 🧠 STATE (Lógica del Negocio)
 # ==========================================
+# Un subestado por área: un evento solo carga y serializa su rama, y el
+# delta de una tecla o de un tic del reloj no arrastra las listas de temas.
 
 class State(rx.State):
-    # Sesión
-    auth_token: str = rx.Cookie("")
+    """Identidad de la sesión, compartida por todos los subestados."""
+
+    auth_token: str = rx.Cookie("", name=AUTH_COOKIE, same_site="strict")
+    refresh_token: str = rx.Cookie("", same_site="strict")
     user_id: str = ""
     is_logged_in: bool = False
-    
-    # Datos Principales
-    topics: list[dict] = []
-    notes: list[dict] = []
-    
-    # Estado del Dashboard
-    current_block_name: str = "Cargando..."
-    current_block_type: str = "free"
-    time_remaining: str = "--:--"
-    target_hour_display: str = ""
-    
-    # Freemium
     is_premium: bool = False 
-    show_upgrade_dialog: bool = False
 
-    # Inputs
+    # --- CONEXIÓN SUPABASE ---
+    
+    @property
+    def supabase(self) -> SupabaseClient:
+        return get_client()
+
+    def _table(self, name: str) -> Query:
+        """Consulta sobre el pool compartido con el token del usuario."""
+        return self.supabase.table(name, token=self.auth_token)
+
+    def _invalidate_reads(self):
+        """Tras una escritura propia la próxima carga vuelve a Supabase."""
+        READ_CACHE.invalidate(self.user_id)
+
+    def _client_connected(self) -> bool:
+        namespace = app.event_namespace
+        return namespace is None or self.router.session.client_token in namespace.token_to_sid
+
+    def _set_session(self, session: dict):
+        self.auth_token = session["access_token"]
+        self.refresh_token = session["refresh_token"]
+
+
+class AuthState(State):
+    """Formulario de acceso, login, logout y restauración de la sesión."""
+
     email: str = ""
     password: str = ""
-    new_note_text: str = ""
-    search_query: str = ""
+    _refresh_loop: str = ""  # turno de keep_session_fresh (leases)
 
-    # --- COMPUTED VARS ---
-    
-    @rx.var
-    def tasks_due(self) -> list[dict]:
-        """Filtra y devuelve SOLO las tareas que hay que hacer hoy."""
-        today = str(datetime.date.today())
-        return [
-            t for t in self.topics 
-            if t["unlocked"] and t["next_review"] <= today
-        ]
+    async def _verified_claims(self) -> dict:
+        """Claims del access token de la cookie, refrescándolo si caducó."""
+        if self.auth_token:
+            try:
+                return await VERIFIER.verify(self.supabase, self.auth_token)
+            except TokenExpired:
+                pass
+        if not self.refresh_token:
+            raise InvalidSession("Sesión caducada")
+        self._set_session(await refresh(self.supabase, self.refresh_token))
+        return await VERIFIER.verify(self.supabase, self.auth_token)
 
-    @rx.var
-    def total_progress(self) -> int:
-        """Calcula el % de maestría total."""
-        if not self.topics: 
-            return 0
-        total_levels = len(self.topics) * 5
-        current_levels = sum(t["level"] for t in self.topics)
-        return int((current_levels / total_levels) * 100) if total_levels > 0 else 0
+    async def restore_session(self):
+        """Recupera la sesión de la cookie al cargar la página, sin contraseña."""
+        if self.is_logged_in:
+            # Reconexión (p. ej. tras un despliegue): los bucles de la pestaña pueden
+            # haber muerto con su worker; cada uno sale solo si ya hay uno vivo
+            return [
+                AuthState.keep_session_fresh, ClockState.run_clock,
+                TopicsState.listen_changes, TopicsState.flush_reviews_later,
+            ]
+        if not (self.auth_token or self.refresh_token):
+            return
+        try:
+            claims = await self._verified_claims()
+        except InvalidSession:
+            self.auth_token = self.refresh_token = ""
+            return
+        except Exception:
+            # Supabase no responde o falta configuración (AuthConfigError): se muestra el login y la cookie se conserva
+            return
+        self.user_id = claims["sub"]
+        self.is_logged_in = True
+        SESSION_RESTORES.inc()
+        topics = await self.get_state(TopicsState)
+        clock = await self.get_state(ClockState)
+        topics._keep_reviews_of(self.user_id)
+        # Las pestañas que restauran a la vez comparten una descarga (caché de lecturas)
+        await asyncio.gather(topics.load_data(), clock.load_schedule())
+        return [AuthState.keep_session_fresh, TopicsState.flush_reviews_later]
 
-    # --- CONEXIÓN SUPABASE ---
-    
-    @property
-    def supabase(self) -> Client:
-        return create_client(SUPABASE_URL, SUPABASE_KEY)
+    @rx.event(background=True)
+    async def keep_session_fresh(self):
+        """Rota el access token antes de que caduque mientras la pestaña siga abierta."""
+        async with self:
+            if not self.is_logged_in or (owner := leases.claim(self._refresh_loop)) is None:
+                return
+            self._refresh_loop = owner
+        try:
+            while True:
+                async with self:
+                    if not self.is_logged_in or not self.refresh_token or self._refresh_loop != owner:
+                        return
+                    user_id, refresh_token = self.user_id, self.refresh_token
+                    wait = expires_at(self.auth_token) - REFRESH_MARGIN_SECONDS - time.time()
+                if wait > 0:
+                    await asyncio.sleep(min(wait, CLOCK_CONNECTION_CHECK_SECONDS))
+                    if not self._client_connected():
+                        return
+                    continue
+                # La llamada va fuera del lock; las pestañas del mismo usuario la comparten
+                try:
+                    session = await refresh(self.supabase, refresh_token)
+                except InvalidSession:
+                    async with self:
+                        self.auth_token = self.refresh_token = ""
+                        self.is_logged_in = False
+                    return
+                except Exception:
+                    await asyncio.sleep(REFRESH_RETRY_SECONDS)
+                    continue
+                async with self:
+                    if self.user_id != user_id or not self.is_logged_in:
+                        return
+                    self._set_session(session)
+                await get_hub().update_token(user_id, session["access_token"])
+        finally:
+            async with self:
+                self._refresh_loop = leases.release(self._refresh_loop, owner)
 
-    def login(self):
+    async def login(self):
+        topics = await self.get_state(TopicsState)
+        clock = await self.get_state(ClockState)
         try:
-            res = self.supabase.auth.sign_in_with_password({
-                "email": self.email, 
-                "password": self.password
-            })
-            self.auth_token = res.session.access_token
-            self.user_id = res.user.id
+            res = await self.supabase.sign_in_with_password(self.email, self.password)
+            self._set_session(res)
+            self.user_id = res["user"]["id"]
             self.is_logged_in = True
-            self.check_initial_data()
-            self.load_data()
+            topics._keep_reviews_of(self.user_id)
+            await topics.check_initial_data()
+            await asyncio.gather(topics.load_stats(), clock.load_schedule())
         except Exception as e:
-            return rx.window_alert(f"Error de acceso: {str(e)}")
+            yield rx.window_alert(f"Error de acceso: {str(e)}")
+            return
+        # Las tarjetas se pintan ya; la lista completa de temas llega después
+        yield
+        try:
+            await topics.load_data()
+        except Exception as e:
+            # La sesión ya es válida: se sigue dentro y "Sincronizar" vuelve a cargar
+            yield rx.window_alert(f"Error al cargar los temas: {str(e)}")
+        yield [AuthState.keep_session_fresh, TopicsState.flush_reviews_later]
 
-    def logout(self):
-        self.auth_token = ""
+    async def logout(self):
+        topics = await self.get_state(TopicsState)
+        # La cola se vacía antes de perder el token; si Supabase no responde, se
+        # conserva y se escribe al volver a entrar con la misma cuenta
+        saved = await topics._flush_reviews()
+        try:
+            await self.supabase.sign_out(self.auth_token)
+        except Exception:
+            pass  # el access token caduca solo; lo importante es olvidarlo aquí
+        self.auth_token = self.refresh_token = ""
         self.is_logged_in = False
-        self.topics = []
-        self.notes = []
+        # El bucle de listen_changes despierta, ve la sesión cerrada y suelta el canal
+        if (sub := _realtime_subs.get(self.router.session.client_token)) is not None:
+            sub.resync()
+        (await self.get_state(NotesState))._reset()
+        (await self.get_state(SyllabusState))._reset()
+        topics._store.clear()
+        topics._store_version = None
+        topics._refresh_topic_stats()
+        (await self.get_state(ClockState))._set_schedule(DEFAULT_BLOCKS, saved=False)
+        if not saved:
+            return rx.window_alert("No se pudieron guardar tus últimos repasos: se guardarán al volver a entrar.")
+
+
+class TopicsState(State):
+    """Índice de temas, cola de repasos y cifras del dashboard."""
 
-    def check_initial_data(self):
+    _store: TopicStore = TopicStore()
+    _pending_reviews: dict[int, dict] = {}
+    # Historial: un evento por clic, aunque el mismo tema se repase varias veces en la cola
+    _pending_events: list[dict] = []
+    _flush_loop: str = ""  # turno de flush_reviews_later (leases)
+    _flush_failures: int = 0
+    _realtime_loop: str = ""  # turno de listen_changes (leases)
+    # Versión de read_cache de la que salió el índice; None tras un cambio local
+    _store_version: dict | None = None
+    # Día (ordinal) al que corresponden las cifras del dashboard
+    _stats_day: int = 0
+
+    # Derivados del TopicStore (se actualizan en cada cambio de temas)
+    tasks_due: list[dict] = []
+    total_progress: int = 0
+
+    # Tarjetas del dashboard: primero del RPC topic_stats, luego del índice local
+    due_count: int = 0
+    overdue_count: int = 0
+    subject_stats: list[dict] = []
+
+    @counted_var(deps=["tasks_due"])
+    def has_tasks(self) -> bool:
+        return len(self.tasks_due) > 0
+
+    # --- TEMAS ---
+
+    def _refresh_topic_stats(self):
+        """Pendientes de hoy y % de maestría: de la instantánea precalculada o del índice."""
+        today = today_local()
+        snapshot = None
+        # Un índice sin versión (editado tras cargarlo, o vacío) no puede tener instantánea: ni se consulta
+        if self._store_version is not None:
+            snapshot = DUE_SNAPSHOTS.get(self.user_id, today, self._store_version)
+        snapshot = snapshot or compute_snapshot(self._store, today)
+        self.tasks_due = list(snapshot.tasks_due)
+        self.total_progress = snapshot.total_progress
+        self.due_count = snapshot.due_count
+        self.overdue_count = snapshot.overdue_count
+        self.subject_stats = list(snapshot.subject_stats)
+        self._stats_day = snapshot.day
+
+    def _with_pending(self, row: dict) -> dict:
+        """Fila leída de Supabase con el repaso aún en cola encima (es más reciente)."""
+        return {**row, **self._pending_reviews.get(row["id"], {})}
+
+    async def _apply_topic_rows(self, rows: list[dict]):
+        """Aplica filas devueltas por Supabase al índice y a la página del temario."""
+        self._store_version = None
+        for row in rows:
+            self._store.upsert(row)
+        self._refresh_topic_stats()
+        (await self.get_state(SyllabusState))._patch_page(rows)
+
+    async def _apply_changes(self, changes: list[dict]):
+        """Aplica cambios de Realtime (de este u otro dispositivo) en orden."""
+        notes = await self.get_state(NotesState)
+        syllabus = await self.get_state(SyllabusState)
+        topic_rows = {}
+        topics_changed = False
+        for change in changes:
+            record, old = change["record"], change["old_record"]
+            if change["table"] == "topics":
+                topics_changed = True
+                if change["type"] == "DELETE":
+                    topic_rows.pop(old.get("id"), None)
+                    self._store.remove(old.get("id"))
+                    syllabus._drop_from_page(old.get("id"))
+                else:
+                    topic_rows[record["id"]] = self._with_pending(record)
+            else:
+                notes._apply_change(change)
+        # Un lote solo de notas no toca el índice de temas ni su caché de lecturas
+        if topics_changed:
+            await self._apply_topic_rows(list(topic_rows.values()))
+            self._invalidate_reads()
+
+    @rx.event(background=True)
+    async def listen_changes(self):
+        """Recibe los cambios de topics y notes del usuario mientras la pestaña siga abierta."""
+        async with self:
+            if not self.is_logged_in or (owner := leases.claim(self._realtime_loop)) is None:
+                return
+            self._realtime_loop = owner
+            user_id, token = self.user_id, self.auth_token
+        sub = _realtime_subs[self.router.session.client_token] = await get_hub().subscribe(user_id, token)
+        try:
+            while True:
+                batch = await sub.next_batch(CLOCK_CONNECTION_CHECK_SECONDS)
+                if batch == []:
+                    if not self._client_connected():
+                        return
+                    continue
+                async with self:
+                    if self.user_id != user_id or not self.is_logged_in or self._realtime_loop != owner:
+                        return
+                    if batch is RESYNC:
+                        # Ráfaga o reconexión: una recarga en vez de cambios sueltos
+                        await self.load_data(revalidate=True)
+                    else:
+                        await self._apply_changes(batch)
+        finally:
+            _realtime_subs.pop(self.router.session.client_token, None)
+            await sub.close()
+            async with self:
+                self._realtime_loop = leases.release(self._realtime_loop, owner)
+
+    # --- CARGA ---
+
+    async def check_initial_data(self):
+        """Siembra el temario en el primer login (RPC idempotente en Postgres)."""
         if not self.user_id: 
             return
         
-        res = self.supabase.table("topics").select("id").eq("user_id", self.user_id).execute()
-        if len(res.data) == 0:
-            bulk_data = []
-            for subj, info in DEFAULT_SYLLABUS.items():
-                for topic_name in info["topics"]:
-                    bulk_data.append({
-                        "user_id": self.user_id,
-                        "subject": subj,
-                        "name": topic_name,
-                        "category": info["category"],
-                        "unlocked": False,
-                        "level": 0,
-                        "next_review": str(datetime.date.today())
-                    })
-            self.supabase.table("topics").insert(bulk_data).execute()
-
-    def load_data(self):
+        res = await self._table("topics").select("id").eq("user_id", self.user_id).limit(1).execute()
+        if not res.data:
+            await self.supabase.rpc(
+                "seed_user_syllabus", {"p_today": str(today_local())}, token=self.auth_token
+            ).execute()
+            self._invalidate_reads()
+
+    async def load_stats(self):
+        """Cifras del dashboard agregadas en Postgres (pocos bytes por asignatura)."""
+        res = await self.supabase.rpc(
+            "topic_stats", {"p_today": str(today_local())}, token=self.auth_token
+        ).execute()
+        topics = sum(r["topics"] for r in res.data)
+        levels = sum(r["levels"] for r in res.data)
+        self.total_progress = levels * 100 // (topics * 5) if topics else 0
+        self.due_count = sum(r["due"] for r in res.data)
+        self.overdue_count = sum(r["overdue"] for r in res.data)
+        self.subject_stats = [{"subject": r["subject"], "mastery": r["mastery"]} for r in res.data]
+
+    async def _fetch_user_data(self) -> dict[str, list[dict]]:
+        # Las notas no entran: se paginan al abrir su pestaña
+        res = await self._table("topics").select("*").eq("user_id", self.user_id).order("id").execute()
+        return {"topics": res.data}
+
+    async def _data_version(self) -> dict:
+        res = await self.supabase.rpc("data_version", {}, token=self.auth_token).execute()
+        return {r["table_name"]: (r["rows"], r["updated_at"]) for r in res.data if r["table_name"] == "topics"}
+
+    async def load_data(self, revalidate: bool = False):
+        """Temas del usuario, vía la caché de lecturas compartida."""
         if not self.is_logged_in: 
             return
-        t_res = self.supabase.table("topics").select("*").eq("user_id", self.user_id).order("id").execute()
-        self.topics = t_res.data
-        n_res = self.supabase.table("notes").select("*").eq("user_id", self.user_id).order("created_at", desc=True).execute()
-        self.notes = n_res.data
-
-    # --- LOGICA DEL RELOJ Y HORARIO ---
-
-    def update_clock(self):
-        tz = pytz.timezone('Europe/Madrid')
-        now = datetime.datetime.now(tz)
-        weekday = now.weekday()
-        hour = now.hour + now.minute / 60.0
-
-        b_type, b_name, end_h = "free", "⏳ Tiempo Libre", 0.0
-
-        if weekday in [0, 1, 2, 3]:  # L-J
-            if 16.0 <= hour < 17.5: 
-                b_type, b_name, end_h = "science", "🔄 Tareas / Estudio", 17.5
-            elif 17.5 <= hour < 19.0: 
-                b_type, b_name, end_h = "gym", "🏋️ Gimnasio", 19.0
-            elif 19.0 <= hour < 20.5: 
-                b_type, b_name, end_h = "science", "🧪 Bloque Ciencia", 20.5
-            elif 21.5 <= hour < 23.0: 
-                b_type, b_name, end_h = "memory", "🧠 Bloque Memoria", 23.0
-            elif hour >= 23.0: 
-                b_type, b_name, end_h = "sleep", "😴 Dormir", 24.0
-        elif weekday == 5:  # Sábado
-            if 9.5 <= hour < 13.5: 
-                b_type, b_name, end_h = "simulacro", "📝 SIMULACRO REAL", 13.5
-        
-        self.current_block_name = b_name
-        self.current_block_type = b_type
-        
-        if end_h > 0:
-            target_dt = now.replace(hour=int(end_h), minute=int((end_h % 1) * 60), second=0)
-            diff = target_dt - now
-            if diff.total_seconds() > 0:
-                mins, secs = divmod(diff.total_seconds(), 60)
-                hours, mins = divmod(mins, 60)
-                self.time_remaining = f"{int(hours):02}:{int(mins):02}:{int(secs):02}"
-                self.target_hour_display = f"Fin: {int(end_h):02}:{int((end_h % 1) * 60):02}"
-            else:
-                self.time_remaining = "00:00:00"
-        else:
-            self.time_remaining = "--:--"
-            self.target_hour_display = ""
+        data = await READ_CACHE.get(self.user_id, self._fetch_user_data, self._data_version, revalidate)
+        # Con repasos en cola el índice ya no es el de esa versión (sin instantánea)
+        self._store.load([self._with_pending(row) for row in data["topics"]] if self._pending_reviews else data["topics"])
+        self._store_version = None if self._pending_reviews else version_of(data)
+        self._refresh_topic_stats()
+        syllabus = await self.get_state(SyllabusState)
+        if syllabus._syllabus_cursors:
+            await syllabus.load_syllabus()
+        notes = await self.get_state(NotesState)
+        if notes._notes_cursor is not None:
+            await notes.load_notes()
+
+    async def resync(self):
+        # Sincronizar salta el TTL pero solo descarga si algo cambió
+        await self.load_data(revalidate=True)
 
     # --- LOGICA DE REPASO ---
 
-    def review_topic(self, topic_id: int, rating: str):
-        topic_idx = next((i for i, t in enumerate(self.topics) if t["id"] == topic_id), -1)
-        if topic_idx == -1: 
+    async def review_topic(self, topic_id: int, rating: str):
+        topic = self._store.get(topic_id)
+        if topic is None or rating not in RATINGS: 
             return
 
-        topic = self.topics[topic_idx]
-        new_level = topic["level"]
-        today = datetime.date.today()
-        
-        if rating == "ok":
-            new_level = min(topic["level"] + 1, 5)
-            days = (new_level * 5) + 3
-            next_rev = today + datetime.timedelta(days=days)
-        elif rating == "mid":
-            days = 3
-            next_rev = today + datetime.timedelta(days=days)
-        elif rating == "bad":
-            new_level = 1
-            days = 1
-            next_rev = today + datetime.timedelta(days=days)
-        else:
-            days = 1
-            next_rev = today + datetime.timedelta(days=days)
-            
-        self.supabase.table("topics").update({
-            "level": new_level,
-            "next_review": str(next_rev),
-            "extra_queue": False
-        }).eq("id", topic_id).execute()
-        
-        self.load_data()
+        row = topic.to_row()
+        changes = get_scheduler().review(row, rating, today_local())
+        changes["extra_queue"] = False
+        # El repaso se ve al instante; la escritura va a la cola
+        await self._apply_topic_rows([{**row, **changes}])
+        if topic_id not in self._pending_reviews:
+            REVIEW_QUEUE_DEPTH.inc()
+        self._pending_reviews[topic_id] = {
+            "user_id": self.user_id,
+            **{k: row[k] for k in TOPIC_KEY_FIELDS},
+            **changes,
+        }
+        last = topic.last_review
+        self._pending_events.append({
+            "user_id": self.user_id,
+            "topic_id": topic_id,
+            "rating": RATINGS[rating],
+            "reviewed_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "prior_interval": min(topic.next_review - last, SMALLINT_MAX) if last else 0,
+            "elapsed_days": min(today_local().toordinal() - last, SMALLINT_MAX) if last else 0,
+        })
 
-    def toggle_unlock(self, topic_id: int, current_val: bool):
-        self.supabase.table("topics").update({
+        if len(self._pending_reviews) >= REVIEW_FLUSH_MAX_ITEMS:
+            await self._flush_reviews()
+        elif not leases.running(self._flush_loop):
+            return TopicsState.flush_reviews_later
+
+    def _take_pending_reviews(self) -> tuple[list[dict], list[dict]]:
+        rows, events = list(self._pending_reviews.values()), self._pending_events
+        self._pending_reviews = {}
+        self._pending_events = []
+        return rows, events
+
+    def _requeue_reviews(self, rows: list[dict], events: list[dict]):
+        """Devuelve a la cola un lote fallido sin pisar repasos más recientes."""
+        for row in rows:
+            if row["id"] in self._pending_reviews:
+                REVIEW_QUEUE_DEPTH.dec()
+            else:
+                self._pending_reviews[row["id"]] = row
+        self._pending_events = events + self._pending_events
+        self._flush_failures += 1
+
+    async def _upsert_reviews(self, rows: list[dict], events: list[dict]) -> str:
+        """Upsert por id de los temas e insert de los eventos sin duplicados: reintentar el lote es idempotente.
+
+        Devuelve "ok", "retry" (red, 5xx, token caducado) o "rejected" (4xx).
+        """
+        start = time.perf_counter()
+        writes = []
+        if rows:
+            writes.append(self._table("topics").upsert(rows, returning="minimal").execute())
+        if events:
+            writes.append(self._table("review_events").upsert(
+                events, on_conflict=REVIEW_EVENT_KEY, returning="minimal", ignore_duplicates=True
+            ).execute())
+        try:
+            await asyncio.gather(*writes)
+        except Exception as e:
+            REVIEW_FLUSH_FAILURES.inc()
+            return "rejected" if _is_rejection(e) else "retry"
+        finally:
+            REVIEW_FLUSH_LATENCY.observe(time.perf_counter() - start)
+        REVIEW_QUEUE_DEPTH.dec(len(rows))
+        REVIEW_FLUSHED.inc(len(rows))
+        REVIEW_EVENTS.inc(len(events))
+        self._invalidate_reads()
+        return "ok"
+
+    async def _write_reviews(self, rows: list[dict], events: list[dict]) -> tuple[list[dict], list[dict]]:
+        """Escribe un lote y devuelve lo que queda por reintentar.
+
+        Si Supabase rechaza el lote, se escribe tema a tema y solo se descartan
+        los temas rechazados (p. ej. uno borrado desde otro dispositivo).
+        """
+        if not rows and not events:
+            return [], []
+        outcome = await self._upsert_reviews(rows, events)
+        if outcome == "retry":
+            return rows, events
+        if outcome == "ok":
+            return [], []
+        topic_ids = list(dict.fromkeys([r["id"] for r in rows] + [e["topic_id"] for e in events]))
+        if len(topic_ids) == 1:
+            REVIEW_QUEUE_DEPTH.dec(len(rows))
+            REVIEW_REJECTED.inc(max(len(rows), 1))
+            return [], []
+        retry_rows, retry_events = [], []
+        for topic_id in topic_ids:
+            left_rows, left_events = await self._write_reviews(
+                [r for r in rows if r["id"] == topic_id], [e for e in events if e["topic_id"] == topic_id]
+            )
+            retry_rows += left_rows
+            retry_events += left_events
+        return retry_rows, retry_events
+
+    async def _flush_reviews(self) -> bool:
+        """Vuelca la cola ya; False si queda algo por reintentar (lo rechazado se descarta)."""
+        rows, events = self._take_pending_reviews()
+        if not rows and not events:
+            return True
+        rows, events = await self._write_reviews(rows, events)
+        if rows or events:
+            self._requeue_reviews(rows, events)
+            return False
+        self._flush_failures = 0
+        return True
+
+    def _keep_reviews_of(self, user_id: str):
+        """Tras un login, descarta la cola que dejó otra cuenta en esta pestaña."""
+        stale = [topic_id for topic_id, row in self._pending_reviews.items() if row["user_id"] != user_id]
+        for topic_id in stale:
+            del self._pending_reviews[topic_id]
+        REVIEW_QUEUE_DEPTH.dec(len(stale))
+        self._pending_events = [e for e in self._pending_events if e["user_id"] == user_id]
+        self._flush_failures = 0
+
+    @rx.event(background=True)
+    async def flush_reviews_later(self):
+        async with self:
+            if (owner := leases.claim(self._flush_loop)) is None:
+                return
+            self._flush_loop = owner
+        delay = REVIEW_FLUSH_SECONDS
+        try:
+            while True:
+                await asyncio.sleep(delay)
+                async with self:
+                    if self._flush_loop != owner or not self.is_logged_in:
+                        return
+                    rows, events = self._take_pending_reviews()
+                # La escritura va fuera del lock para no bloquear los clics de la sesión
+                left_rows, left_events = await self._write_reviews(rows, events)
+                failed = bool(left_rows or left_events)
+                async with self:
+                    if failed:
+                        self._requeue_reviews(left_rows, left_events)
+                    else:
+                        self._flush_failures = 0
+                    # Sigue mientras quede algo (repasos nuevos o un lote que reintentar),
+                    # pero sin reintentar sin fin un fallo que no se arregla solo
+                    if not self._pending_reviews or not self.is_logged_in:
+                        return
+                    if self._flush_failures >= REVIEW_RETRY_LIMIT:
+                        return
+                    delay = min(REVIEW_FLUSH_SECONDS * 2 ** self._flush_failures, REVIEW_RETRY_MAX_SECONDS)
+                # Con la pestaña cerrada no se reintenta; la cola sigue en su estado
+                # y restore_session relanza el bucle al reconectar
+                if failed and not self._client_connected():
+                    return
+        finally:
+            async with self:
+                self._flush_loop = leases.release(self._flush_loop, owner)
+
+
+# Hermano de TopicsState, no hijo: buscar o pasar de página no carga el índice de temas
+class SyllabusState(State):
+    """Temario paginado por keyset sobre (subject, id)."""
+
+    syllabus_page: list[dict] = []
+    syllabus_has_next: bool = False
+    syllabus_page_number: int = 0
+    search_query: str = ""
+    # Cursor de inicio de cada página visitada (None = primera página)
+    _syllabus_cursors: list = []
+
+    @counted_var(deps=["syllabus_page_number"])
+    def page_label(self) -> str:
+        return f"Página {self.syllabus_page_number + 1}"
+
+    def _reset(self):
+        self.syllabus_page = []
+        self._syllabus_cursors = []
+
+    def _patch_page(self, rows: list[dict]):
+        """Refleja en la página visible las filas de temas que han cambiado."""
+        visible = {t["id"]: i for i, t in enumerate(self.syllabus_page)}
+        for row in rows:
+            if row["id"] in visible:
+                self.syllabus_page[visible[row["id"]]] = {k: row[k] for k in SYLLABUS_COLUMNS}
+
+    def _drop_from_page(self, topic_id: int):
+        self.syllabus_page = [t for t in self.syllabus_page if t["id"] != topic_id]
+
+    async def _fetch_syllabus_page(self, after: list | None):
+        query = self._table("topics").select(",".join(SYLLABUS_COLUMNS)).eq("user_id", self.user_id)
+        # La búsqueda se resuelve en Postgres (índice trigram sobre topics.name)
+        term = self.search_query.strip().replace("*", "").replace("%", "")
+        if term:
+            query = query.ilike("name", f"*{term}*")
+        if after:
+            subject, topic_id = after
+            query = query.or_(
+                f"subject.gt.{quote(subject)},and(subject.eq.{quote(subject)},id.gt.{topic_id})"
+            )
+        res = await query.order("subject").order("id").limit(SYLLABUS_PAGE_SIZE + 1).execute()
+        self.syllabus_has_next = len(res.data) > SYLLABUS_PAGE_SIZE
+        self.syllabus_page = res.data[:SYLLABUS_PAGE_SIZE]
+        self.syllabus_page_number = len(self._syllabus_cursors) - 1
+
+    async def load_syllabus(self):
+        self._syllabus_cursors = [None]
+        await self._fetch_syllabus_page(None)
+
+    async def next_syllabus_page(self):
+        if not self.syllabus_has_next:
+            return
+        last = self.syllabus_page[-1]
+        cursor = [last["subject"], last["id"]]
+        self._syllabus_cursors.append(cursor)
+        await self._fetch_syllabus_page(cursor)
+
+    async def prev_syllabus_page(self):
+        if len(self._syllabus_cursors) <= 1:
+            return
+        self._syllabus_cursors.pop()
+        await self._fetch_syllabus_page(self._syllabus_cursors[-1])
+
+    async def search_syllabus(self, value: str):
+        self.search_query = value
+        await self.load_syllabus()
+
+    async def toggle_unlock(self, topic_id: int, current_val: bool):
+        res = await self._table("topics").update({
             "unlocked": not current_val
         }).eq("id", topic_id).execute()
-        self.load_data()
+        self._invalidate_reads()
+        topics = await self.get_state(TopicsState)
+        await topics._apply_topic_rows([topics._with_pending(row) for row in res.data])
+
+
+class NotesState(State):
+    """Cuaderno de notas rápidas, paginado por keyset y con búsqueda en Postgres."""
+
+    notes: list[dict] = []
+    # Total de notas del usuario, sin el filtro de la búsqueda
+    note_count: int = 0
+    new_note_text: str = ""
+    notes_query: str = ""
+    notes_has_more: bool = False
+    # Fin de la última página: [created_at, id], o [rank, id] al buscar (None = sin cargar)
+    _notes_cursor: list | None = None
 
-    def add_note(self):
-        if not self.is_premium and len(self.notes) >= 3:
-            self.show_upgrade_dialog = True
+    @counted_var(deps=["note_count", State.is_premium])
+    def note_limit_reached(self) -> bool:
+        return not self.is_premium and self.note_count >= FREE_NOTE_LIMIT
+
+    def _reset(self):
+        self.notes = []
+        self.note_count = 0
+        self.notes_query = ""
+        self.notes_has_more = False
+        self._notes_cursor = None
+
+    def _apply_change(self, change: dict):
+        # Sin la pestaña abierta no hay nada que parchear: se leerá al abrirla
+        if self._notes_cursor is None:
+            return
+        record, old = change["record"], change["old_record"]
+        if change["type"] == "DELETE":
+            if any(n["id"] == old.get("id") for n in self.notes):
+                self.note_count = max(0, self.note_count - 1)
+            self.notes = [n for n in self.notes if n["id"] != old.get("id")]
+        elif any(n["id"] == record["id"] for n in self.notes):
+            self.notes = [_note_card(record) if n["id"] == record["id"] else n for n in self.notes]
+        elif not self.notes_query:
+            self.notes = [_note_card(record)] + self.notes
+            self.note_count += 1
+
+    async def _fetch_notes_page(self):
+        term = self.notes_query.strip()
+        after = self._notes_cursor or None
+        if term:
+            # Orden por relevancia (índice GIN sobre notes.search)
+            params = {"p_query": term, "p_limit": NOTES_PAGE_SIZE + 1}
+            if after:
+                params |= {"p_after_rank": after[0], "p_after_id": after[1]}
+            res = await self.supabase.rpc("search_notes", params, token=self.auth_token).execute()
+        else:
+            query = self._table("notes").select(",".join(NOTE_COLUMNS)).eq("user_id", self.user_id)
+            if after:
+                created_at, note_id = after
+                query = query.or_(
+                    f"created_at.lt.{quote(created_at)},and(created_at.eq.{quote(created_at)},id.lt.{note_id})"
+                )
+            res = await query.order("created_at", desc=True).order("id", desc=True).limit(NOTES_PAGE_SIZE + 1).execute()
+        page = res.data[:NOTES_PAGE_SIZE]
+        self.notes_has_more = len(res.data) > NOTES_PAGE_SIZE
+        if page:
+            last = page[-1]
+            self._notes_cursor = [last["rank"] if term else last["created_at"], last["id"]]
+        elif self._notes_cursor is None:
+            self._notes_cursor = []
+        self.notes = self.notes + [_note_card(n) for n in page]
+
+    async def _count_notes(self):
+        res = await self.supabase.rpc("data_version", {}, token=self.auth_token).execute()
+        self.note_count = next((r["rows"] for r in res.data if r["table_name"] == "notes"), 0)
+
+    async def load_notes(self):
+        """Primera página (al abrir la pestaña, al buscar o al resincronizar)."""
+        self.notes = []
+        self._notes_cursor = None
+        await self._fetch_notes_page()
+        if not self.notes_query.strip():
+            # Sin filtro y sin más páginas, la lista es el total; si no, se cuenta aparte
+            if self.notes_has_more:
+                await self._count_notes()
+            else:
+                self.note_count = len(self.notes)
+
+    async def load_more_notes(self):
+        # Los eventos de una pestaña se atienden de uno en uno: no hay dos páginas a la vez
+        if self.notes_has_more:
+            await self._fetch_notes_page()
+
+    async def notes_scrolled(self, near_end: bool):
+        """Scroll infinito: el navegador avisa de si está cerca del final de la lista."""
+        if near_end:
+            await self.load_more_notes()
+
+    async def search_notes(self, value: str):
+        self.notes_query = value
+        await self.load_notes()
+
+    async def add_note(self):
+        if self._notes_cursor is None:
+            await self.load_notes()
+        # Otra pestaña pudo añadir o borrar notas: el tope se mira con el total actual
+        if not self.is_premium:
+            await self._count_notes()
+        if self.note_limit_reached:
+            (await self.get_state(UIState)).show_upgrade_dialog = True
             return
 
         if self.new_note_text:
-            self.supabase.table("notes").insert({
+            res = await self._table("notes").insert({
                 "user_id": self.user_id, 
                 "text": self.new_note_text
             }).execute()
             self.new_note_text = ""
-            self.load_data()
+            self.note_count += len(res.data)
+            # Las notas van ordenadas por created_at desc: la nueva va primero
+            if not self.notes_query:
+                self.notes = [_note_card(n) for n in res.data] + self.notes
     
-    def delete_note(self, note_id: int):
-        self.supabase.table("notes").delete().eq("id", note_id).execute()
-        self.load_data()
+    async def delete_note(self, note_id: int):
+        await self._table("notes").delete(returning="minimal").eq("id", note_id).execute()
+        self.notes = [n for n in self.notes if n["id"] != note_id]
+        self.note_count = max(0, self.note_count - 1)
+
+
+class ClockState(State):
+    """Bloque actual del horario y editor del horario semanal."""
+
+    # La cuenta atrás la pinta el navegador
+    current_block_name: str = "Cargando..."
+    current_block_type: str = "free"
+    block_end_ms: int = 0  # fin del bloque en epoch ms; 0 = sin cuenta atrás
+    target_hour_display: str = ""
+    _clock_loop: str = ""  # turno de run_clock (leases)
+
+    # Horario semanal: schedule_blocks del usuario o DEFAULT_BLOCKS si no tiene
+    schedule_blocks: list[dict] = []
+    _timetable: Timetable = DEFAULT_TIMETABLE
+    _schedule_saved: bool = False
+
+    def _set_schedule(self, rows: list[dict], saved: bool):
+        """Compila el horario y prepara la lista del editor."""
+        self._timetable = Timetable(rows)
+        self._schedule_saved = saved
+        self.schedule_blocks = [
+            {
+                "index": i,
+                "day": WEEKDAYS[b["weekday"]],
+                "hours": f"{format_minute(b['start_minute'])}–{format_minute(b['end_minute'])}",
+                "type": b["type"],
+                "name": b["name"],
+            }
+            for i, b in enumerate(self._timetable.blocks)
+        ]
+
+    async def load_schedule(self):
+        res = await self._table("schedule_blocks").select(",".join(("id", *SCHEDULE_FIELDS))).eq("user_id", self.user_id).execute()
+        self._set_schedule(res.data or DEFAULT_BLOCKS, saved=bool(res.data))
+        self._reschedule_clock()
+
+    async def _save_schedule(self, rows: list[dict]) -> list[dict]:
+        """Inserta bloques nuevos y devuelve las filas con su id."""
+        res = await self._table("schedule_blocks").insert([
+            {"user_id": self.user_id, **{k: b[k] for k in SCHEDULE_FIELDS}} for b in rows
+        ]).execute()
+        return res.data
+
+    async def add_schedule_block(self, form_data: dict):
+        try:
+            block = {
+                "weekday": WEEKDAYS.index(form_data["weekday"]),
+                "start_minute": parse_hhmm(form_data["start"]),
+                # Un fin a las 00:00 es la medianoche del mismo día
+                "end_minute": parse_hhmm(form_data["end"]) or MINUTES_PER_DAY,
+                "type": form_data["type"],
+                "name": form_data["name"].strip() or form_data["type"],
+            }
+            # Compilar antes de escribir detecta solapes y horas invertidas
+            Timetable([*self._timetable.blocks, block])
+        except (KeyError, ValueError) as e:
+            return rx.window_alert(f"Bloque no válido: {e}")
+        if self._schedule_saved:
+            rows = [*self._timetable.blocks, *await self._save_schedule([block])]
+        else:
+            # El primer cambio guarda también el horario por defecto
+            rows = await self._save_schedule([*self._timetable.blocks, block])
+        self._set_schedule(rows, saved=True)
+        self._reschedule_clock()
+
+    async def delete_schedule_block(self, index: int):
+        blocks = self._timetable.blocks
+        remaining = blocks[:index] + blocks[index + 1:]
+        if self._schedule_saved:
+            await self._table("schedule_blocks").delete(returning="minimal").eq("id", blocks[index]["id"]).execute()
+        elif remaining:
+            remaining = await self._save_schedule(remaining)
+        # Sin bloques guardados se vuelve al horario por defecto
+        self._set_schedule(remaining or DEFAULT_BLOCKS, saved=bool(remaining))
+        self._reschedule_clock()
+
+    def _reschedule_clock(self):
+        """Aplica el horario nuevo ya y despierta al bucle para que recalcule."""
+        self.update_clock()
+        wakeup = _clock_wakeups.get(self.router.session.client_token)
+        if wakeup is not None:
+            wakeup.set()
+
+    def update_clock(self) -> datetime.datetime:
+        """Fija el bloque vigente y devuelve cuándo cambia el siguiente."""
+        status = self._timetable.block_at(now_local())
+        self.current_block_name = status.name
+        self.current_block_type = status.type
+        self.block_end_ms = int(status.ends_at.timestamp() * 1000) if status.ends_at else 0
+        self.target_hour_display = status.end_label
+        return status.next_transition
+
+    async def _roll_day(self):
+        """Pasa el dashboard al día nuevo (desde la instantánea precalculada si sigue vigente)."""
+        topics = await self.get_state(TopicsState)
+        if topics._stats_day and topics._stats_day != today_local().toordinal():
+            topics._refresh_topic_stats()
+
+    @rx.event(background=True)
+    async def run_clock(self):
+        """Emite solo en las fronteras de bloque; la cuenta atrás es del navegador."""
+        async with self:
+            if (owner := leases.claim(self._clock_loop)) is None:
+                return
+            self._clock_loop = owner
+        token = self.router.session.client_token
+        wakeup = _clock_wakeups.setdefault(token, asyncio.Event())
+        try:
+            while True:
+                async with self:
+                    if self._clock_loop != owner:
+                        return
+                    next_transition = self.update_clock()
+                    await self._roll_day()
+                # También despierta a medianoche: cambian los repasos pendientes
+                next_transition = min(next_transition, next_midnight())
+                while (remaining := (next_transition - now_local()).total_seconds()) > 0:
+                    try:
+                        await asyncio.wait_for(wakeup.wait(), min(remaining, CLOCK_CONNECTION_CHECK_SECONDS))
+                    except asyncio.TimeoutError:
+                        if not self._client_connected():
+                            return
+                    else:
+                        # Horario editado: recalcula la siguiente frontera
+                        wakeup.clear()
+                        break
+        finally:
+            _clock_wakeups.pop(token, None)
+            async with self:
+                self._clock_loop = leases.release(self._clock_loop, owner)
+
+
+class UIState(State):
+    """Pestañas y diálogo de mejora de plan."""
+
+    show_upgrade_dialog: bool = False
+
+    async def open_tab(self, tab: str):
+        # El temario solo se pide la primera vez que se abre su pestaña
+        if tab == "tab2":
+            syllabus = await self.get_state(SyllabusState)
+            if not syllabus._syllabus_cursors:
+                await syllabus.load_syllabus()
+        # Igual las notas: un usuario con miles de notas entra tan rápido como uno nuevo
+        elif tab == "tab3":
+            notes = await self.get_state(NotesState)
+            if notes._notes_cursor is None:
+                await notes.load_notes()
 
     def upgrade_to_premium(self):
         self.is_premium = True 
@@ -263,20 +972,20 @@ def login_page():
                 rx.text("Tu segundo cerebro para Selectividad", color="gray", size="2"),
                 rx.input(
                     placeholder="Email", 
-                    on_change=State.set_email, 
+                    on_change=AuthState.set_email, 
                     size="3", 
                     width="100%"
                 ),
                 rx.input(
                     placeholder="Password", 
                     type="password", 
-                    on_change=State.set_password, 
+                    on_change=AuthState.set_password, 
                     size="3", 
                     width="100%"
                 ),
                 rx.button(
                     "Iniciar Sesión", 
-                    on_click=State.login, 
+                    on_click=AuthState.login, 
                     width="100%", 
                     size="3", 
                     variant="solid"
@@ -353,21 +1062,21 @@ def task_card(topic: dict):
             rx.hstack(
                 rx.button(
                     "Fácil", 
-                    on_click=lambda: State.review_topic(topic["id"], "ok"), 
+                    on_click=lambda: TopicsState.review_topic(topic["id"], "ok"), 
                     flex="1", 
                     color_scheme="grass", 
                     variant="soft"
                 ),
                 rx.button(
                     "Regular", 
-                    on_click=lambda: State.review_topic(topic["id"], "mid"), 
+                    on_click=lambda: TopicsState.review_topic(topic["id"], "mid"), 
                     flex="1", 
                     color_scheme="amber", 
                     variant="soft"
                 ),
                 rx.button(
                     "Difícil", 
-                    on_click=lambda: State.review_topic(topic["id"], "bad"), 
+                    on_click=lambda: TopicsState.review_topic(topic["id"], "bad"), 
                     flex="1", 
                     color_scheme="tomato", 
                     variant="soft"
@@ -385,7 +1094,7 @@ def syllabus_row(topic: dict):
     return rx.hstack(
         rx.checkbox(
             checked=topic["unlocked"], 
-            on_change=lambda x: State.toggle_unlock(topic["id"], topic["unlocked"])
+            on_change=lambda x: SyllabusState.toggle_unlock(topic["id"], topic["unlocked"])
         ),
         rx.vstack(
             rx.text(topic["name"], weight="medium", font_size="0.95em"),
@@ -405,6 +1114,34 @@ def syllabus_row(topic: dict):
         align_items="center"
     )
 
+def schedule_row(block: dict):
+    return rx.hstack(
+        rx.badge(block["day"], variant="soft", min_width="6em"),
+        rx.text(block["hours"], font_variant_numeric="tabular-nums", size="2", color="gray"),
+        rx.text(block["name"], weight="medium"),
+        rx.spacer(),
+        rx.button(
+            rx.icon("trash"), 
+            on_click=lambda: ClockState.delete_schedule_block(block["index"]), 
+            variant="ghost", 
+            color_scheme="red",
+            size="1"
+        ),
+        width="100%",
+        padding="0.6em",
+        border_bottom="1px solid #222",
+        align_items="center"
+    )
+
+def export_links(table: str):
+    return rx.hstack(
+        *(
+            rx.link(rx.button(rx.icon("download"), fmt.upper(), variant="soft", size="1"), href=f"{EXPORT_URL}/{table}.{fmt}")
+            for fmt in ("csv", "jsonl")
+        ),
+        spacing="2"
+    )
+
 def main_dashboard():
     return rx.hstack(
         # --- SIDEBAR ---
@@ -426,14 +1163,15 @@ def main_dashboard():
                         weight="bold", 
                         color="gray"
                     ),
-                    rx.text(State.current_block_name, weight="bold", size="3"),
+                    rx.text(ClockState.current_block_name, weight="bold", size="3"),
                     rx.heading(
-                        State.time_remaining, 
+                        "--:--", 
+                        custom_attrs={"data-countdown-end": ClockState.block_end_ms},
                         size="7", 
                         color_scheme="tomato", 
                         font_variant_numeric="tabular-nums"
                     ),
-                    rx.text(State.target_hour_display, size="1", color="gray"),
+                    rx.text(ClockState.target_hour_display, size="1", color="gray"),
                     align_items="center",
                     spacing="1"
                 ),
@@ -442,9 +1180,16 @@ def main_dashboard():
             ),
             
             rx.spacer(),
+            rx.button(
+                "Sincronizar", 
+                on_click=TopicsState.resync, 
+                variant="ghost", 
+                color_scheme="gray", 
+                width="100%"
+            ),
             rx.button(
                 "Cerrar Sesión", 
-                on_click=State.logout, 
+                on_click=AuthState.logout, 
                 variant="ghost", 
                 color_scheme="gray", 
                 width="100%"
@@ -456,7 +1201,7 @@ def main_dashboard():
             border_right="1px solid #222",
             position="sticky",
             top="0",
-            on_mount=State.update_clock
+            on_mount=[ClockState.run_clock, TopicsState.listen_changes]
         ),
         
         # --- MAIN CONTENT ---
@@ -465,18 +1210,32 @@ def main_dashboard():
                 # Stats Header
                 rx.grid(
                     stat_card("TEMA ACTUAL", "Repaso", "🎯", "blue"),
-                    stat_card("PENDIENTES", f"{State.tasks_due.length()}", "🔥", "tomato"),
-                    stat_card("MAESTRÍA", f"{State.total_progress}%", "📈", "green"),
+                    stat_card("PENDIENTES", f"{TopicsState.due_count}", "🔥", "tomato"),
+                    stat_card("MAESTRÍA", f"{TopicsState.total_progress}%", "📈", "green"),
                     columns="3",
                     spacing="4",
                     width="100%"
                 ),
+                rx.hstack(
+                    rx.cond(
+                        TopicsState.overdue_count > 0,
+                        rx.badge(f"{TopicsState.overdue_count} atrasados", color_scheme="tomato", variant="soft"),
+                    ),
+                    rx.foreach(
+                        TopicsState.subject_stats,
+                        lambda s: rx.badge(f"{s['subject']}: {s['mastery']}%", variant="outline")
+                    ),
+                    wrap="wrap",
+                    spacing="2",
+                    width="100%"
+                ),
                 
                 rx.tabs.root(
                     rx.tabs.list(
                         rx.tabs.trigger("🚀 Misión de Hoy", value="tab1"),
                         rx.tabs.trigger("📚 Temario", value="tab2"),
                         rx.tabs.trigger("📓 Notas Rápidas", value="tab3"),
+                        rx.tabs.trigger("🗓️ Horario", value="tab4"),
                         size="2"
                     ),
                     
@@ -485,8 +1244,8 @@ def main_dashboard():
                         rx.vstack(
                             rx.heading("Tareas Prioritarias", size="5", margin_y="0.5em"),
                             rx.cond(
-                                State.tasks_due.length() > 0,
-                                rx.foreach(State.tasks_due, task_card),
+                                TopicsState.has_tasks,
+                                rx.foreach(TopicsState.tasks_due, task_card),
                                 rx.card(
                                     rx.vstack(
                                         rx.heading("¡Todo limpio!", size="6"), 
@@ -510,20 +1269,48 @@ def main_dashboard():
                     # TAB 2: TEMARIO
                     rx.tabs.content(
                         rx.vstack(
-                            rx.heading("Gestión del Temario", size="5"),
-                            rx.input(
-                                placeholder="Filtrar temas...", 
-                                on_change=State.set_search_query, 
-                                variant="soft"
+                            rx.hstack(
+                                rx.heading("Gestión del Temario", size="5"),
+                                export_links("topics"),
+                                justify="between",
+                                align_items="center",
+                                width="100%"
+                            ),
+                            rx.debounce_input(
+                                rx.input(
+                                    placeholder="Filtrar temas...", 
+                                    value=SyllabusState.search_query,
+                                    on_change=SyllabusState.search_syllabus, 
+                                    variant="soft"
+                                ),
+                                debounce_timeout=300
                             ),
                             rx.scroll_area(
                                 rx.vstack(
-                                    rx.foreach(State.topics, syllabus_row),
+                                    rx.foreach(SyllabusState.syllabus_page, syllabus_row),
                                     width="100%"
                                 ),
                                 type="always",
                                 scrollbars="vertical",
                                 style={"height": "500px"}
+                            ),
+                            rx.hstack(
+                                rx.button(
+                                    "Anterior", 
+                                    on_click=SyllabusState.prev_syllabus_page, 
+                                    disabled=SyllabusState.syllabus_page_number == 0, 
+                                    variant="soft"
+                                ),
+                                rx.text(SyllabusState.page_label, size="2", color="gray"),
+                                rx.button(
+                                    "Siguiente", 
+                                    on_click=SyllabusState.next_syllabus_page, 
+                                    disabled=~SyllabusState.syllabus_has_next, 
+                                    variant="soft"
+                                ),
+                                justify="between",
+                                align_items="center",
+                                width="100%"
                             )
                         ),
                         value="tab2",
@@ -533,38 +1320,101 @@ def main_dashboard():
                     # TAB 3: NOTAS
                     rx.tabs.content(
                         rx.vstack(
-                            rx.heading("Cuaderno de Notas", size="5"),
+                            rx.hstack(
+                                rx.heading("Cuaderno de Notas", size="5"),
+                                export_links("notes"),
+                                justify="between",
+                                align_items="center",
+                                width="100%"
+                            ),
                             rx.hstack(
                                 rx.input(
                                     placeholder="Nueva idea...", 
-                                    value=State.new_note_text,
-                                    on_change=State.set_new_note_text, 
+                                    value=NotesState.new_note_text,
+                                    on_change=NotesState.set_new_note_text, 
                                     width="100%"
                                 ),
-                                rx.button("Guardar", on_click=State.add_note)
+                                rx.button("Guardar", on_click=NotesState.add_note)
                             ),
-                            rx.foreach(
-                                State.notes,
-                                lambda n: rx.card(
-                                    rx.hstack(
-                                        rx.text(n["text"]),
-                                        rx.spacer(),
-                                        rx.button(
-                                            rx.icon("trash"), 
-                                            on_click=lambda: State.delete_note(n["id"]), 
-                                            variant="ghost", 
-                                            color_scheme="red",
-                                            size="1"
+                            rx.cond(
+                                NotesState.note_limit_reached,
+                                rx.text("Has llegado a las 3 notas del plan gratuito.", size="1", color="gray"),
+                            ),
+                            rx.debounce_input(
+                                rx.input(
+                                    placeholder="Buscar en tus notas...", 
+                                    value=NotesState.notes_query,
+                                    on_change=NotesState.search_notes, 
+                                    variant="soft",
+                                    width="100%"
+                                ),
+                                debounce_timeout=300
+                            ),
+                            # Scroll infinito: al parar de desplazarse cerca del final se pide otra página
+                            rx.box(
+                                rx.vstack(
+                                    rx.foreach(
+                                        NotesState.notes,
+                                        lambda n: rx.card(
+                                            rx.hstack(
+                                                rx.text(n["text"]),
+                                                rx.spacer(),
+                                                rx.button(
+                                                    rx.icon("trash"), 
+                                                    on_click=lambda: NotesState.delete_note(n["id"]), 
+                                                    variant="ghost", 
+                                                    color_scheme="red",
+                                                    size="1"
+                                                )
+                                            ),
+                                            size="1",
+                                            width="100%"
                                         )
                                     ),
-                                    size="1"
-                                )
+                                    rx.cond(
+                                        NotesState.notes_has_more,
+                                        rx.button("Cargar más", on_click=NotesState.load_more_notes, variant="soft", size="1"),
+                                    ),
+                                    width="100%"
+                                ),
+                                id=NOTES_SCROLL_ID,
+                                on_scroll_end=rx.call_script(NOTES_SCROLL_JS, callback=NotesState.notes_scrolled),
+                                max_height="500px",
+                                overflow_y="auto",
+                                width="100%"
                             )
                         ),
                         value="tab3",
                         padding_top="1.5em"
                     ),
+                    
+                    # TAB 4: HORARIO
+                    rx.tabs.content(
+                        rx.vstack(
+                            rx.heading("Horario Semanal", size="5"),
+                            rx.form(
+                                rx.hstack(
+                                    rx.select(list(WEEKDAYS), name="weekday", default_value=WEEKDAYS[0]),
+                                    rx.input(type="time", name="start", required=True),
+                                    rx.input(type="time", name="end", required=True),
+                                    rx.select(list(BLOCK_TYPES), name="type", default_value=BLOCK_TYPES[0]),
+                                    rx.input(placeholder="Nombre del bloque", name="name", flex="1"),
+                                    rx.button("Añadir", type="submit"),
+                                    wrap="wrap",
+                                    width="100%"
+                                ),
+                                on_submit=ClockState.add_schedule_block,
+                                reset_on_submit=True,
+                                width="100%"
+                            ),
+                            rx.foreach(ClockState.schedule_blocks, schedule_row),
+                            width="100%"
+                        ),
+                        value="tab4",
+                        padding_top="1.5em"
+                    ),
                     default_value="tab1",
+                    on_change=UIState.open_tab,
                     width="100%"
                 ),
                 width="100%",
@@ -587,15 +1437,15 @@ def main_dashboard():
                         rx.button("Cancelar", color_scheme="gray", variant="soft"),
                     ),
                     rx.dialog.close(
-                        rx.button("Desbloquear Elite", on_click=State.upgrade_to_premium),
+                        rx.button("Desbloquear Elite", on_click=UIState.upgrade_to_premium),
                     ),
                     spacing="3",
                     margin_top="16px",
                     justify="end",
                 ),
             ),
-            open=State.show_upgrade_dialog,
-            on_open_change=State.set_show_upgrade_dialog
+            open=UIState.show_upgrade_dialog,
+            on_open_change=UIState.set_show_upgrade_dialog
         ),
 
         background="#0a0a0a",
@@ -620,6 +1470,21 @@ app = rx.App(
         accent_color="tomato", 
         radius="large",
         panel_background="translucent"
-    )
+    ),
+    head_components=[rx.script(COUNTDOWN_JS)],
+    # /metrics en formato Prometheus y las descargas /export/* junto a la API de Reflex
+    api_transformer=[metrics_api, download_api(AUTH_COOKIE)],
 )
-app.add_page(index, title="PAU Elite | Tu Segundo Cerebro")
+# Latencia, llamadas a Supabase, delta y recálculos por evento (STATE_DELTA_LOG=1 para verlos en el log)
+app.add_middleware(EventSpanMiddleware())
+app.add_page(index, title="PAU Elite | Tu Segundo Cerebro", on_load=AuthState.restore_session)
+
+
+async def _warm_imports():
+    # Lo que auth importa al primer uso (PyJWT) se precarga con el servidor ya escuchando
+    await asyncio.to_thread(importlib.import_module, "jwt")
+
+
+app.register_lifespan_task(_warm_imports)
+# Pendientes y cifras del día siguiente, precalculados antes de medianoche
+app.register_lifespan_task(prefetch_due_snapshots)
@@ -0,0 +1,129 @@
+"""Caché de lecturas por usuario entre ``State`` y Supabase.
+
+Guarda la última descarga de temas de cada usuario, compartida por
+todas sus pestañas y reconexiones. Dentro del TTL se sirve sin red; pasado el
+TTL se revalida con el RPC ``data_version`` (nº de filas y ``updated_at``
+máximo por tabla, unos pocos bytes) y solo se vuelve a descargar si cambió.
+Las escrituras propias invalidan la entrada del usuario. Si varias pestañas
+del mismo usuario conectan a la vez, una sola descarga sirve a todas.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+from . import metrics
+from .single_flight import SingleFlight
+
+# Con varios workers (REDIS_URL) la invalidación de uno no llega a los demás:
+# por defecto cada lectura se revalida con data_version (unos pocos bytes)
+READ_CACHE_TTL_SECONDS = float(os.getenv("READ_CACHE_TTL_SECONDS", "0" if os.getenv("REDIS_URL") else "30"))
+READ_CACHE_MAX_USERS = int(os.getenv("READ_CACHE_MAX_USERS", "1000"))
+
+CACHE_HITS = metrics.counter("pau_read_cache_hits_total", "Lecturas servidas desde la caché dentro del TTL")
+CACHE_REVALIDATED = metrics.counter("pau_read_cache_revalidated_total", "Lecturas caducadas confirmadas con data_version")
+CACHE_MISSES = metrics.counter("pau_read_cache_misses_total", "Lecturas que descargaron de Supabase")
+CACHE_COALESCED = metrics.counter("pau_read_cache_coalesced_total", "Lecturas que esperaron la descarga en curso de otra pestaña")
+CACHE_INVALIDATIONS = metrics.counter("pau_read_cache_invalidations_total", "Entradas invalidadas por escrituras propias")
+CACHE_USERS = metrics.gauge("pau_read_cache_users", "Usuarios con entrada en la caché de lecturas")
+
+Snapshot = dict[str, list[dict]]
+Version = dict[str, tuple[int, str | None]]
+
+
+def version_of(snapshot: Snapshot) -> Version:
+    """Versión de una descarga: nº de filas y ``updated_at`` máximo por tabla."""
+    return {
+        table: (len(rows), max((r["updated_at"] for r in rows if r.get("updated_at")), default=None))
+        for table, rows in snapshot.items()
+    }
+
+
+def _copy(snapshot: Snapshot) -> Snapshot:
+    # Cada sesión recibe sus propios dicts: la caché no se altera desde fuera
+    return {table: [dict(r) for r in rows] for table, rows in snapshot.items()}
+
+
+@dataclass
+class _Entry:
+    snapshot: Snapshot
+    version: Version
+    checked_at: float
+
+
+class ReadCache:
+    """LRU de descargas por usuario con TTL y revalidación por versión."""
+
+    def __init__(self, ttl: float = READ_CACHE_TTL_SECONDS, max_users: int = READ_CACHE_MAX_USERS):
+        self.ttl = ttl
+        self.max_users = max_users
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._lock = threading.Lock()
+        # Descarga o revalidación en curso por usuario
+        self._inflight: SingleFlight[Snapshot] = SingleFlight()
+
+    async def get(
+        self,
+        user_id: str,
+        fetch: Callable[[], Awaitable[Snapshot]],
+        version: Callable[[], Awaitable[Version]],
+        revalidate: bool = False,
+    ) -> Snapshot:
+        """Descarga de ``user_id``; ``revalidate`` ignora el TTL pero no la versión."""
+        entry = self._entries.get(user_id)
+        if entry is not None and not revalidate and time.monotonic() - entry.checked_at < self.ttl:
+            CACHE_HITS.inc()
+            self._touch(user_id)
+            return _copy(entry.snapshot)
+
+        if user_id in self._inflight:
+            CACHE_COALESCED.inc()
+        return _copy(await self._inflight.run(user_id, lambda: self._load(user_id, entry, fetch, version)))
+
+    async def _load(self, user_id: str, entry: _Entry | None, fetch, version) -> Snapshot:
+        if entry is not None and await version() == entry.version:
+            CACHE_REVALIDATED.inc()
+            entry.checked_at = time.monotonic()
+            self._touch(user_id)
+            return entry.snapshot
+
+        CACHE_MISSES.inc()
+        snapshot = await fetch()
+        # La versión sale de los propios datos: una escritura concurrente la deja
+        # desfasada y fuerza otra descarga en la siguiente revalidación
+        self._store(user_id, _Entry(snapshot, version_of(snapshot), time.monotonic()))
+        return snapshot
+
+    def invalidate(self, user_id: str):
+        with self._lock:
+            if self._entries.pop(user_id, None) is not None:
+                CACHE_INVALIDATIONS.inc()
+                CACHE_USERS.set(len(self._entries))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            CACHE_USERS.set(0)
+
+    def entries(self) -> list[tuple[str, Snapshot, Version]]:
+        """``(user_id, descarga, versión)`` de cada usuario en caché (solo lectura, sin copiar)."""
+        with self._lock:
+            return [(user_id, e.snapshot, e.version) for user_id, e in self._entries.items()]
+
+    def _touch(self, user_id: str):
+        with self._lock:
+            if user_id in self._entries:
+                self._entries.move_to_end(user_id)
+
+    def _store(self, user_id: str, entry: _Entry):
+        with self._lock:
+            self._entries[user_id] = entry
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+            CACHE_USERS.set(len(self._entries))
+
+
+READ_CACHE = ReadCache()
@@ -0,0 +1,231 @@
+"""Suscripción a cambios de Postgres vía Supabase Realtime (protocolo Phoenix).
+
+Un único websocket por bucle de eventos multiplexa un canal por usuario
+(``postgres_changes`` de ``topics`` y ``notes`` filtrados por ``user_id``);
+todas las pestañas del usuario comparten el canal. Cada sesión recibe los
+cambios en una cola acotada: si se llena (ráfaga) o se cae el socket, la cola
+se vacía y la sesión recibe ``RESYNC`` para recargar una vez en vez de
+procesar cambios sueltos o perdidos.
+"""
+import asyncio
+import itertools
+import json
+import os
+import weakref
+
+from websockets.asyncio.client import connect
+from websockets.exceptions import WebSocketException
+
+from . import metrics
+
+REALTIME_TABLES = ("topics", "notes")
+REALTIME_QUEUE_SIZE = int(os.getenv("REALTIME_QUEUE_SIZE", "256"))
+REALTIME_BATCH_SIZE = 100
+HEARTBEAT_SECONDS = 25.0
+RECONNECT_MAX_SECONDS = 30.0
+
+# Marca en la cola: descartar los cambios pendientes y recargar
+RESYNC = None
+
+REALTIME_CHANGES = metrics.counter("pau_realtime_changes_total", "Cambios de Postgres recibidos por Realtime")
+REALTIME_BYTES = metrics.counter("pau_realtime_bytes_total", "Bytes de mensajes recibidos por el websocket de Realtime")
+REALTIME_OVERFLOWS = metrics.counter("pau_realtime_overflows_total", "Colas de sesión desbordadas (se pide recarga)")
+REALTIME_RECONNECTS = metrics.counter("pau_realtime_reconnects_total", "Reconexiones del websocket de Realtime")
+
+
+def realtime_url(supabase_url: str, key: str) -> str:
+    base = supabase_url.rstrip("/").replace("https://", "wss://", 1).replace("http://", "ws://", 1)
+    return f"{base}/realtime/v1/websocket?apikey={key}&vsn=1.0.0"
+
+
+class Subscription:
+    """Cola acotada de cambios de un usuario para una sesión."""
+
+    def __init__(self, hub: "RealtimeHub", user_id: str, maxsize: int = REALTIME_QUEUE_SIZE):
+        self.hub = hub
+        self.user_id = user_id
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self._overflowed = False
+        # Se activa cuando Realtime confirma el canal (a partir de ahí no se pierde nada)
+        self.joined = asyncio.Event()
+
+    def push(self, change: dict | None):
+        if self._overflowed:
+            return
+        try:
+            self._queue.put_nowait(change)
+        except asyncio.QueueFull:
+            REALTIME_OVERFLOWS.inc()
+            self.resync()
+
+    def resync(self):
+        """Sustituye lo pendiente por una única orden de recarga."""
+        while not self._queue.empty():
+            self._queue.get_nowait()
+        self._queue.put_nowait(RESYNC)
+        self._overflowed = True
+
+    async def next_batch(self, timeout: float) -> list[dict] | None:
+        """Cambios acumulados (hasta ``REALTIME_BATCH_SIZE``), ``RESYNC`` o ``[]`` si vence el plazo."""
+        try:
+            first = await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return []
+        batch = [first]
+        while len(batch) < REALTIME_BATCH_SIZE and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        if RESYNC in batch:
+            self._overflowed = False
+            return RESYNC
+        return batch
+
+    async def close(self):
+        await self.hub.unsubscribe(self)
+
+
+class RealtimeHub:
+    """Websocket compartido con un canal por usuario y reconexión automática."""
+
+    def __init__(self, url: str):
+        self.url = url
+        self._channels: dict[str, dict] = {}  # user_id -> {"token", "subs", "join_ref", "joined"}
+        self._refs = itertools.count(1)
+        self._ws = None
+        self._task: asyncio.Task | None = None
+
+    @staticmethod
+    def topic(user_id: str) -> str:
+        return f"realtime:user:{user_id}"
+
+    async def subscribe(self, user_id: str, token: str) -> Subscription:
+        sub = Subscription(self, user_id)
+        channel = self._channels.get(user_id)
+        if channel is None:
+            channel = self._channels[user_id] = {"token": token, "subs": set(), "join_ref": None, "joined": False}
+            await self._join(user_id)
+        else:
+            await self.update_token(user_id, token)
+        channel["subs"].add(sub)
+        if channel["joined"]:
+            sub.joined.set()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        return sub
+
+    async def update_token(self, user_id: str, token: str):
+        """Renueva el token del canal (tras refrescar la sesión) sin volver a unirse."""
+        channel = self._channels.get(user_id)
+        if channel is not None and channel["token"] != token:
+            channel["token"] = token
+            await self._send(self.topic(user_id), "access_token", {"access_token": token})
+
+    async def unsubscribe(self, sub: Subscription):
+        channel = self._channels.get(sub.user_id)
+        if channel is None:
+            return
+        channel["subs"].discard(sub)
+        if not channel["subs"]:
+            del self._channels[sub.user_id]
+            await self._send(self.topic(sub.user_id), "phx_leave", {})
+
+    async def _join(self, user_id: str):
+        config = {
+            "postgres_changes": [
+                {"event": "*", "schema": "public", "table": table, "filter": f"user_id=eq.{user_id}"}
+                for table in REALTIME_TABLES
+            ],
+        }
+        channel = self._channels[user_id]
+        # La referencia se guarda antes de enviar: la respuesta puede llegar durante el envío
+        channel["join_ref"] = str(next(self._refs))
+        await self._send(self.topic(user_id), "phx_join", {
+            "config": config,
+            "access_token": channel["token"],
+        }, ref=channel["join_ref"])
+
+    async def _send(self, topic: str, event: str, payload: dict, ref: str | None = None):
+        if self._ws is None:
+            return  # al (re)conectar se vuelve a unir a todos los canales
+        message = {"topic": topic, "event": event, "payload": payload, "ref": ref or str(next(self._refs))}
+        try:
+            await self._ws.send(json.dumps(message))
+        except WebSocketException:
+            pass  # la reconexión se encarga
+
+    async def _run(self):
+        delay = 1.0
+        while self._channels:
+            try:
+                async with connect(self.url, ping_interval=None) as ws:
+                    self._ws = ws
+                    delay = 1.0
+                    for user_id in list(self._channels):
+                        await self._join(user_id)
+                    heartbeat = asyncio.create_task(self._heartbeat())
+                    try:
+                        async for raw in ws:
+                            REALTIME_BYTES.inc(len(raw))
+                            self._dispatch(json.loads(raw))
+                            if not self._channels:
+                                break
+                    finally:
+                        heartbeat.cancel()
+            except (OSError, WebSocketException):
+                pass
+            self._ws = None
+            if not self._channels:
+                break
+            # Lo recibido mientras el socket estaba caído se ha perdido
+            REALTIME_RECONNECTS.inc()
+            for channel in self._channels.values():
+                channel["joined"] = False
+                for sub in channel["subs"]:
+                    sub.joined.clear()
+                    sub.resync()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, RECONNECT_MAX_SECONDS)
+        self._task = None
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(HEARTBEAT_SECONDS)
+            await self._send("phoenix", "heartbeat", {})
+
+    def _dispatch(self, message: dict):
+        user_id = message.get("topic", "").removeprefix("realtime:user:")
+        channel = self._channels.get(user_id)
+        if channel is None:
+            return
+        if message.get("event") == "phx_reply" and message.get("ref") == channel["join_ref"]:
+            if message["payload"].get("status") == "ok":
+                channel["joined"] = True
+                for sub in channel["subs"]:
+                    sub.joined.set()
+            return
+        if message.get("event") != "postgres_changes":
+            return
+        data = message["payload"]["data"]
+        change = {
+            "table": data["table"],
+            "type": data["type"],
+            "record": data.get("record") or {},
+            "old_record": data.get("old_record") or {},
+        }
+        REALTIME_CHANGES.inc()
+        for sub in channel["subs"]:
+            sub.push(change)
+
+
+_hubs: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, RealtimeHub]" = weakref.WeakKeyDictionary()
+
+
+def get_hub() -> RealtimeHub:
+    """Hub del bucle actual (``SUPABASE_REALTIME_URL`` o derivado de ``SUPABASE_URL``)."""
+    loop = asyncio.get_running_loop()
+    hub = _hubs.get(loop)
+    if hub is None:
+        url = os.getenv("SUPABASE_REALTIME_URL") or realtime_url(
+            os.getenv("SUPABASE_URL", ""), os.getenv("SUPABASE_KEY", "")
+        )
+        hub = _hubs[loop] = RealtimeHub(url)
+    return hub
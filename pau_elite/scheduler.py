@@ -0,0 +1,231 @@
+"""Motores de planificación de repasos: legacy, SM-2 y FSRS.
+
+Cada estrategia se escribe una sola vez sobre columnas de NumPy, así que la
+misma regla sirve para un clic (columnas de longitud 1) y para reprogramar
+todos los temas de todos los usuarios de una pasada tras cambiar parámetros.
+
+Memoria por tema (columnas de ``topics``): ``level``, ``ease`` (SM-2),
+``stability`` y ``difficulty`` (FSRS), ``reps`` (aciertos seguidos),
+``last_rating`` (0 = nunca repasado) y ``last_review``.
+"""
+import abc
+import datetime
+import os
+from dataclasses import dataclass
+
+import numpy as np
+
+from .topic_store import MAX_LEVEL
+
+# Notas de los botones (escala de FSRS: 1 = Again, 2 = Hard, 3 = Good)
+RATINGS = {"bad": 1, "mid": 2, "ok": 3}
+BAD, MID, OK = 1, 2, 3
+
+MEMORY_FIELDS = ("level", "ease", "stability", "difficulty", "reps", "last_rating", "last_review")
+
+_RATING_NAMES = {v: k for k, v in RATINGS.items()}
+
+
+def topics_to_columns(rows: list[dict]) -> dict[str, np.ndarray]:
+    """Pasa filas de ``topics`` a columnas (fechas como ordinales)."""
+    def column(name, default, dtype):
+        return np.array([default if r.get(name) is None else r[name] for r in rows], dtype=dtype)
+
+    def dates(name):
+        return np.array([
+            datetime.date.fromisoformat(r[name]).toordinal() if r.get(name) else 0 for r in rows
+        ], dtype=np.int64)
+
+    return {
+        "level": column("level", 0, np.int64),
+        "ease": column("ease", 2.5, np.float64),
+        "stability": column("stability", 0.0, np.float64),
+        "difficulty": column("difficulty", 0.0, np.float64),
+        "reps": column("reps", 0, np.int64),
+        "last_rating": np.array([RATINGS.get(r.get("last_rating"), 0) for r in rows], dtype=np.int64),
+        "last_review": dates("last_review"),
+        "next_review": dates("next_review"),
+    }
+
+
+def _to_python(name: str, value):
+    if name in ("last_review", "next_review"):
+        return str(datetime.date.fromordinal(int(value)))
+    if name == "last_rating":
+        return _RATING_NAMES.get(int(value))
+    if name in ("level", "reps"):
+        return int(value)
+    return float(value)
+
+
+class Scheduler(abc.ABC):
+    """Interfaz común: actualizar memoria tras un repaso y calcular intervalos."""
+
+    name = ""
+
+    def _update_strategy(self, cols: dict, grade: np.ndarray, today: int):
+        """Actualiza las columnas propias de la estrategia (antes que las comunes)."""
+
+    @abc.abstractmethod
+    def intervals(self, cols: dict) -> np.ndarray:
+        """Días hasta el siguiente repaso a partir de la memoria ya actualizada."""
+
+    def update_memory(self, cols: dict, grade: np.ndarray, today: int) -> dict:
+        """Aplica un repaso con nota ``grade`` a cada fila (vectorizado)."""
+        cols = dict(cols)
+        self._update_strategy(cols, grade, today)
+        level = cols["level"]
+        cols["level"] = np.where(grade == OK, np.minimum(level + 1, MAX_LEVEL), np.where(grade == BAD, 1, level))
+        cols["reps"] = np.where(grade == BAD, 0, cols["reps"] + 1)
+        cols["last_rating"] = grade
+        cols["last_review"] = np.full_like(cols["last_review"], today)
+        return cols
+
+    def due_dates(self, cols: dict) -> np.ndarray:
+        """``last_review`` más el intervalo redondeado (mínimo un día)."""
+        days = np.maximum(1, np.rint(self.intervals(cols))).astype(np.int64)
+        return cols["last_review"] + days
+
+    def reschedule(self, cols: dict) -> np.ndarray:
+        """Recalcula ``next_review`` (ordinal) de todas las filas ya repasadas."""
+        return np.where(cols["last_rating"] > 0, self.due_dates(cols), cols["next_review"])
+
+    def review(self, topic: dict, rating: str, today: datetime.date) -> dict:
+        """Campos a escribir en ``topics`` tras repasar un tema."""
+        grade = np.array([RATINGS.get(rating, 0)], dtype=np.int64)
+        cols = self.update_memory(topics_to_columns([topic]), grade, today.toordinal())
+        cols["next_review"] = self.due_dates(cols)
+        return {name: _to_python(name, cols[name][0]) for name in (*MEMORY_FIELDS, "next_review")}
+
+
+@dataclass
+class LegacyScheduler(Scheduler):
+    """Reglas originales: Fácil da ``nivel*5+3`` días, Regular 3 y Difícil 1."""
+
+    name = "legacy"
+    ok_step: int = 5
+    ok_base: int = 3
+    mid_days: int = 3
+    bad_days: int = 1
+
+    def intervals(self, cols: dict) -> np.ndarray:
+        rating = cols["last_rating"]
+        return np.where(
+            rating == OK,
+            cols["level"] * self.ok_step + self.ok_base,
+            np.where(rating == MID, self.mid_days, self.bad_days),
+        )
+
+
+@dataclass
+class SM2Scheduler(Scheduler):
+    """SM-2: factor de facilidad por tema e intervalos 1, 6, 6·EF^(n-2)."""
+
+    name = "sm2"
+    first_interval: float = 1.0
+    second_interval: float = 6.0
+    interval_modifier: float = 1.0
+    min_ease: float = 1.3
+
+    # Calidad SM-2 (0-5) equivalente a cada botón
+    quality = {0: 0, BAD: 1, MID: 3, OK: 5}
+
+    def _update_strategy(self, cols, grade, today):
+        q = np.select([grade == BAD, grade == MID, grade == OK], [self.quality[BAD], self.quality[MID], self.quality[OK]], 0)
+        miss = 5 - q
+        cols["ease"] = np.maximum(self.min_ease, cols["ease"] + 0.1 - miss * (0.08 + miss * 0.02))
+
+    def intervals(self, cols):
+        reps = cols["reps"]
+        grown = self.second_interval * cols["ease"] ** np.maximum(reps - 2, 0)
+        days = np.where(reps <= 1, self.first_interval, grown)
+        return days * self.interval_modifier
+
+
+# Pesos por defecto de FSRS-4.5
+FSRS_DEFAULT_WEIGHTS = (
+    0.4872, 1.4003, 3.7145, 13.8206, 5.1618, 1.2298, 0.8975, 0.031, 1.6474,
+    0.1367, 1.0461, 2.1072, 0.0793, 0.3246, 1.587, 0.2272, 2.8755,
+)
+FSRS_DECAY = -0.5
+FSRS_FACTOR = 0.9 ** (1 / FSRS_DECAY) - 1
+
+
+@dataclass
+class FSRSScheduler(Scheduler):
+    """FSRS: estabilidad y dificultad por tema, intervalo según retención deseada."""
+
+    name = "fsrs"
+    weights: tuple = FSRS_DEFAULT_WEIGHTS
+    desired_retention: float = 0.9
+    maximum_interval: int = 36500
+
+    def _initial_difficulty(self, grade):
+        w = self.weights
+        return np.clip(w[4] - (grade - 3) * w[5], 1, 10)
+
+    def _update_strategy(self, cols, grade, today):
+        w = self.weights
+        grade = np.where(grade == 0, BAD, grade)
+        first = (cols["last_rating"] == 0) | (cols["stability"] <= 0)
+        s = np.where(first, 1.0, cols["stability"])
+        d = np.where(first, self._initial_difficulty(grade), cols["difficulty"])
+
+        elapsed = np.maximum(today - cols["last_review"], 0)
+        retrievability = (1 + FSRS_FACTOR * elapsed / s) ** FSRS_DECAY
+        recall = s * (
+            1 + np.exp(w[8]) * (11 - d) * s ** -w[9]
+            * (np.exp(w[10] * (1 - retrievability)) - 1)
+            * np.where(grade == MID, w[15], 1.0)
+        )
+        forget = w[11] * d ** -w[12] * ((s + 1) ** w[13] - 1) * np.exp(w[14] * (1 - retrievability))
+        reviewed_s = np.where(grade == BAD, forget, recall)
+
+        next_d = d - w[6] * (grade - 3)
+        next_d = w[7] * self._initial_difficulty(np.full_like(grade, 4)) + (1 - w[7]) * next_d
+
+        initial_s = np.asarray(w)[grade - 1]
+        cols["stability"] = np.where(first, initial_s, reviewed_s)
+        cols["difficulty"] = np.where(first, d, np.clip(next_d, 1, 10))
+
+    def intervals(self, cols):
+        s = cols["stability"]
+        days = s / FSRS_FACTOR * (self.desired_retention ** (1 / FSRS_DECAY) - 1)
+        return np.minimum(days, self.maximum_interval)
+
+
+STRATEGIES: dict[str, type[Scheduler]] = {
+    "legacy": LegacyScheduler,
+    "sm2": SM2Scheduler,
+    "fsrs": FSRSScheduler,
+}
+
+_scheduler: Scheduler | None = None
+
+
+def get_scheduler() -> Scheduler:
+    """Estrategia activa (``SCHEDULER_STRATEGY``, por defecto legacy)."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = STRATEGIES[os.getenv("SCHEDULER_STRATEGY", "legacy")]()
+    return _scheduler
+
+
+async def reschedule_all(client, scheduler: Scheduler, page_size: int = 5000) -> int:
+    """Reprograma todos los temas de todos los usuarios por páginas de ``page_size``.
+
+    Usa la clave de servicio del cliente; cada página se calcula en una sola
+    pasada vectorizada y se escribe con un único upsert.
+    """
+    last_id, total = 0, 0
+    while True:
+        res = await client.table("topics").select("*").gt("id", last_id).order("id").limit(page_size).execute()
+        rows = res.data
+        if not rows:
+            return total
+        next_review = scheduler.reschedule(topics_to_columns(rows))
+        for row, ordinal in zip(rows, next_review.tolist()):
+            row["next_review"] = str(datetime.date.fromordinal(ordinal))
+        await client.table("topics").upsert(rows, returning="minimal").execute()
+        last_id = rows[-1]["id"]
+        total += len(rows)
@@ -0,0 +1,77 @@
+"""Arranque del backend en producción sin pasar por ``reflex run``.
+
+``reflex run --env prod`` compila la app en un proceso aparte (importándola
+entera), consulta PyPI, construye el frontend con npm y solo entonces lanza
+el servidor ASGI, que vuelve a importar la app y a evaluar las páginas. En
+una instancia nueva del autoescalado todo eso va antes de la primera
+petición.
+
+Aquí el trabajo se reparte: en la fase de build, ``reflex export
+--frontend-only --no-zip`` deja el frontend estático en ``.web/build/client``
+y la lista de páginas con estado en ``.web/backend``; al arrancar, este
+módulo lanza granian directamente sobre la app, sin compilar, sirviendo el
+frontend ya construido desde el mismo puerto::
+
+    python -m pau_elite.serve --port 8000
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+APP_TARGET = "pau_elite/pau_elite.py:app"
+FRONTEND_DIR = ROOT / ".web" / "build" / "client"
+# Páginas que crean estado al evaluarse: las escribe la compilación y, si existe
+# .web/backend, el backend evalúa solo esas al arrancar (sin él, todas)
+STATEFUL_PAGES = ROOT / ".web" / "backend" / "stateful_pages.json"
+
+
+def default_workers() -> int:
+    # Misma regla que reflex run: varios workers solo con el estado en Redis
+    if os.environ.get("GRANIAN_WORKERS"):
+        return int(os.environ["GRANIAN_WORKERS"])
+    return (os.cpu_count() or 1) * 2 + 1 if os.environ.get("REDIS_URL") else 1
+
+
+def server_command(host: str, port: int, workers: int) -> list[str]:
+    granian = Path(sys.executable).with_name("granian")
+    return [
+        str(granian) if granian.exists() else "granian",
+        "--interface", "asgi", "--factory",
+        "--host", host, "--port", str(port), "--workers", str(workers),
+        "--log-level", "warning",
+        APP_TARGET,
+    ]
+
+
+def server_env(frontend: bool) -> dict[str, str]:
+    env = {**os.environ, "REFLEX_ENV_MODE": "prod"}
+    # Variables internas de Reflex: las mismas que pone reflex run a su servidor
+    env["__REFLEX_SKIP_COMPILE"] = "true"
+    if frontend:
+        env["__REFLEX_MOUNT_FRONTEND_COMPILED_APP"] = "true"
+    return env
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", 8000)))
+    parser.add_argument("--workers", type=int, default=None, help="Por defecto GRANIAN_WORKERS o la regla de reflex run")
+    parser.add_argument("--no-frontend", action="store_true", help="Solo la API (el frontend se sirve aparte)")
+    args = parser.parse_args()
+
+    frontend = not args.no_frontend
+    if frontend and not FRONTEND_DIR.is_dir():
+        parser.error(f"Falta el frontend compilado en {FRONTEND_DIR}: reflex export --frontend-only --no-zip")
+    if not STATEFUL_PAGES.parent.is_dir():
+        print(f"Aviso: sin {STATEFUL_PAGES.parent.relative_to(ROOT)}, cada worker evaluará las páginas al arrancar", file=sys.stderr)
+
+    command = server_command(args.host, args.port, args.workers or default_workers())
+    os.chdir(ROOT)
+    os.execvpe(command[0], command, server_env(frontend))
+
+
+if __name__ == "__main__":
+    main()
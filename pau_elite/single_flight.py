@@ -0,0 +1,49 @@
+"""Una sola llamada en curso por clave; quien llega con una en marcha espera su resultado.
+
+Lo usan las lecturas de PostgREST (``db``), la caché de lecturas por usuario
+y el refresco del token de Auth. Los que esperan reciben el mismo resultado
+o el mismo error que quien hace la llamada. Si a este lo cancelan (la
+pestaña se cerró, el worker se apaga), los que esperan no heredan la
+cancelación ni se quedan colgados: reciben un error normal y deciden ellos
+si reintentar.
+"""
+import asyncio
+from typing import Awaitable, Callable, Generic, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class FlightCancelled(Exception):
+    """Se canceló la llamada compartida que se estaba esperando."""
+
+
+class SingleFlight(Generic[T]):
+    """Llamadas en curso por clave (solo de este proceso)."""
+
+    def __init__(self, cancelled: Callable[[Hashable], Exception] | None = None):
+        self._flights: dict[Hashable, asyncio.Future] = {}
+        self._cancelled = cancelled or (lambda key: FlightCancelled(f"Llamada cancelada ({key})"))
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._flights
+
+    async def run(self, key: Hashable, call: Callable[[], Awaitable[T]]) -> T:
+        """Resultado de ``call()``, o el de la llamada con la misma ``key`` que ya está en curso."""
+        flight = self._flights.get(key)
+        if flight is not None:
+            return await asyncio.shield(flight)
+        flight = self._flights[key] = asyncio.get_running_loop().create_future()
+        try:
+            result = await call()
+        except Exception as e:
+            flight.set_exception(e)
+            raise
+        else:
+            flight.set_result(result)
+            return result
+        finally:
+            del self._flights[key]
+            if not flight.done():
+                # Se canceló quien hacía la llamada; los demás ven un fallo normal
+                flight.set_exception(self._cancelled(key))
+            flight.exception()  # un fallo lo reciben quienes esperan; si no hay nadie, no se avisa
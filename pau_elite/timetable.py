@@ -0,0 +1,185 @@
+"""Horario semanal de estudio compilado a intervalos ordenados.
+
+Cada usuario define sus bloques como datos (tabla ``schedule_blocks``); se
+compilan una vez en arrays ordenados por minuto de la semana, de modo que el
+bloque actual y el siguiente cambio salen de una búsqueda binaria. Las
+zonas horarias se cachean y los cambios de hora (DST) se resuelven al pasar
+de hora local a instante real.
+"""
+import bisect
+import datetime
+import functools
+from dataclasses import dataclass
+
+import numpy as np
+import pytz
+
+TIMEZONE = "Europe/Madrid"
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+BLOCK_TYPES = ("science", "memory", "skills", "gym", "simulacro", "sleep")
+WEEKDAYS = ("Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo")
+FREE_TYPE, FREE_NAME = "free", "⏳ Tiempo Libre"
+
+# (días de la semana, hora inicio, hora fin, tipo, nombre); 0 = lunes
+WEEKLY_BLOCKS = [
+    ((0, 1, 2, 3), 16.0, 17.5, "science", "🔄 Tareas / Estudio"),
+    ((0, 1, 2, 3), 17.5, 19.0, "gym", "🏋️ Gimnasio"),
+    ((0, 1, 2, 3), 19.0, 20.5, "science", "🧪 Bloque Ciencia"),
+    ((0, 1, 2, 3), 21.5, 23.0, "memory", "🧠 Bloque Memoria"),
+    ((0, 1, 2, 3), 23.0, 24.0, "sleep", "😴 Dormir"),
+    ((5,), 9.5, 13.5, "simulacro", "📝 SIMULACRO REAL"),
+]
+
+# Horario para quien aún no ha guardado el suyo (mismo formato que schedule_blocks)
+DEFAULT_BLOCKS = [
+    {"weekday": day, "start_minute": round(start * 60), "end_minute": round(end * 60), "type": b_type, "name": name}
+    for days, start, end, b_type, name in WEEKLY_BLOCKS
+    for day in days
+]
+
+
+@functools.lru_cache(maxsize=None)
+def get_timezone(name: str = TIMEZONE):
+    return pytz.timezone(name)
+
+
+@dataclass(frozen=True)
+class BlockStatus:
+    type: str
+    name: str
+    ends_at: datetime.datetime | None  # None en tiempo libre
+    end_label: str
+    next_transition: datetime.datetime
+
+
+def parse_hhmm(value: str) -> int:
+    """``"16:30"`` -> 990 minutos; admite ``"24:00"`` como fin de día."""
+    hours, _, minutes = value.strip().partition(":")
+    total = int(hours) * 60 + int(minutes or 0)
+    if not 0 <= total <= MINUTES_PER_DAY:
+        raise ValueError(f"Hora fuera de rango: {value}")
+    return total
+
+
+def format_minute(minute: int) -> str:
+    return f"{minute // 60:02}:{minute % 60:02}"
+
+
+class Timetable:
+    """Bloques de una semana compilados en arrays ordenados por minuto de inicio."""
+
+    def __init__(self, blocks: list[dict], timezone: str = TIMEZONE):
+        rows = sorted(blocks, key=lambda b: (b["weekday"], b["start_minute"]))
+        self.timezone = timezone
+        self.blocks = rows
+        self.starts = [b["weekday"] * MINUTES_PER_DAY + b["start_minute"] for b in rows]
+        self.ends = [b["weekday"] * MINUTES_PER_DAY + b["end_minute"] for b in rows]
+        for i, (start, end) in enumerate(zip(self.starts, self.ends)):
+            if end <= start:
+                raise ValueError(f"El bloque «{rows[i]['name']}» termina antes de empezar")
+            if i and start < self.ends[i - 1]:
+                raise ValueError(f"El bloque «{rows[i]['name']}» se solapa con «{rows[i - 1]['name']}»")
+        self._starts_np = np.array(self.starts, dtype=np.int64)
+        self._ends_np = np.array(self.ends, dtype=np.int64)
+
+    @property
+    def tz(self):
+        return get_timezone(self.timezone)
+
+    def _localize(self, naive: datetime.datetime, after: datetime.datetime) -> datetime.datetime:
+        """Hora local -> instante, resolviendo los huecos y solapes del cambio de hora."""
+        tz = self.tz
+        try:
+            return tz.localize(naive, is_dst=None)
+        except pytz.NonExistentTimeError:
+            # Hueco de primavera: la frontera pasa a ser el propio salto de hora
+            shifted = tz.localize(naive, is_dst=False).astimezone(pytz.utc).replace(tzinfo=None)
+            transitions = tz._utc_transition_times
+            jump = transitions[bisect.bisect_right(transitions, shifted) - 1]
+            return pytz.utc.localize(jump).astimezone(tz)
+        except pytz.AmbiguousTimeError:
+            # Hora repetida en otoño: la primera ocurrencia que aún no ha pasado
+            first = tz.localize(naive, is_dst=True)
+            return first if first > after else tz.localize(naive, is_dst=False)
+
+    def _next_dst_change(self, now: datetime.datetime) -> datetime.datetime | None:
+        transitions = getattr(self.tz, "_utc_transition_times", None)
+        if not transitions:
+            return None
+        i = bisect.bisect_right(transitions, now.astimezone(pytz.utc).replace(tzinfo=None))
+        return pytz.utc.localize(transitions[i]).astimezone(self.tz) if i < len(transitions) else None
+
+    def _status(self, block_type, name, ends_at, label, boundary, now) -> BlockStatus:
+        # Al cambiar la hora el reloj de pared salta: se recalcula también ahí
+        dst_change = self._next_dst_change(now)
+        next_transition = min(boundary, dst_change) if dst_change else boundary
+        return BlockStatus(block_type, name, ends_at, label, next_transition)
+
+    def block_at(self, now: datetime.datetime) -> BlockStatus:
+        """Bloque vigente en ``now`` (con zona horaria) y momento del siguiente cambio."""
+        local = now.astimezone(self.tz).replace(tzinfo=None)
+        week_start = datetime.datetime.combine(local.date() - datetime.timedelta(days=local.weekday()), datetime.time())
+        minute = (local - week_start).total_seconds() / 60
+
+        def at(week_minute: int) -> datetime.datetime:
+            return self._localize(week_start + datetime.timedelta(minutes=week_minute), now)
+
+        i = bisect.bisect_right(self.starts, minute) - 1
+        if i >= 0 and minute < self.ends[i]:
+            block = self.blocks[i]
+            end = at(self.ends[i])
+            return self._status(block["type"], block["name"], end, f"Fin: {format_minute(block['end_minute'])}", end, now)
+
+        # Tiempo libre hasta el próximo bloque (puede ser la semana siguiente)
+        if not self.starts:
+            next_start = minute + MINUTES_PER_WEEK
+        elif i + 1 < len(self.starts):
+            next_start = self.starts[i + 1]
+        else:
+            next_start = self.starts[0] + MINUTES_PER_WEEK
+        return self._status(FREE_TYPE, FREE_NAME, None, "", at(next_start), now)
+
+    def _utc_offsets(self, epoch_seconds: np.ndarray) -> np.ndarray:
+        """Desfase UTC (s) de cada instante, con las transiciones DST de pytz."""
+        tz = self.tz
+        transitions = getattr(tz, "_utc_transition_times", None)
+        if not transitions:
+            return np.full_like(epoch_seconds, int(tz.utcoffset(datetime.datetime(2000, 1, 1)).total_seconds()))
+        epoch = datetime.datetime(1970, 1, 1)
+        starts = np.array([
+            -(2 ** 62) if t == datetime.datetime.min else int((t - epoch).total_seconds()) for t in transitions
+        ], dtype=np.int64)
+        offsets = np.array([int(info[0].total_seconds()) for info in tz._transition_info], dtype=np.int64)
+        return offsets[np.searchsorted(starts, epoch_seconds, side="right") - 1]
+
+    def block_indices(self, epoch_seconds: np.ndarray) -> np.ndarray:
+        """Índice del bloque vigente en cada instante (epoch UTC, s); -1 = libre."""
+        epoch_seconds = np.asarray(epoch_seconds, dtype=np.int64)
+        local = epoch_seconds + self._utc_offsets(epoch_seconds)
+        # El 1970-01-01 fue jueves (weekday 3)
+        minute = ((local // 86400 + 3) % 7) * MINUTES_PER_DAY + (local % 86400) // 60
+        i = np.searchsorted(self._starts_np, minute, side="right") - 1
+        if not len(self._starts_np):
+            return np.full_like(minute, -1)
+        inside = (i >= 0) & (minute < self._ends_np[np.maximum(i, 0)])
+        return np.where(inside, i, -1)
+
+
+DEFAULT_TIMETABLE = Timetable(DEFAULT_BLOCKS)
+
+
+def now_local(timezone: str = TIMEZONE) -> datetime.datetime:
+    return datetime.datetime.now(get_timezone(timezone))
+
+
+def today_local(timezone: str = TIMEZONE) -> datetime.date:
+    """Fecha de hoy en ``timezone`` (no la del servidor, que suele ir en UTC)."""
+    return now_local(timezone).date()
+
+
+def next_midnight(timezone: str = TIMEZONE) -> datetime.datetime:
+    """Próxima medianoche local, como instante con zona."""
+    tomorrow = today_local(timezone) + datetime.timedelta(days=1)
+    return get_timezone(timezone).localize(datetime.datetime.combine(tomorrow, datetime.time()))
@@ -0,0 +1,188 @@
+"""Índice en memoria de los temas de un usuario.
+
+Mantiene los temas por id, una cola de prioridad (min-heap) sobre
+``next_review`` para saber qué toca repasar y la suma de niveles para la
+maestría, de modo que cada cambio cuesta O(log n) en vez de recorrer la lista.
+
+Cada tema es un ``Topic`` con slots: solo las columnas que usan la UI y el
+planificador, textos repetidos internados (compartidos entre sesiones) y
+fechas como ordinales.
+"""
+import datetime
+import heapq
+import sys
+from dataclasses import dataclass
+
+MAX_LEVEL = 5
+
+# Campos de Topic que son fechas (ordinal; 0 = sin fecha)
+_DATE_FIELDS = ("next_review", "last_review")
+# Textos compartidos entre sesiones (se vuelven a internar al restaurar)
+_INTERNED_FIELDS = ("subject", "name", "category")
+# Versión de la forma serializada de TopicStore
+_STATE_FORMAT = 1
+
+
+def _ordinal(value: str | None) -> int:
+    return datetime.date.fromisoformat(value[:10]).toordinal() if value else 0
+
+
+def _iso(ordinal: int) -> str | None:
+    return str(datetime.date.fromordinal(ordinal)) if ordinal else None
+
+
+@dataclass(slots=True)
+class Topic:
+    id: int
+    subject: str
+    name: str
+    category: str
+    unlocked: bool
+    level: int
+    next_review: int
+    extra_queue: bool = False
+    ease: float = 2.5
+    stability: float = 0.0
+    difficulty: float = 0.0
+    reps: int = 0
+    last_rating: str | None = None
+    last_review: int = 0
+
+    @classmethod
+    def from_row(cls, row: dict) -> "Topic":
+        """Fila de ``topics`` (JSON de PostgREST) -> Topic compacto."""
+        return cls(
+            id=row["id"],
+            # Asignaturas, categorías y nombres se repiten entre usuarios (plantillas)
+            subject=sys.intern(row["subject"]),
+            name=sys.intern(row["name"]),
+            category=sys.intern(row["category"]),
+            unlocked=bool(row["unlocked"]),
+            level=row["level"],
+            next_review=_ordinal(row["next_review"]),
+            extra_queue=bool(row.get("extra_queue")),
+            ease=row.get("ease") if row.get("ease") is not None else 2.5,
+            stability=row.get("stability") or 0.0,
+            difficulty=row.get("difficulty") or 0.0,
+            reps=row.get("reps") or 0,
+            last_rating=sys.intern(row["last_rating"]) if row.get("last_rating") else None,
+            last_review=_ordinal(row.get("last_review")),
+        )
+
+    def to_row(self) -> dict:
+        """Vuelta al formato de ``topics`` (fechas ISO) para el planificador y los upserts."""
+        row = {name: getattr(self, name) for name in self.__slots__}
+        for name in _DATE_FIELDS:
+            row[name] = _iso(row[name])
+        return row
+
+    def card(self) -> dict:
+        """Lo que pinta ``task_card``: lo único que viaja al navegador."""
+        return {"id": self.id, "subject": self.subject, "name": self.name, "level": self.level}
+
+
+class TopicStore:
+    """Temas indexados por id con cola de repasos pendientes y agregados."""
+
+    def __init__(self, rows: list[dict] = ()):
+        self.load(rows)
+
+    def load(self, rows: list[dict]):
+        """Reconstruye el índice a partir de una descarga completa."""
+        self._index(Topic.from_row(row) for row in rows)
+
+    def _index(self, topics):
+        self._rows: dict[int, Topic] = {}
+        self._heap: list[tuple[int, int]] = []
+        self._due: set[int] = set()
+        self._drained_until = 0
+        self.total_level = 0
+        # asignatura -> [suma de niveles, nº de temas]
+        self._subjects: dict[str, list[int]] = {}
+        for topic in topics:
+            self._rows[topic.id] = topic
+            self._count(topic, 1)
+            if topic.unlocked:
+                self._heap.append((topic.next_review, topic.id))
+        heapq.heapify(self._heap)
+
+    # El estado de Reflex se guarda con pickle (en disco o en Redis, uno por
+    # sesión): solo viajan las columnas de los temas; el heap, los pendientes
+    # y los agregados se reconstruyen al restaurar.
+    def __getstate__(self) -> tuple:
+        topics = self._rows.values()
+        return (_STATE_FORMAT, tuple(tuple(getattr(t, name) for t in topics) for name in Topic.__slots__))
+
+    def __setstate__(self, state: tuple):
+        _, columns = state
+        fields = dict(zip(Topic.__slots__, columns))
+        for name in _INTERNED_FIELDS:
+            fields[name] = [sys.intern(v) for v in fields[name]]
+        self._index(Topic(*values) for values in zip(*(fields[name] for name in Topic.__slots__)))
+
+    def clear(self):
+        self.load([])
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def get(self, topic_id: int) -> Topic | None:
+        return self._rows.get(topic_id)
+
+    def upsert(self, row: dict) -> Topic:
+        """Inserta o sustituye un tema a partir de una fila de ``topics``."""
+        topic = Topic.from_row(row)
+        old = self._rows.get(topic.id)
+        if old is not None:
+            self._count(old, -1)
+        self._rows[topic.id] = topic
+        self._count(topic, 1)
+
+        self._due.discard(topic.id)
+        if topic.unlocked:
+            if topic.next_review <= self._drained_until:
+                self._due.add(topic.id)
+            else:
+                # La entrada antigua del heap queda obsoleta y se descarta al salir
+                heapq.heappush(self._heap, (topic.next_review, topic.id))
+        return topic
+
+    def remove(self, topic_id: int):
+        """Elimina un tema (su entrada del heap se descarta al salir)."""
+        old = self._rows.pop(topic_id, None)
+        if old is not None:
+            self._count(old, -1)
+            self._due.discard(topic_id)
+
+    def _count(self, topic: Topic, sign: int):
+        self.total_level += sign * topic.level
+        totals = self._subjects.setdefault(topic.subject, [0, 0])
+        totals[0] += sign * topic.level
+        totals[1] += sign
+        if not totals[1]:
+            del self._subjects[topic.subject]
+
+    def due(self, today: datetime.date) -> list[Topic]:
+        """Temas desbloqueados con ``next_review <= today``, por id."""
+        today = today.toordinal()
+        heap = self._heap
+        while heap and heap[0][0] <= today:
+            next_review, topic_id = heapq.heappop(heap)
+            topic = self._rows.get(topic_id)
+            if topic is not None and topic.unlocked and topic.next_review == next_review:
+                self._due.add(topic_id)
+        self._drained_until = max(self._drained_until, today)
+        return [self._rows[i] for i in sorted(self._due)]
+
+    def progress(self) -> int:
+        """Porcentaje de maestría total (suma de niveles sobre el máximo)."""
+        if not self._rows:
+            return 0
+        return int(self.total_level / (len(self._rows) * MAX_LEVEL) * 100)
+
+    def subject_mastery(self) -> list[dict]:
+        """% de maestría por asignatura, en orden alfabético."""
+        return [
+            {"subject": subject, "mastery": levels * 100 // (count * MAX_LEVEL)}
+            for subject, (levels, count) in sorted(self._subjects.items())
+        ]
@@ -0,0 +1,54 @@
+"""Spans por evento: cuánto tiempo y cuántas llamadas a Supabase cuesta cada handler.
+
+El middleware abre un ``Span`` al recibir el evento y lo guarda en una
+ContextVar; ``db.py`` y las vars computadas apuntan en él sus llamadas y
+recálculos mientras el handler corre (los handlers en segundo plano heredan
+el span del evento que los lanzó).
+"""
+import collections
+import contextvars
+import time
+from dataclasses import dataclass, field
+
+
+@dataclass(slots=True)
+class Span:
+    handler: str
+    started: float = field(default_factory=time.perf_counter)
+    db_calls: list[str] = field(default_factory=list)  # operaciones en orden ("GET topics")
+    db_seconds: float = 0.0
+    db_bytes: int = 0
+    recomputes: collections.Counter = field(default_factory=collections.Counter)
+    recompute_seconds: float = 0.0
+    delta_bytes: int = 0
+    serialize_seconds: float = 0.0
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+
+_current: contextvars.ContextVar[Span | None] = contextvars.ContextVar("span", default=None)
+
+
+def start(handler: str) -> Span:
+    span = Span(handler)
+    _current.set(span)
+    return span
+
+
+def current() -> Span | None:
+    return _current.get()
+
+
+def record_db_call(operation: str, seconds: float, nbytes: int):
+    if (span := _current.get()) is not None:
+        span.db_calls.append(operation)
+        span.db_seconds += seconds
+        span.db_bytes += nbytes
+
+
+def record_recompute(name: str, seconds: float):
+    if (span := _current.get()) is not None:
+        span.recomputes[name] += 1
+        span.recompute_seconds += seconds
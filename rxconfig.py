@@ -4,4 +4,9 @@ import reflex as rx
 config = rx.Config(
     app_name="pau_elite",
     frontend_port=int(os.environ.get("PORT", 3000)),
+    # Con REDIS_URL el estado de cada sesión vive en Redis y el backend arranca
+    # 2 × CPU + 1 workers (o GRANIAN_WORKERS; la regla de reflex run y de
+    # pau_elite.serve): cualquier worker atiende cualquier pestaña, sin sesiones
+    # pegajosas. Sin él, un único proceso con el estado en disco.
+    redis_url=os.environ.get("REDIS_URL") or None,
 )
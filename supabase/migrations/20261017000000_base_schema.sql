@@ -0,0 +1,34 @@
+-- Esquema base de PAU Elite (tablas que la app ya usaba en producción)
+create table if not exists public.topics (
+    id bigint generated by default as identity primary key,
+    user_id uuid not null references auth.users (id) on delete cascade,
+    subject text not null,
+    name text not null,
+    category text not null,
+    unlocked boolean not null default false,
+    level integer not null default 0,
+    next_review date not null default current_date,
+    extra_queue boolean not null default false,
+    created_at timestamptz not null default now()
+);
+
+create table if not exists public.notes (
+    id bigint generated by default as identity primary key,
+    user_id uuid not null references auth.users (id) on delete cascade,
+    text text not null,
+    created_at timestamptz not null default now()
+);
+
+create index if not exists topics_user_id_idx on public.topics (user_id, id);
+create index if not exists notes_user_created_idx on public.notes (user_id, created_at desc);
+
+alter table public.topics enable row level security;
+alter table public.notes enable row level security;
+
+drop policy if exists "topics_own_rows" on public.topics;
+create policy "topics_own_rows" on public.topics
+    for all using (user_id = auth.uid()) with check (user_id = auth.uid());
+
+drop policy if exists "notes_own_rows" on public.notes;
+create policy "notes_own_rows" on public.notes
+    for all using (user_id = auth.uid()) with check (user_id = auth.uid());
@@ -0,0 +1,8 @@
+-- Memoria de repaso por tema para los planificadores (pau_elite/scheduler.py)
+alter table public.topics
+    add column if not exists ease double precision not null default 2.5,
+    add column if not exists stability double precision not null default 0,
+    add column if not exists difficulty double precision not null default 0,
+    add column if not exists reps integer not null default 0,
+    add column if not exists last_rating text check (last_rating in ('ok', 'mid', 'bad')),
+    add column if not exists last_review date;
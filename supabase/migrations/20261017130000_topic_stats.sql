@@ -0,0 +1,25 @@
+-- Estadísticas del dashboard agregadas en Postgres (State.load_stats)
+create index if not exists topics_user_due_idx
+    on public.topics (user_id, next_review) where unlocked;
+
+create or replace function public.topic_stats(p_today date default current_date)
+returns table (subject text, topics integer, levels integer, mastery integer, due integer, overdue integer)
+language sql
+stable
+security invoker
+set search_path = public
+as $$
+    select
+        t.subject,
+        count(*)::integer,
+        sum(t.level)::integer,
+        (sum(t.level) * 100 / (count(*) * 5))::integer,
+        (count(*) filter (where t.unlocked and t.next_review <= p_today))::integer,
+        (count(*) filter (where t.unlocked and t.next_review < p_today))::integer
+    from public.topics t
+    where t.user_id = auth.uid()
+    group by t.subject
+    order by t.subject;
+$$;
+
+grant execute on function public.topic_stats(date) to authenticated;
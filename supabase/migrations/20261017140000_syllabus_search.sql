@@ -0,0 +1,9 @@
+-- Temario paginado por keyset sobre (subject, id) y búsqueda por nombre
+create extension if not exists pg_trgm with schema extensions;
+
+create index if not exists topics_user_subject_id_idx
+    on public.topics (user_id, subject, id);
+
+-- Sirve a los filtros name=ilike.*texto* de State._fetch_syllabus_page
+create index if not exists topics_name_trgm_idx
+    on public.topics using gin (name extensions.gin_trgm_ops);
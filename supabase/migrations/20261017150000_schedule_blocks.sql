@@ -0,0 +1,20 @@
+-- Horario semanal editable por usuario (minutos desde las 00:00 de cada día; 0 = lunes)
+create table if not exists public.schedule_blocks (
+    id bigint generated by default as identity primary key,
+    user_id uuid not null references auth.users (id) on delete cascade,
+    weekday smallint not null check (weekday between 0 and 6),
+    start_minute smallint not null check (start_minute between 0 and 1439),
+    end_minute smallint not null check (end_minute > start_minute and end_minute <= 1440),
+    type text not null,
+    name text not null,
+    created_at timestamptz not null default now()
+);
+
+-- Los solapes los valida la app al compilar el horario antes de escribir
+create index if not exists schedule_blocks_user_idx on public.schedule_blocks (user_id, weekday, start_minute);
+
+alter table public.schedule_blocks enable row level security;
+
+drop policy if exists "schedule_blocks_own_rows" on public.schedule_blocks;
+create policy "schedule_blocks_own_rows" on public.schedule_blocks
+    for all using (user_id = auth.uid()) with check (user_id = auth.uid());
@@ -0,0 +1,106 @@
+-- Temario por defecto guardado una sola vez y copiado a cada usuario en el servidor
+create table if not exists public.syllabus_templates (
+    id bigint generated by default as identity primary key,
+    subject text not null,
+    name text not null,
+    category text not null,
+    position integer not null,
+    unique (subject, name)
+);
+
+alter table public.syllabus_templates enable row level security;
+
+drop policy if exists "syllabus_templates_read" on public.syllabus_templates;
+create policy "syllabus_templates_read" on public.syllabus_templates
+    for select to authenticated using (true);
+
+insert into public.syllabus_templates (subject, name, category, position)
+values
+    ('Matemáticas II', '1. Límites y Continuidad', 'science', 1),
+    ('Matemáticas II', '2. Derivadas', 'science', 2),
+    ('Matemáticas II', '3. Representación de Funciones', 'science', 3),
+    ('Matemáticas II', '4. Integral Indefinida', 'science', 4),
+    ('Matemáticas II', '5. Integral Definida', 'science', 5),
+    ('Matemáticas II', '6. Matrices', 'science', 6),
+    ('Matemáticas II', '7. Determinantes', 'science', 7),
+    ('Matemáticas II', '8. Sistemas de Ecuaciones', 'science', 8),
+    ('Matemáticas II', '9. Vectores', 'science', 9),
+    ('Matemáticas II', '10. Rectas y Planos', 'science', 10),
+    ('Matemáticas II', '11. Posiciones Relativas', 'science', 11),
+    ('Matemáticas II', '12. Ángulos y Distancias', 'science', 12),
+    ('Física', 'Herramientas matemáticas', 'science', 13),
+    ('Física', 'Vibraciones: M.A.S.', 'science', 14),
+    ('Física', 'Ondas Mecánicas', 'science', 15),
+    ('Física', 'Óptica Geométrica', 'science', 16),
+    ('Física', 'Campo Gravitatorio', 'science', 17),
+    ('Física', 'Campo Eléctrico', 'science', 18),
+    ('Física', 'Campo Magnético', 'science', 19),
+    ('Física', 'Inducción Electromagnética', 'science', 20),
+    ('Física', 'Física Moderna', 'science', 21),
+    ('Física', 'Física Cuántica', 'science', 22),
+    ('Física', 'Física Nuclear', 'science', 23),
+    ('Química', 'T1: Estructura de la materia', 'science', 24),
+    ('Química', 'T2: Enlace Químico', 'science', 25),
+    ('Química', 'T3: Termoquímica', 'science', 26),
+    ('Química', 'T4: Cinética Química', 'science', 27),
+    ('Química', 'T5: Equilibrio Químico', 'science', 28),
+    ('Química', 'T6: Reacciones Ácido-Base', 'science', 29),
+    ('Química', 'T7: Reacciones REDOX', 'science', 30),
+    ('Química', 'T8: Química del Carbono', 'science', 31),
+    ('Historia de España', 'Tema 1: Prehistoria', 'memory', 32),
+    ('Historia de España', 'Tema 2: Edad Media', 'memory', 33),
+    ('Historia de España', 'Tema 3: Edad Moderna', 'memory', 34),
+    ('Historia de España', 'Tema 4: Crisis Antiguo Régimen', 'memory', 35),
+    ('Historia de España', 'Tema 5: Estado Liberal', 'memory', 36),
+    ('Historia de España', 'Tema 6: Restauración', 'memory', 37),
+    ('Historia de España', 'Tema 7: SXIX Econ/Soc', 'memory', 38),
+    ('Historia de España', 'Tema 8: Alfonso XIII', 'memory', 39),
+    ('Historia de España', 'Tema 9: Segunda República', 'memory', 40),
+    ('Historia de España', 'Tema 10: Guerra Civil', 'memory', 41),
+    ('Historia de España', 'Tema 11: Franquismo', 'memory', 42),
+    ('Historia de España', 'Tema 12: Transición', 'memory', 43),
+    ('Historia de España', 'Tema 13: Democracia', 'memory', 44),
+    ('Historia de España', 'Tema 14: Europa', 'memory', 45),
+    ('Historia de España', 'Tema 15: Mundo', 'memory', 46),
+    ('Inglés', 'Grammar: Tenses Mix', 'skills', 47),
+    ('Inglés', 'Grammar: Reported Speech', 'skills', 48),
+    ('Inglés', 'Grammar: Conditionals', 'skills', 49),
+    ('Inglés', 'Writing: Opinion Essay', 'skills', 50),
+    ('Inglés', 'Reading Practice', 'skills', 51)
+on conflict (subject, name) do nothing;
+
+-- Logins simultáneos pudieron sembrar el temario dos veces: se conserva la copia
+-- con más progreso (y, a igualdad, la más antigua) antes de exigir unicidad
+delete from public.topics t
+using (
+    select id, row_number() over (
+        partition by user_id, subject, name
+        order by level desc, last_review desc nulls last, id
+    ) as copy
+    from public.topics
+) ranked
+where t.id = ranked.id and ranked.copy > 1;
+
+create unique index if not exists topics_user_subject_name_key
+    on public.topics (user_id, subject, name);
+
+-- Copia las plantillas al usuario actual; idempotente y en una sola sentencia
+create or replace function public.seed_user_syllabus(p_today date default current_date)
+returns integer
+language sql
+volatile
+security invoker
+set search_path = public
+as $$
+    with inserted as (
+        insert into public.topics (user_id, subject, name, category, unlocked, level, next_review)
+        select auth.uid(), s.subject, s.name, s.category, false, 0, p_today
+        from public.syllabus_templates s
+        order by s.position
+        on conflict (user_id, subject, name) do nothing
+        returning 1
+    )
+    select count(*)::integer from inserted;
+$$;
+
+grant execute on function public.seed_user_syllabus(date) to authenticated;
@@ -0,0 +1,36 @@
+-- Versión barata de los datos de un usuario para revalidar la caché de lecturas
+alter table public.topics add column if not exists updated_at timestamptz not null default now();
+alter table public.notes add column if not exists updated_at timestamptz not null default now();
+
+create or replace function public.touch_updated_at()
+returns trigger
+language plpgsql
+as $$
+begin
+    new.updated_at = now();
+    return new;
+end;
+$$;
+
+drop trigger if exists topics_touch_updated_at on public.topics;
+create trigger topics_touch_updated_at before update on public.topics
+    for each row execute function public.touch_updated_at();
+
+drop trigger if exists notes_touch_updated_at on public.notes;
+create trigger notes_touch_updated_at before update on public.notes
+    for each row execute function public.touch_updated_at();
+
+-- Nº de filas y updated_at máximo por tabla (los borrados cambian el recuento)
+create or replace function public.data_version()
+returns table (table_name text, rows integer, updated_at timestamptz)
+language sql
+stable
+security invoker
+set search_path = public
+as $$
+    select 'topics', count(*)::integer, max(t.updated_at) from public.topics t where t.user_id = auth.uid()
+    union all
+    select 'notes', count(*)::integer, max(n.updated_at) from public.notes n where n.user_id = auth.uid();
+$$;
+
+grant execute on function public.data_version() to authenticated;
@@ -0,0 +1,17 @@
+-- Cambios de topics y notes publicados para Realtime (State.listen_changes)
+do $$
+begin
+    if not exists (
+        select 1 from pg_publication_tables
+        where pubname = 'supabase_realtime' and schemaname = 'public' and tablename = 'topics'
+    ) then
+        alter publication supabase_realtime add table public.topics;
+    end if;
+    if not exists (
+        select 1 from pg_publication_tables
+        where pubname = 'supabase_realtime' and schemaname = 'public' and tablename = 'notes'
+    ) then
+        alter publication supabase_realtime add table public.notes;
+    end if;
+end;
+$$;
@@ -0,0 +1,38 @@
+-- Notas paginadas por keyset sobre (created_at, id) y búsqueda de texto completo
+create index if not exists notes_user_created_id_idx
+    on public.notes (user_id, created_at desc, id desc);
+
+-- El nuevo índice cubre el anterior (user_id, created_at desc)
+drop index if exists public.notes_user_created_idx;
+
+alter table public.notes
+    add column if not exists search tsvector
+    generated always as (to_tsvector('spanish', coalesce(text, ''))) stored;
+
+create index if not exists notes_search_idx on public.notes using gin (search);
+
+-- Búsqueda ordenada por relevancia; se pagina por keyset sobre (rank, id)
+create or replace function public.search_notes(
+    p_query text,
+    p_limit integer default 20,
+    p_after_rank real default null,
+    p_after_id bigint default null
+)
+returns table (id bigint, text text, created_at timestamptz, rank real)
+language sql
+stable
+security invoker
+set search_path = public
+as $$
+    select r.id, r.text, r.created_at, r.rank
+    from (
+        select n.id, n.text, n.created_at, ts_rank_cd(n.search, q)::real as rank
+        from public.notes n, websearch_to_tsquery('spanish', p_query) q
+        where n.user_id = auth.uid() and n.search @@ q
+    ) r
+    where p_after_id is null or (r.rank, r.id) < (p_after_rank, p_after_id)
+    order by r.rank desc, r.id desc
+    limit least(greatest(p_limit, 1), 100);
+$$;
+
+grant execute on function public.search_notes(text, integer, real, bigint) to authenticated;
@@ -0,0 +1,59 @@
+-- Historial de repasos: un evento por clic, solo se añade (nunca se edita ni se borra)
+create table if not exists public.review_events (
+    id bigint generated always as identity primary key,
+    user_id uuid not null references auth.users (id) on delete cascade,
+    -- Borrar un tema no borra su historial: el evento se queda sin tema (fuera de los agregados por asignatura)
+    topic_id bigint references public.topics (id) on delete set null,
+    rating smallint not null check (rating between 1 and 3),  -- 1 bad, 2 mid, 3 ok (scheduler.RATINGS)
+    reviewed_at timestamptz not null,
+    prior_interval smallint not null default 0,  -- días programados en el repaso anterior (0 = primero)
+    elapsed_days smallint not null default 0,    -- días reales desde el repaso anterior
+    -- Reintentar un lote de la cola de repasos no duplica eventos
+    unique (user_id, topic_id, reviewed_at)
+);
+
+alter table public.review_events enable row level security;
+
+drop policy if exists "review_events_insert_own" on public.review_events;
+create policy "review_events_insert_own" on public.review_events
+    for insert with check (user_id = auth.uid());
+
+drop policy if exists "review_events_select_own" on public.review_events;
+create policy "review_events_select_own" on public.review_events
+    for select using (user_id = auth.uid());
+
+revoke update, delete, truncate on public.review_events from anon, authenticated;
+
+-- Agregados que recalcula pau_elite.analytics (se reemplazan enteros en cada pasada)
+create table if not exists public.review_retention (
+    subject text not null,
+    elapsed_days_min integer not null,
+    elapsed_days_max integer,  -- null = sin tope
+    reviews bigint not null,
+    recalled bigint not null,  -- repasos con nota distinta de bad
+    computed_at timestamptz not null default now(),
+    primary key (subject, elapsed_days_min)
+);
+
+create table if not exists public.review_category_stats (
+    category text primary key,
+    reviews bigint not null,
+    bad bigint not null,
+    mid bigint not null,
+    ok bigint not null,
+    mean_prior_interval double precision not null,
+    mean_elapsed_days double precision not null,
+    computed_at timestamptz not null default now()
+);
+
+alter table public.review_retention enable row level security;
+alter table public.review_category_stats enable row level security;
+
+-- Son agregados de todos los usuarios, sin datos personales: lectura para cualquier sesión
+drop policy if exists "review_retention_read" on public.review_retention;
+create policy "review_retention_read" on public.review_retention
+    for select to authenticated using (true);
+
+drop policy if exists "review_category_stats_read" on public.review_category_stats;
+create policy "review_category_stats_read" on public.review_category_stats
+    for select to authenticated using (true);
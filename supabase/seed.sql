@@ -0,0 +1,30 @@
+-- Datos para el entorno local (`supabase start` / `supabase db reset`).
+-- Alumno de prueba: alumno@example.com / alumno-local
+insert into auth.users (
+    id, instance_id, aud, role, email, encrypted_password, email_confirmed_at,
+    confirmation_token, recovery_token, email_change_token_new, email_change,
+    raw_app_meta_data, raw_user_meta_data, created_at, updated_at
+)
+values (
+    '00000000-0000-0000-0000-0000000000a1',
+    '00000000-0000-0000-0000-000000000000',
+    'authenticated',
+    'authenticated',
+    'alumno@example.com',
+    crypt('alumno-local', gen_salt('bf')),
+    now(), '', '', '', '',
+    '{"provider": "email", "providers": ["email"]}', '{}',
+    now(), now()
+)
+on conflict (id) do nothing;
+
+insert into auth.identities (id, user_id, provider_id, identity_data, provider, created_at, updated_at)
+values (
+    '00000000-0000-0000-0000-0000000000a1',
+    '00000000-0000-0000-0000-0000000000a1',
+    '00000000-0000-0000-0000-0000000000a1',
+    '{"sub": "00000000-0000-0000-0000-0000000000a1", "email": "alumno@example.com"}',
+    'email',
+    now(), now()
+)
+on conflict do nothing;
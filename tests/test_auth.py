@@ -0,0 +1,26 @@
+"""Verificación local del access token."""
+import asyncio
+
+import pytest
+
+from pau_elite.auth import AuthConfigError, InvalidSession, JwtVerifier
+from tools.fake_supabase import JWT_SECRET, make_jwt
+
+USER_ID = "11111111-1111-1111-1111-111111111111"
+
+
+def test_hs256_token_is_verified_with_the_secret():
+    claims = asyncio.run(JwtVerifier(JWT_SECRET).verify(None, make_jwt(USER_ID, "alumno@academia.es")))
+    assert claims["sub"] == USER_ID
+
+
+def test_wrong_secret_is_an_invalid_session():
+    with pytest.raises(InvalidSession):
+        asyncio.run(JwtVerifier("otro-secreto-de-al-menos-treinta-y-dos-bytes").verify(None, make_jwt(USER_ID, "alumno@academia.es")))
+
+
+def test_missing_secret_is_a_configuration_error(monkeypatch):
+    # No es culpa de la cookie: restore_session no debe borrarla
+    monkeypatch.delenv("SUPABASE_JWT_SECRET", raising=False)
+    with pytest.raises(AuthConfigError):
+        asyncio.run(JwtVerifier().verify(None, make_jwt(USER_ID, "alumno@academia.es")))
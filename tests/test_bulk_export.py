@@ -0,0 +1,58 @@
+"""Descarga /export con la cookie de sesión que guarda el navegador (sin cabecera Bearer)."""
+import pytest
+from reflex.compiler.utils import compile_client_storage
+from starlette.testclient import TestClient
+
+from pau_elite import bulk
+from pau_elite.pau_elite import AUTH_COOKIE, State
+from tools.fake_supabase import JWT_SECRET, make_jwt, start_in_thread
+
+USER_ID = "11111111-1111-1111-1111-111111111111"
+
+
+@pytest.fixture
+def supabase(monkeypatch):
+    server = start_in_thread()
+    monkeypatch.setenv("SUPABASE_URL", server.url)
+    monkeypatch.setenv("SUPABASE_KEY", "local")
+    monkeypatch.setenv("SUPABASE_JWT_SECRET", JWT_SECRET)
+    yield server
+    server.shutdown()
+
+
+def browser_cookie_name() -> str:
+    # El mismo nombre con el que el frontend guarda y lee la cookie (state.js)
+    cookies = compile_client_storage(State)["cookies"]
+    state_key = next(key for key in cookies if key.endswith(".auth_token_rx_state_"))
+    return cookies[state_key].get("name") or state_key
+
+
+def test_auth_cookie_has_fixed_browser_name():
+    assert browser_cookie_name() == AUTH_COOKIE
+
+
+def test_export_with_browser_cookie_only(supabase, monkeypatch):
+    monkeypatch.setattr(bulk, "EXPORT_PAGE_SIZE", 7)
+    supabase.db.insert("topics", [
+        {"user_id": USER_ID, "subject": "Matemáticas", "name": f"Tema {i}", "category": "skills",
+         "unlocked": False, "level": 0, "next_review": "2026-10-18"}
+        for i in range(20)
+    ])
+    supabase.db.insert("topics", [{"user_id": "otro", "subject": "Matemáticas", "name": "Ajeno", "category": "skills"}])
+
+    client = TestClient(bulk.download_api(AUTH_COOKIE))
+    client.cookies.set(browser_cookie_name(), make_jwt(USER_ID, "alumno@academia.es"))
+    response = client.get("/export/topics.csv")
+
+    assert response.status_code == 200
+    assert response.headers["content-disposition"] == 'attachment; filename="topics.csv"'
+    lines = response.text.splitlines()
+    assert lines[0] == ",".join(bulk.COLUMNS["topics"])
+    assert len(lines) == 21
+    assert "Ajeno" not in response.text
+
+
+def test_export_without_session_is_rejected(supabase):
+    client = TestClient(bulk.download_api(AUTH_COOKIE))
+    assert client.get("/export/topics.csv").status_code == 401
+    assert client.get("/export/schedule_blocks.csv").status_code == 404
@@ -0,0 +1,26 @@
+"""Turnos de los bucles por pestaña: una marca guardada por un worker muerto no bloquea."""
+from pau_elite import leases
+
+
+def test_claim_is_refused_while_the_loop_lives():
+    owner = leases.claim("")
+    assert owner is not None and owner.startswith(leases.WORKER_ID)
+    assert leases.running(owner)
+    assert leases.claim(owner) is None
+    assert leases.release(owner, owner) == ""
+    assert not leases.running(owner)
+
+
+def test_lease_from_a_dead_worker_can_be_claimed():
+    # Lo que queda en Redis o en disco tras un despliegue: ningún bucle vivo lo tiene
+    stale = "otro-host:1234:abcdef:0123abcd"
+    owner = leases.claim(stale)
+    assert owner is not None and owner != stale
+    leases.release(owner, owner)
+
+
+def test_release_keeps_a_newer_owner():
+    old = leases.claim("")
+    # Otro worker reclamó el turno (la pestaña reconectó allí): el bucle viejo no lo borra
+    assert leases.release("otro-host:1:abcdef:feed", old) == "otro-host:1:abcdef:feed"
+    assert not leases.running(old)
@@ -0,0 +1,43 @@
+"""Planificadores de repasos: el legacy reproduce las reglas originales de la app."""
+import datetime
+
+import pytest
+
+from pau_elite.scheduler import STRATEGIES, LegacyScheduler, Scheduler
+
+TODAY = datetime.date(2026, 10, 17)
+
+
+def baseline_review(level: int, rating: str) -> tuple[int, datetime.date]:
+    # Las reglas de review_topic antes de los planificadores
+    if rating == "ok":
+        level = min(level + 1, 5)
+        days = level * 5 + 3
+    elif rating == "mid":
+        days = 3
+    else:
+        level, days = 1, 1
+    return level, TODAY + datetime.timedelta(days=days)
+
+
+@pytest.mark.parametrize("rating", ["ok", "mid", "bad"])
+@pytest.mark.parametrize("level", range(6))
+def test_legacy_matches_the_original_intervals(level, rating):
+    topic = {"level": level, "next_review": str(TODAY), "last_review": "2026-10-01", "last_rating": "ok"}
+    changes = LegacyScheduler().review(topic, rating, TODAY)
+    expected_level, expected_review = baseline_review(level, rating)
+    assert changes["level"] == expected_level
+    assert changes["next_review"] == str(expected_review)
+    assert changes["last_review"] == str(TODAY)
+
+
+def test_scheduler_is_abstract():
+    with pytest.raises(TypeError):
+        Scheduler()
+
+
+@pytest.mark.parametrize("name", STRATEGIES)
+def test_every_strategy_schedules_a_first_review_in_the_future(name):
+    topic = {"level": 0, "next_review": str(TODAY)}
+    changes = STRATEGIES[name]().review(topic, "ok", TODAY)
+    assert changes["next_review"] > str(TODAY)
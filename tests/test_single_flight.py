@@ -0,0 +1,52 @@
+"""Llamadas compartidas: quien espera recibe el resultado, el error o un fallo normal si se cancela."""
+import asyncio
+
+import pytest
+
+from pau_elite.single_flight import FlightCancelled, SingleFlight
+
+
+def test_waiters_share_one_call():
+    calls = 0
+
+    async def call():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return calls
+
+    async def main():
+        flights = SingleFlight()
+        return await asyncio.gather(*(flights.run("k", call) for _ in range(5)))
+
+    assert asyncio.run(main()) == [1] * 5
+    assert calls == 1
+
+
+def test_cancelled_leader_fails_waiters_without_cancelling_them():
+    async def main():
+        flights = SingleFlight()
+        leader = asyncio.ensure_future(flights.run("k", lambda: asyncio.sleep(10)))
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(flights.run("k", lambda: asyncio.sleep(10)))
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(FlightCancelled):
+            await asyncio.wait_for(waiter, 1)
+        assert "k" not in flights
+
+    asyncio.run(main())
+
+
+def test_cancelled_error_type_is_configurable():
+    async def main():
+        flights = SingleFlight(lambda key: LookupError(key))
+        leader = asyncio.ensure_future(flights.run("k", lambda: asyncio.sleep(10)))
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(flights.run("k", lambda: asyncio.sleep(10)))
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(LookupError):
+            await asyncio.wait_for(waiter, 1)
+
+    asyncio.run(main())
@@ -0,0 +1,53 @@
+"""Horario semanal en Europe/Madrid alrededor de los cambios de hora de 2026."""
+import datetime
+
+import numpy as np
+import pytz
+
+from pau_elite.timetable import Timetable
+
+UTC = pytz.utc
+# Domingo 29-3-2026: de 02:00 se pasa a 03:00. Domingo 25-10-2026: de 03:00 se vuelve a 02:00
+SPRING, AUTUMN = datetime.date(2026, 3, 29), datetime.date(2026, 10, 25)
+
+TIMETABLE = Timetable([{"weekday": 6, "start_minute": 60, "end_minute": 150, "type": "sleep", "name": "Madrugada"}])
+
+
+def utc(day: datetime.date, hour: int, minute: int) -> datetime.datetime:
+    return UTC.localize(datetime.datetime.combine(day, datetime.time(hour, minute)))
+
+
+def epoch(moment: datetime.datetime) -> int:
+    return int(moment.timestamp())
+
+
+def test_block_ending_in_the_spring_gap_ends_at_the_jump():
+    now = utc(SPRING, 0, 30)  # 01:30 CET
+    status = TIMETABLE.block_at(now)
+    assert status.name == "Madrugada"
+    # 02:30 no existe: el bloque acaba con el salto (03:00 CEST = 01:00 UTC)
+    assert status.ends_at == utc(SPRING, 1, 0)
+    assert status.next_transition == utc(SPRING, 1, 0)
+    assert status.ends_at.tzinfo.zone == "Europe/Madrid"
+
+
+def test_block_ending_in_the_autumn_overlap_ends_at_the_next_occurrence():
+    # 01:30 CEST: el bloque acaba en la primera vez que son las 02:30
+    first = TIMETABLE.block_at(utc(AUTUMN - datetime.timedelta(days=1), 23, 30))
+    assert first.ends_at == utc(AUTUMN, 0, 30)
+    # 02:10 CET (la hora repetida): la primera 02:30 ya pasó, acaba en la segunda
+    second = TIMETABLE.block_at(utc(AUTUMN, 1, 10))
+    assert second.name == "Madrugada"
+    assert second.ends_at == utc(AUTUMN, 1, 30)
+
+
+def test_vectorized_lookup_matches_block_at_across_dst():
+    # Cada 10 minutos desde las 22:00 UTC del sábado hasta las 04:00 UTC del domingo
+    moments = [
+        utc(day - datetime.timedelta(days=1), 22, 0) + datetime.timedelta(minutes=10 * i)
+        for day in (SPRING, AUTUMN) for i in range(36)
+    ]
+    indices = TIMETABLE.block_indices(np.array([epoch(m) for m in moments]))
+    expected = [0 if TIMETABLE.block_at(m).name == "Madrugada" else -1 for m in moments]
+    assert indices.tolist() == expected
+    assert 0 in expected and -1 in expected
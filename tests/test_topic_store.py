@@ -0,0 +1,47 @@
+"""Cola de repasos del TopicStore: lo pendiente sale del heap y sigue al día tras cada cambio."""
+import datetime
+import pickle
+
+from pau_elite.topic_store import TopicStore
+
+TODAY = datetime.date(2026, 10, 17)
+
+
+def row(topic_id: int, next_review: str, unlocked: bool = True, level: int = 1) -> dict:
+    return {"id": topic_id, "subject": "Historia", "name": f"Tema {topic_id}", "category": "memory",
+            "unlocked": unlocked, "level": level, "next_review": next_review}
+
+
+def due_ids(store: TopicStore, day: datetime.date = TODAY) -> list[int]:
+    return [t.id for t in store.due(day)]
+
+
+def test_due_are_unlocked_topics_up_to_today_by_id():
+    store = TopicStore([
+        row(3, "2026-10-17"), row(1, "2026-10-10"), row(2, "2026-10-18"), row(4, "2026-10-01", unlocked=False),
+    ])
+    assert due_ids(store) == [1, 3]
+    assert due_ids(store, TODAY + datetime.timedelta(days=1)) == [1, 2, 3]
+
+
+def test_changes_after_draining_update_the_due_list():
+    store = TopicStore([row(1, "2026-10-10"), row(2, "2026-10-20")])
+    assert due_ids(store) == [1]
+    # Repasado: sale de pendientes; su entrada vieja del heap se descarta
+    store.upsert(row(1, "2026-10-25"))
+    assert due_ids(store) == []
+    # Adelantado a hoy tras vaciar el heap hasta hoy
+    store.upsert(row(2, "2026-10-16"))
+    assert due_ids(store) == [2]
+    store.upsert(row(5, "2026-10-17", unlocked=False))
+    store.remove(2)
+    assert due_ids(store) == []
+    assert due_ids(store, datetime.date(2026, 10, 25)) == [1]
+
+
+def test_pickled_store_rebuilds_the_heap():
+    store = TopicStore([row(1, "2026-10-10", level=4), row(2, "2026-10-20", level=2)])
+    restored = pickle.loads(pickle.dumps(store))
+    assert due_ids(restored) == [1]
+    assert restored.total_level == 6
+    assert restored.subject_mastery() == [{"subject": "Historia", "mastery": 60}]
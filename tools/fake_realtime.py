@@ -0,0 +1,113 @@
+"""Doble local de Supabase Realtime (``postgres_changes`` sobre Phoenix).
+
+Se engancha a las escrituras de ``FakeDatabase`` y reenvía cada cambio a los
+canales cuyo filtro ``columna=eq.valor`` coincide. Como Realtime, los DELETE
+no se filtran y solo llevan la clave primaria en ``old_record``.
+
+Uso: lo arranca ``python -m tools.fake_supabase`` en ``--realtime-port``.
+"""
+import asyncio
+import datetime
+import json
+import threading
+
+from websockets.asyncio.server import serve
+from websockets.exceptions import ConnectionClosed
+
+_PG_TYPES = {bool: "bool", int: "int8", float: "float8", str: "text"}
+
+
+def _matches(binding: dict, table: str, change: str, record: dict) -> bool:
+    if binding.get("table") != table or binding.get("event") not in ("*", change):
+        return False
+    if change == "DELETE" or not binding.get("filter"):
+        return True
+    column, _, value = binding["filter"].partition("=eq.")
+    return str(record.get(column)) == value
+
+
+class FakeRealtimeServer:
+    def __init__(self, db):
+        self.db = db
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.port = 0
+        self.host = "127.0.0.1"
+        # websocket -> {topic: [bindings postgres_changes]}
+        self._channels: dict = {}
+        db.listeners.append(self._on_change)
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}/realtime/v1/websocket"
+
+    async def _handler(self, ws):
+        self._channels[ws] = {}
+        try:
+            async for raw in ws:
+                message = json.loads(raw)
+                topic, event = message.get("topic"), message.get("event")
+                response = {}
+                if event == "phx_join":
+                    bindings = message["payload"].get("config", {}).get("postgres_changes", [])
+                    self._channels[ws][topic] = bindings
+                    response = {"postgres_changes": [{**b, "id": i + 1} for i, b in enumerate(bindings)]}
+                elif event == "phx_leave":
+                    self._channels[ws].pop(topic, None)
+                await ws.send(json.dumps({
+                    "topic": topic,
+                    "event": "phx_reply",
+                    "payload": {"status": "ok", "response": response},
+                    "ref": message.get("ref"),
+                }))
+        except ConnectionClosed:
+            pass
+        finally:
+            self._channels.pop(ws, None)
+
+    def _on_change(self, table: str, change: str, record: dict, old_record: dict):
+        # Llega desde el hilo HTTP con el lock de la base tomado
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self._broadcast, table, change, record, old_record)
+
+    def _broadcast(self, table: str, change: str, record: dict, old_record: dict):
+        data = {
+            "schema": "public",
+            "table": table,
+            "commit_timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "type": change,
+            "columns": [{"name": k, "type": _PG_TYPES.get(type(v), "text")} for k, v in (record or old_record).items()],
+            "record": record,
+            "old_record": old_record,
+            "errors": None,
+        }
+        for ws, topics in list(self._channels.items()):
+            for topic, bindings in topics.items():
+                ids = [i + 1 for i, b in enumerate(bindings) if _matches(b, table, change, record)]
+                if ids:
+                    message = {"topic": topic, "event": "postgres_changes", "payload": {"data": data, "ids": ids}, "ref": None}
+                    asyncio.ensure_future(self._send(ws, json.dumps(message)))
+
+    @staticmethod
+    async def _send(ws, raw: str):
+        try:
+            await ws.send(raw)
+        except ConnectionClosed:
+            pass
+
+
+def start_in_thread(db, host: str = "127.0.0.1", port: int = 0) -> FakeRealtimeServer:
+    """Arranca el doble en un hilo con su propio bucle (``port=0`` elige uno libre)."""
+    server = FakeRealtimeServer(db)
+    server.host = host
+    ready = threading.Event()
+
+    async def run():
+        server.loop = asyncio.get_running_loop()
+        async with serve(server._handler, host, port) as ws_server:
+            server.port = ws_server.sockets[0].getsockname()[1]
+            ready.set()
+            await asyncio.Future()
+
+    threading.Thread(target=lambda: asyncio.run(run()), daemon=True).start()
+    ready.wait()
+    return server
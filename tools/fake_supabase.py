@@ -0,0 +1,437 @@
+"""Doble local de Supabase (Auth + PostgREST) para pruebas y benchmarks sin red.
+
+Uso:
+    python -m tools.fake_supabase --port 54321
+    SUPABASE_URL=http://127.0.0.1:54321 SUPABASE_KEY=local SUPABASE_JWT_SECRET=fake-supabase-jwt-secret-for-local-use \
+        SUPABASE_REALTIME_URL=ws://127.0.0.1:54323/realtime/v1/websocket reflex run
+
+Guarda las tablas en memoria y entiende el subconjunto de PostgREST que usa
+la app: filtros (``eq``, ``gt``, ``ilike``, ``or``...), ``order``, ``limit``,
+``select`` y ``Prefer``, más
+las funciones RPC de ``supabase/migrations`` reescritas en Python. Auth firma
+con HS256 (``JWT_SECRET``) y rota el refresh token en cada uso como GoTrue.
+"""
+import argparse
+import base64
+import datetime
+import hashlib
+import hmac
+import itertools
+import json
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qsl, urlsplit
+
+JWT_SECRET = "fake-supabase-jwt-secret-for-local-use"
+# Las plantillas del temario se leen de la propia migración (una sola fuente)
+TEMPLATES_MIGRATION = Path(__file__).resolve().parent.parent / "supabase/migrations/20261017160000_seed_user_syllabus.sql"
+_TEMPLATE_ROW = re.compile(r"^\s*\('((?:[^']|'')*)', '((?:[^']|'')*)', '((?:[^']|'')*)', (\d+)\)", re.M)
+
+
+def load_syllabus_templates(path: Path = TEMPLATES_MIGRATION) -> list[dict]:
+    return [
+        {"subject": subject.replace("''", "'"), "name": name.replace("''", "'"),
+         "category": category.replace("''", "'"), "position": int(position)}
+        for subject, name, category, position in _TEMPLATE_ROW.findall(path.read_text(encoding="utf-8"))
+    ]
+
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _now() -> str:
+    return datetime.datetime.now(datetime.timezone.utc).isoformat()
+
+
+def make_jwt(user_id: str, email: str, expires_in: int = 3600, secret: str = JWT_SECRET) -> str:
+    header = _b64(json.dumps({"alg": "HS256", "typ": "JWT"}).encode())
+    payload = _b64(json.dumps({
+        "sub": user_id,
+        "email": email,
+        "aud": "authenticated",
+        "role": "authenticated",
+        "exp": int(time.time()) + expires_in,
+    }).encode())
+    signature = hmac.new(secret.encode(), f"{header}.{payload}".encode(), hashlib.sha256).digest()
+    return f"{header}.{payload}.{_b64(signature)}"
+
+
+class FakeDatabase:
+    """Tablas en memoria con ids autoincrementales."""
+
+    def __init__(self):
+        self.tables: dict[str, list[dict]] = {"topics": [], "notes": []}
+        self.lock = threading.Lock()
+        self._ids = itertools.count(1)
+        # refresh token vigente -> (user_id, email); se gasta al usarlo
+        self.refresh_tokens: dict[str, tuple[str, str]] = {}
+        # Callbacks (tabla, INSERT/UPDATE/DELETE, fila, fila anterior) para el doble de Realtime
+        self.listeners: list = []
+        self.insert("syllabus_templates", load_syllabus_templates())
+
+    def emit(self, table: str, change: str, record: dict, old_record: dict):
+        for listener in self.listeners:
+            listener(table, change, dict(record), dict(old_record))
+
+    def rows(self, table: str) -> list[dict]:
+        return self.tables.setdefault(table, [])
+
+    def insert(self, table: str, rows: list[dict]) -> list[dict]:
+        created = []
+        for row in rows:
+            row = dict(row)
+            row.setdefault("id", next(self._ids))
+            row.setdefault("created_at", _now())
+            row["updated_at"] = row["created_at"]
+            self.rows(table).append(row)
+            created.append(row)
+            self.emit(table, "INSERT", row, {})
+        return created
+
+
+def jwt_claims(token: str) -> dict:
+    """Claims de un JWT sin verificar la firma (el doble confía en sus tokens)."""
+    try:
+        payload = token.split(".")[1]
+        return json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+    except (IndexError, ValueError):
+        return {}
+
+
+def rpc_topic_stats(db: "FakeDatabase", user_id: str, params: dict) -> list[dict]:
+    today = params.get("p_today") or time.strftime("%Y-%m-%d")
+    subjects: dict[str, dict] = {}
+    for t in db.rows("topics"):
+        if t.get("user_id") != user_id:
+            continue
+        s = subjects.setdefault(t["subject"], {"subject": t["subject"], "topics": 0, "levels": 0, "due": 0, "overdue": 0})
+        s["topics"] += 1
+        s["levels"] += t.get("level", 0)
+        if t.get("unlocked") and t["next_review"] <= today:
+            s["due"] += 1
+            s["overdue"] += t["next_review"] < today
+    for s in subjects.values():
+        s["mastery"] = s["levels"] * 100 // (s["topics"] * 5)
+    return [subjects[k] for k in sorted(subjects)]
+
+
+def rpc_seed_user_syllabus(db: "FakeDatabase", user_id: str, params: dict) -> int:
+    # INSERT ... SELECT ... ON CONFLICT (user_id, subject, name) DO NOTHING
+    today = params.get("p_today") or time.strftime("%Y-%m-%d")
+    existing = {(t["subject"], t["name"]) for t in db.rows("topics") if t.get("user_id") == user_id}
+    new = [
+        {"user_id": user_id, "subject": s["subject"], "name": s["name"], "category": s["category"],
+         "unlocked": False, "level": 0, "next_review": today, "extra_queue": False}
+        for s in sorted(db.rows("syllabus_templates"), key=lambda s: s["position"])
+        if (s["subject"], s["name"]) not in existing
+    ]
+    return len(db.insert("topics", new))
+
+
+def rpc_data_version(db: "FakeDatabase", user_id: str, params: dict) -> list[dict]:
+    result = []
+    for table in ("topics", "notes"):
+        rows = [r for r in db.rows(table) if r.get("user_id") == user_id]
+        result.append({"table_name": table, "rows": len(rows), "updated_at": max((r["updated_at"] for r in rows), default=None)})
+    return result
+
+
+def rpc_search_notes(db: "FakeDatabase", user_id: str, params: dict) -> list[dict]:
+    # Aproxima websearch_to_tsquery + ts_rank_cd: todas las palabras, rango por apariciones
+    terms = re.findall(r"\w+", (params.get("p_query") or "").lower())
+    after_rank, after_id = params.get("p_after_rank"), params.get("p_after_id")
+    found = []
+    for n in db.rows("notes"):
+        words = re.findall(r"\w+", n["text"].lower())
+        if n.get("user_id") != user_id or not terms or not all(t in words for t in terms):
+            continue
+        rank = round(sum(words.count(t) for t in terms) / len(words), 6)
+        if after_id is None or (rank, n["id"]) < (after_rank, after_id):
+            found.append({"id": n["id"], "text": n["text"], "created_at": n["created_at"], "rank": rank})
+    found.sort(key=lambda r: (r["rank"], r["id"]), reverse=True)
+    return found[:min(max(int(params.get("p_limit", 20)), 1), 100)]
+
+
+RPCS = {
+    "topic_stats": rpc_topic_stats,
+    "search_notes": rpc_search_notes,
+    "data_version": rpc_data_version,
+    "seed_user_syllabus": rpc_seed_user_syllabus,
+}
+
+
+def _coerce(current, value: str):
+    if isinstance(current, bool):
+        return value.lower() == "true"
+    if isinstance(current, int):
+        return int(value)
+    if isinstance(current, float):
+        return float(value)
+    return value
+
+
+def _compare(current, op: str, value: str) -> bool:
+    if op == "is":
+        return current is None if value == "null" else current == (value == "true")
+    if current is None:
+        return False
+    if op == "ilike":
+        regex = ".*".join(re.escape(part) for part in re.split(r"[*%]", value))
+        return re.fullmatch(regex, str(current), re.IGNORECASE | re.DOTALL) is not None
+    value = _coerce(current, value)
+    if isinstance(value, str):
+        current = str(current)
+        if op in ("eq", "neq"):
+            current, value = current.lower(), value.lower()
+    return {
+        "eq": current == value,
+        "neq": current != value,
+        "gt": current > value,
+        "gte": current >= value,
+        "lt": current < value,
+        "lte": current <= value,
+    }[op]
+
+
+def _split_top_level(expr: str) -> list[str]:
+    parts, depth, quoted, current = [], 0, False, ""
+    i = 0
+    while i < len(expr):
+        ch = expr[i]
+        if ch == "\\" and quoted:
+            current += expr[i:i + 2]
+            i += 2
+            continue
+        if ch == '"':
+            quoted = not quoted
+        elif not quoted and ch == "(":
+            depth += 1
+        elif not quoted and ch == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and ch == ",":
+            parts.append(current)
+            current = ""
+            i += 1
+            continue
+        current += ch
+        i += 1
+    return parts + [current] if current else parts
+
+
+def _unquote(value: str) -> str:
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        return re.sub(r"\\(.)", r"\1", value[1:-1])
+    return value
+
+
+def _logic(row: dict, combinator: str, expr: str) -> bool:
+    """Evalúa ``or=(...)``/``and=(...)``, con grupos anidados."""
+    results = []
+    for part in _split_top_level(expr.strip()[1:-1]):
+        if part.startswith(("and(", "or(")):
+            name, _, rest = part.partition("(")
+            results.append(_logic(row, name, "(" + rest))
+        else:
+            column, op, value = part.split(".", 2)
+            results.append(_compare(row.get(column), op, _unquote(value)))
+    return any(results) if combinator == "or" else all(results)
+
+
+def _matches(row: dict, filters: list[tuple[str, str]]) -> bool:
+    for column, expr in filters:
+        if column in ("or", "and"):
+            if not _logic(row, column, expr):
+                return False
+            continue
+        op, _, value = expr.partition(".")
+        if not _compare(row.get(column), op, value):
+            return False
+    return True
+
+
+def _apply_query(rows: list[dict], params: list[tuple[str, str]]) -> list[dict]:
+    filters = [(k, v) for k, v in params if k not in ("select", "order", "limit", "offset", "on_conflict")]
+    result = [r for r in rows if _matches(r, filters)]
+    query = dict(params)
+    for term in reversed(query.get("order", "").split(",")):
+        if term:
+            column, _, direction = term.partition(".")
+            result.sort(key=lambda r: (r.get(column) is None, r.get(column)), reverse=direction.startswith("desc"))
+    if "offset" in query:
+        result = result[int(query["offset"]):]
+    if "limit" in query:
+        result = result[:int(query["limit"])]
+    select = query.get("select", "*")
+    if select != "*":
+        columns = select.split(",")
+        result = [{c: r.get(c) for c in columns} for r in result]
+    return result
+
+
+class FakeSupabaseHandler(BaseHTTPRequestHandler):
+    """Atiende Auth y PostgREST sobre ``server.db`` con keep-alive HTTP/1.1."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, body=None):
+        payload = b"" if body is None else json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length)) if length else None
+
+    def _dispatch(self):
+        if self.server.latency_ms:
+            time.sleep(self.server.latency_ms / 1000)
+        url = urlsplit(self.path)
+        params = parse_qsl(url.query, keep_blank_values=True)
+        body = self._read_json()
+        if url.path == "/auth/v1/health":
+            return self._send_json(200, {"name": "GoTrue", "description": "Doble local"})
+        if url.path == "/auth/v1/token" and self.command == "POST":
+            return self._token(dict(params).get("grant_type", "password"), body or {})
+        if url.path == "/auth/v1/logout" and self.command == "POST":
+            return self._logout()
+        if url.path.startswith("/rest/v1/rpc/"):
+            return self._rpc(url.path.removeprefix("/rest/v1/rpc/"), body or {})
+        if url.path.startswith("/rest/v1/"):
+            return self._table(url.path.removeprefix("/rest/v1/"), params, body)
+        self._send_json(404, {"message": f"Ruta desconocida: {url.path}"})
+
+    do_GET = do_POST = do_PATCH = do_DELETE = _dispatch
+
+    def _token(self, grant_type: str, body: dict):
+        if grant_type == "refresh_token":
+            with self.server.db.lock:
+                account = self.server.db.refresh_tokens.pop(body.get("refresh_token", ""), None)
+            if account is None:
+                return self._send_json(400, {"error": "invalid_grant", "error_description": "Invalid Refresh Token: Already Used"})
+            user_id, email = account
+        else:
+            email = body.get("email", "")
+            user_id = str(uuid.uuid5(uuid.NAMESPACE_URL, email))
+        refresh_token = uuid.uuid4().hex
+        with self.server.db.lock:
+            self.server.db.refresh_tokens[refresh_token] = (user_id, email)
+        self._send_json(200, {
+            "access_token": make_jwt(user_id, email, self.server.token_ttl),
+            "token_type": "bearer",
+            "expires_in": self.server.token_ttl,
+            "refresh_token": refresh_token,
+            "user": {"id": user_id, "email": email},
+        })
+
+    def _logout(self):
+        user_id = self._user_id()
+        with self.server.db.lock:
+            tokens = self.server.db.refresh_tokens
+            for token in [t for t, (uid, _) in tokens.items() if uid == user_id]:
+                del tokens[token]
+        self._send_json(204)
+
+    def _user_id(self) -> str:
+        token = self.headers.get("Authorization", "").removeprefix("Bearer ")
+        return jwt_claims(token).get("sub", "")
+
+    def _rpc(self, fn: str, params: dict):
+        if fn not in RPCS:
+            return self._send_json(404, {"message": f"Función desconocida: {fn}"})
+        with self.server.db.lock:
+            result = RPCS[fn](self.server.db, self._user_id(), params)
+        self._send_json(200, result)
+
+    def _table(self, name: str, params: list[tuple[str, str]], body):
+        db = self.server.db
+        representation = "return=representation" in self.headers.get("Prefer", "")
+
+        with db.lock:
+            if self.command == "GET":
+                return self._send_json(200, _apply_query(db.rows(name), params))
+
+            if self.command == "POST":
+                rows = body if isinstance(body, list) else [body]
+                prefer = self.headers.get("Prefer", "")
+                if "resolution=" in prefer:
+                    columns = dict(params).get("on_conflict", "id").split(",")
+                    existing = {tuple(r.get(c) for c in columns): r for r in db.rows(name)}
+                    merged = []
+                    for row in rows:
+                        current = existing.get(tuple(row.get(c) for c in columns))
+                        if current is not None and "resolution=merge-duplicates" in prefer:
+                            current.update(row, updated_at=_now())
+                            merged.append(current)
+                            db.emit(name, "UPDATE", current, {"id": current["id"]})
+                    new = [r for r in rows if tuple(r.get(c) for c in columns) not in existing]
+                    created = merged + db.insert(name, new)
+                else:
+                    created = db.insert(name, rows)
+                return self._send_json(201, created if representation else None)
+
+            filters = [(k, v) for k, v in params if k not in ("select", "on_conflict")]
+            matched = [r for r in db.rows(name) if _matches(r, filters)]
+            if self.command == "PATCH":
+                for row in matched:
+                    row.update(body, updated_at=_now())
+                    db.emit(name, "UPDATE", row, {"id": row["id"]})
+            else:
+                db.tables[name] = [r for r in db.rows(name) if r not in matched]
+                for row in matched:
+                    db.emit(name, "DELETE", {}, {"id": row["id"]})
+        self._send_json(200 if representation else 204, matched if representation else None)
+
+
+class FakeSupabaseServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 512
+
+    def __init__(self, address: tuple[str, int], latency_ms: float = 0.0, token_ttl: int = 3600):
+        super().__init__(address, FakeSupabaseHandler)
+        self.db = FakeDatabase()
+        self.latency_ms = latency_ms
+        self.token_ttl = token_ttl
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def start_in_thread(port: int = 0, latency_ms: float = 0.0, token_ttl: int = 3600) -> FakeSupabaseServer:
+    """Arranca el doble en un hilo de fondo (``port=0`` elige uno libre)."""
+    server = FakeSupabaseServer(("127.0.0.1", port), latency_ms, token_ttl)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=54321)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--realtime-port", type=int, default=54323)
+    parser.add_argument("--token-ttl", type=int, default=3600, help="Vida del access token en segundos")
+    args = parser.parse_args()
+    server = FakeSupabaseServer((args.host, args.port), args.latency_ms, args.token_ttl)
+    from .fake_realtime import start_in_thread as start_realtime
+
+    realtime = start_realtime(server.db, args.host, args.realtime_port)
+    print(f"Supabase local en {server.url}")
+    print(f"Realtime local: SUPABASE_REALTIME_URL={realtime.url}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()